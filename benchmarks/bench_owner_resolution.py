@@ -0,0 +1,76 @@
+"""
+Сравнение поиска объекта-владельца каталога: линейный перебор подстрок
+(прежняя реализация analyze_directory) и индекс по первым компонентам пути.
+
+Запуск: python benchmarks/bench_owner_resolution.py --objects 10000 --dirs 100000
+"""
+
+import argparse
+import os
+import sys
+import time
+from typing import Dict, List, Optional, Tuple
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from ent1ctosqlite.core import resolve_owner
+
+FOLDERS = ['Catalogs', 'Documents', 'InformationRegisters', 'AccumulationRegisters', 'DataProcessors']
+SUBDIRS = ['Ext', 'Forms/ФормаЭлемента', 'Forms/ФормаЭлемента/Ext', 'Forms/ФормаЭлемента/Ext/Form',
+           'Templates/Макет', 'Commands/Открыть/Ext']
+
+
+def make_paths(objects: int, dirs: int) -> Tuple[Dict[str, int], Dict[Tuple[str, str], int], List[str]]:
+    """Строит пути объектов и каталогов синтетической выгрузки."""
+    substring_map: Dict[str, int] = {}
+    owner_index: Dict[Tuple[str, str], int] = {}
+    for obj_id in range(objects):
+        folder = FOLDERS[obj_id % len(FOLDERS)]
+        name = f"Объект{obj_id}"
+        substring_map[f"{folder}/{name}"] = obj_id
+        owner_index[(folder, name)] = obj_id
+    paths = []
+    for i in range(dirs):
+        obj_id = (i * 7919) % objects
+        folder = FOLDERS[obj_id % len(FOLDERS)]
+        paths.append(f"{folder}/Объект{obj_id}/{SUBDIRS[i % len(SUBDIRS)]}")
+    return substring_map, owner_index, paths
+
+
+def substring_scan(substring_map: Dict[str, int], rel_path: str) -> Optional[int]:
+    """Прежний поиск владельца: перебор всех объектов с проверкой подстроки."""
+    for obj_path, obj_id in substring_map.items():
+        if obj_path in rel_path:
+            return obj_id
+    return None
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description='Бенчмарк поиска владельца каталога')
+    parser.add_argument('--objects', type=int, default=2000, help='Количество объектов (по умолчанию: 2000)')
+    parser.add_argument('--dirs', type=int, default=20000, help='Количество каталогов (по умолчанию: 20000)')
+    args = parser.parse_args()
+
+    substring_map, owner_index, paths = make_paths(args.objects, args.dirs)
+
+    start = time.perf_counter()
+    scan_result = [substring_scan(substring_map, path) for path in paths]
+    scan_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    index_result = [resolve_owner(owner_index, path.split('/')) for path in paths]
+    index_time = time.perf_counter() - start
+
+    # Подстрока неоднозначна: Объект1 находится в Объект10, Объект100 и т.д.
+    mismatches = sum(1 for a, b in zip(scan_result, index_result) if a != b)
+
+    print(f"Объектов: {args.objects}, каталогов: {args.dirs}")
+    print(f"Перебор подстрок: {scan_time:.3f} с ({args.dirs / scan_time:,.0f} каталогов/с)")
+    print(f"Индекс по пути:   {index_time:.3f} с ({args.dirs / index_time:,.0f} каталогов/с)")
+    print(f"Ускорение: {scan_time / index_time:,.0f}x")
+    print(f"Неверных владельцев при переборе подстрок: {mismatches}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,89 @@
+"""
+Сравнение разбора модулей: декодирование всего текста (decode_module, scan_methods)
+и байтовый разбор (bsl.scan_module), который декодирует только найденные имена
+и параметры и сжимает модуль в UTF-8 без декодирования.
+
+Модули синтетической выгрузки разбираются в UTF-8 с BOM и в windows-1251. Большой
+модуль в UTF-8 дополнительно читается целиком и отображается в память (mmap).
+По результатам выбираются кодировки core.BYTE_SCAN_ENCODINGS.
+
+Запуск: python benchmarks/bench_scan.py --objects 500 --repeat 5
+"""
+
+import argparse
+import mmap
+import os
+import sys
+import tempfile
+import time
+from typing import Callable, List
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from ent1ctosqlite.core import parse_module_bytes
+from ent1ctosqlite.utils import decode_module
+from synthetic import iter_configuration
+
+ALL_ENCODINGS = ('utf-8', 'cp1251')
+
+
+def best_time(func: Callable[[], object], repeat: int) -> float:
+    """Лучшее время из repeat запусков."""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def parse_mapped(path: str) -> None:
+    """Разбирает модуль по байтам файла, отображенного в память."""
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        parse_module_bytes(data, ALL_ENCODINGS)
+
+
+def parse_read(path: str) -> None:
+    """Читает модуль целиком и разбирает его текст."""
+    with open(path, 'rb') as f:
+        parse_module_bytes(f.read(), ())
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description='Бенчмарк байтового разбора модулей')
+    parser.add_argument('--objects', type=int, default=500, help='Количество объектов (по умолчанию: 500)')
+    parser.add_argument('--repeat', type=int, default=5, help='Количество повторов (по умолчанию: 5)')
+    parser.add_argument('--large-mb', type=int, default=32,
+                        help='Размер большого модуля в МБ для чтения и mmap (по умолчанию: 32)')
+    args = parser.parse_args()
+
+    texts = [decode_module(data) for rel_path, data in iter_configuration(objects=args.objects)
+             if rel_path.endswith('.bsl')]
+    size = sum(len(text.encode('utf-8')) for text in texts) / 1e6
+    print(f"Модулей: {len(texts)}, {size:.1f} МБ в UTF-8")
+
+    for encoding in ('utf-8-sig', 'windows-1251'):
+        modules: List[bytes] = [text.encode(encoding) for text in texts]
+        mismatches = sum(1 for data in modules
+                         if parse_module_bytes(data, ()) != parse_module_bytes(data, ALL_ENCODINGS))
+        text_time = best_time(lambda: [parse_module_bytes(data, ()) for data in modules], args.repeat)
+        bytes_time = best_time(lambda: [parse_module_bytes(data, ALL_ENCODINGS) for data in modules], args.repeat)
+        print(f"{encoding}: текст {text_time:.3f} с ({size / text_time:.1f} МБ/с), "
+              f"байты {bytes_time:.3f} с ({size / bytes_time:.1f} МБ/с), "
+              f"ускорение {text_time / bytes_time:.2f}x, расхождений: {mismatches}")
+
+    large = ''.join(texts).encode('utf-8-sig')
+    large = large * max(1, args.large_mb * 1024 * 1024 // len(large))
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'Module.bsl')
+        with open(path, 'wb') as f:
+            f.write(large)
+        read_time = best_time(lambda: parse_read(path), args.repeat)
+        map_time = best_time(lambda: parse_mapped(path), args.repeat)
+    print(f"Большой модуль {len(large) / 1e6:.1f} МБ: чтение и текст {read_time:.3f} с, "
+          f"mmap и байты {map_time:.3f} с")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
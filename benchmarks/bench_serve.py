@@ -0,0 +1,226 @@
+"""
+Нагрузочный тест сервиса запросов (ent1ctosqlite serve): задержки p50/p99 по видам запросов.
+
+Сервис запускается отдельным процессом на свободном порту; clients потоков с постоянными
+HTTP соединениями выполняют вместе requests запросов вперемешку: отчеты по объектам,
+поиск по именам с опечаткой, вызывающие методы и (если построен индекс) поиск по коду.
+С --compare-direct те же запросы выполняются и так, как их выполняет отдельный скрипт:
+новое соединение с базой на каждый запрос, без общего кэша.
+
+Без --database база строится из синтетической выгрузки (см. synthetic.py) на --files файлов.
+
+Запуск: python benchmarks/bench_serve.py --database vcv_parser.db --clients 8 --requests 5000
+        python benchmarks/bench_serve.py --files 2000 --compare-direct
+"""
+
+import argparse
+import http.client
+import json
+import os
+import random
+import shutil
+import socket
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from typing import Dict, List, Tuple
+from urllib.parse import urlencode
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, ROOT)
+
+from ent1ctosqlite.callgraph import build_call_graph
+from ent1ctosqlite.core import analyze_directory
+from ent1ctosqlite.database import create_database
+from ent1ctosqlite.names import build_name_index, has_name_index
+from ent1ctosqlite.reports import clear_report_cache
+from ent1ctosqlite.search import build_fts_index, has_fts_index
+from ent1ctosqlite.server import ROUTES
+from synthetic import generate_configuration, objects_for_files
+
+# Доля запросов каждого вида
+MIX = {'/object': 0.4, '/names': 0.3, '/callers': 0.2, '/search': 0.1}
+
+
+def build_synthetic_database(files: int, work_dir: str) -> str:
+    """Импортирует синтетическую выгрузку в базу и строит индексы поиска."""
+    config_dir = os.path.join(work_dir, 'config')
+    generate_configuration(config_dir, objects=objects_for_files(files))
+    db_path = os.path.join(work_dir, 'bench.db')
+    conn = sqlite3.connect(db_path)
+    create_database(conn)
+    analyze_directory(config_dir, conn)
+    build_call_graph(conn)
+    build_name_index(conn)
+    build_fts_index(conn)
+    conn.close()
+    return db_path
+
+
+def make_requests(db_path: str, count: int, seed: int = 0) -> List[Tuple[str, Dict[str, str]]]:
+    """Готовит смесь запросов по содержимому базы: (путь, параметры)."""
+    rng = random.Random(seed)
+    conn = sqlite3.connect(db_path)
+    try:
+        objects = conn.execute("SELECT obj_type, obj_name FROM objects").fetchall()
+        methods = [row[0] for row in conn.execute("SELECT methods_name FROM methods LIMIT 100000")]
+        mix = dict(MIX)
+        if not has_name_index(conn):
+            mix.pop('/names')
+        if not has_fts_index(conn):
+            mix.pop('/search')
+    finally:
+        conn.close()
+
+    paths = rng.choices(list(mix), weights=list(mix.values()), k=count)
+    requests = []
+    for path in paths:
+        if path == '/object':
+            obj_type, obj_name = rng.choice(objects)
+            params = {'type': obj_type, 'name': obj_name}
+        elif path == '/names':
+            name = rng.choice(methods)
+            pos = rng.randrange(len(name))
+            # Опечатка: пропущенная буква
+            params = {'q': name[:pos] + name[pos + 1:] if len(name) > 4 else name, 'limit': '10'}
+        elif path == '/callers':
+            params = {'name': rng.choice(methods)}
+        else:
+            params = {'q': rng.choice(methods), 'limit': '10'}
+        requests.append((path, params))
+    return requests
+
+
+def percentile(values: List[float], share: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(share * (len(ordered) - 1))))]
+
+
+def print_latencies(title: str, latencies: Dict[str, List[float]], elapsed: float) -> None:
+    total = sum(len(values) for values in latencies.values())
+    print(f"\n{title}: {total} запросов за {elapsed:.2f} с ({total / elapsed:,.0f} запросов/с)")
+    print(f"{'запрос':<10} {'кол-во':>7} {'p50, мс':>9} {'p99, мс':>9} {'макс, мс':>9}")
+    everything = [value for values in latencies.values() for value in values]
+    for path, values in sorted(latencies.items()) + [('всего', everything)]:
+        print(f"{path:<10} {len(values):>7} {percentile(values, 0.5) * 1000:>9.2f} "
+              f"{percentile(values, 0.99) * 1000:>9.2f} {max(values) * 1000:>9.2f}")
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_server(db_path: str, port: int, pool_size: int) -> subprocess.Popen:
+    """Запускает ent1ctosqlite serve и ждет ответа на /health."""
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'ent1ctosqlite.cli', 'serve', '-d', db_path,
+         '--port', str(port), '--pool-size', str(pool_size)],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        try:
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=5)
+            conn.request('GET', '/health')
+            if conn.getresponse().status == 200:
+                conn.close()
+                return process
+        except OSError:
+            time.sleep(0.2)
+    process.kill()
+    raise RuntimeError("Сервис не запустился за 60 с")
+
+
+def run_clients(port: int, requests: List[Tuple[str, Dict[str, str]]], clients: int) -> Tuple[Dict[str, List[float]], float]:
+    """Выполняет запросы из clients потоков; возвращает задержки по видам запросов и общее время."""
+    latencies: Dict[str, List[float]] = {path: [] for path, _ in requests}
+    lock = threading.Lock()
+    position = iter(range(len(requests)))
+    errors = []
+
+    def client() -> None:
+        conn = http.client.HTTPConnection('127.0.0.1', port, timeout=60)
+        while True:
+            with lock:
+                index = next(position, None)
+            if index is None:
+                break
+            path, params = requests[index]
+            start = time.perf_counter()
+            conn.request('GET', f"{path}?{urlencode(params)}")
+            response = conn.getresponse()
+            body = response.read()
+            elapsed = time.perf_counter() - start
+            if response.status != 200:
+                errors.append((path, params, response.status, body[:200]))
+            with lock:
+                latencies[path].append(elapsed)
+        conn.close()
+
+    threads = [threading.Thread(target=client) for _ in range(clients)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    if errors:
+        print(f"Ошибок: {len(errors)}, первая: {errors[0]}")
+    return latencies, elapsed
+
+
+def run_direct(db_path: str, requests: List[Tuple[str, Dict[str, str]]]) -> Tuple[Dict[str, List[float]], float]:
+    """Выполняет запросы по одному с новым соединением на каждый запрос."""
+    latencies: Dict[str, List[float]] = {path: [] for path, _ in requests}
+    start_all = time.perf_counter()
+    for path, params in requests:
+        start = time.perf_counter()
+        clear_report_cache()
+        conn = sqlite3.connect(db_path)
+        try:
+            json.dumps(ROUTES[path](conn, {name: [value] for name, value in params.items()}), ensure_ascii=False)
+        finally:
+            conn.close()
+        latencies[path].append(time.perf_counter() - start)
+    return latencies, time.perf_counter() - start_all
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description='Нагрузочный тест сервиса запросов')
+    parser.add_argument('--database', help='База для теста (по умолчанию строится синтетическая)')
+    parser.add_argument('--files', type=int, default=1000,
+                        help='Размер синтетической выгрузки в файлах (по умолчанию: 1000)')
+    parser.add_argument('--clients', type=int, default=8, help='Количество клиентов (по умолчанию: 8)')
+    parser.add_argument('--requests', type=int, default=2000, help='Всего запросов (по умолчанию: 2000)')
+    parser.add_argument('--pool-size', type=int, default=4, help='Соединений в пуле сервиса (по умолчанию: 4)')
+    parser.add_argument('--compare-direct', action='store_true',
+                        help='Выполнить те же запросы с новым соединением на каждый запрос')
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix='ent1c_serve_')
+    try:
+        db_path = args.database or build_synthetic_database(args.files, work_dir)
+        requests = make_requests(db_path, args.requests)
+        port = free_port()
+        process = start_server(db_path, port, args.pool_size)
+        try:
+            latencies, elapsed = run_clients(port, requests, args.clients)
+        finally:
+            process.terminate()
+            process.wait()
+        print_latencies(f"Сервис, клиентов {args.clients}, пул {args.pool_size}", latencies, elapsed)
+        if args.compare_direct:
+            latencies, elapsed = run_direct(db_path, requests)
+            print_latencies("Новое соединение на каждый запрос", latencies, elapsed)
+    finally:
+        shutil.rmtree(work_dir)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,207 @@
+"""
+Набор бенчмарков импорта на синтетических выгрузках (см. synthetic.py).
+
+Для каждого масштаба (примерное количество файлов выгрузки) измеряются этапы:
+  extract        - extract_vcv: распаковка zip архива и поиск корня конфигурации;
+  configuration  - parse_configuration: разбор Configuration.xml (единица - объект);
+  analyze        - analyze_directory: полный импорт каталога выгрузки в файл базы;
+  methods        - parse_methods: разбор методов уже прочитанных модулей (единица - модуль);
+  cli            - импорт архива командой ent1ctosqlite в новую базу, как его выполняет
+                   пользователь: вместе с графом вызовов и индексом имен;
+  cli_incremental - повторный импорт того же архива с --incremental (выгрузка не изменилась).
+
+Каждый замер выполняется в отдельном процессе и сообщает пропускную способность
+(единиц в секунду) и пиковый RSS процесса. Результаты можно сохранить как базовые
+(--save-baseline) и сравнивать с ними (--baseline): при падении скорости или росте
+памяти больше допуска скрипт завершается с кодом 1.
+
+Запуск: python benchmarks/bench_suite.py --scales 1000,10000,100000
+        python benchmarks/bench_suite.py --scales 1000 --save-baseline baseline.json
+        python benchmarks/bench_suite.py --scales 1000 --baseline baseline.json --tolerance 0.25
+"""
+
+import argparse
+import json
+import os
+import resource
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+import zipfile
+from typing import Dict, List
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from ent1ctosqlite import cli
+from ent1ctosqlite.core import extract_vcv, parse_configuration, analyze_directory, parse_methods
+from ent1ctosqlite.database import create_database
+from ent1ctosqlite.ingest import BulkWriter
+from ent1ctosqlite.utils import decode_module
+from synthetic import generate_archive, generate_configuration, objects_for_files
+
+STAGES = ['extract', 'configuration', 'analyze', 'methods', 'cli', 'cli_incremental']
+UNITS = {'extract': 'файл', 'configuration': 'объект', 'analyze': 'файл', 'methods': 'модуль',
+         'cli': 'файл', 'cli_incremental': 'файл'}
+DEFAULT_SCALES = '1000,10000,100000'
+
+
+def run_cli(*args: str) -> None:
+    """Выполняет команду ent1ctosqlite в текущем процессе."""
+    sys.argv = ['ent1ctosqlite', *args]
+    if cli.main() != 0:
+        raise RuntimeError(f"Команда завершилась с ошибкой: {' '.join(args)}")
+
+
+def run_stage(stage: str, tree: str, zip_path: str, work_dir: str, jobs: int) -> Dict[str, float]:
+    """Выполняет один этап в текущем процессе и возвращает количество единиц, время и пик RSS."""
+    if stage == 'extract':
+        start = time.perf_counter()
+        extract_vcv(zip_path, os.path.join(work_dir, 'extract'))
+        elapsed = time.perf_counter() - start
+        with zipfile.ZipFile(zip_path) as zf:
+            items = sum(1 for name in zf.namelist() if not name.endswith('/'))
+    elif stage == 'configuration':
+        conn = sqlite3.connect(':memory:')
+        create_database(conn)
+        start = time.perf_counter()
+        items = len(parse_configuration(os.path.join(tree, 'Configuration.xml'), conn))
+        elapsed = time.perf_counter() - start
+        conn.close()
+    elif stage == 'analyze':
+        items = sum(len(files) for _, _, files in os.walk(tree))
+        conn = sqlite3.connect(os.path.join(work_dir, 'bench.db'))
+        create_database(conn)
+        start = time.perf_counter()
+        analyze_directory(tree, conn, jobs=jobs)
+        elapsed = time.perf_counter() - start
+        conn.close()
+    elif stage == 'methods':
+        # Модули читаются заранее: замеряется только разбор и запись методов
+        modules = []
+        for root, _, files in os.walk(tree):
+            for file in files:
+                if file.endswith('.bsl'):
+                    with open(os.path.join(root, file), 'rb') as f:
+                        modules.append(decode_module(f.read()))
+        items = len(modules)
+        conn = sqlite3.connect(':memory:')
+        create_database(conn)
+        writer = BulkWriter(conn)
+        start = time.perf_counter()
+        for code_body_id, module_code in enumerate(modules, 1):
+            parse_methods(module_code, code_body_id, conn, writer)
+        writer.commit()
+        elapsed = time.perf_counter() - start
+        conn.close()
+    elif stage in ('cli', 'cli_incremental'):
+        with zipfile.ZipFile(zip_path) as zf:
+            items = sum(1 for name in zf.namelist() if not name.endswith('/'))
+        args = [zip_path, '--no-extract', '-d', os.path.join(work_dir, 'bench.db'), '--jobs', str(jobs)]
+        if stage == 'cli_incremental':
+            run_cli(*args)
+            args.append('--incremental')
+        start = time.perf_counter()
+        run_cli(*args)
+        elapsed = time.perf_counter() - start
+    else:
+        raise ValueError(f"Неизвестный этап: {stage}")
+    # ru_maxrss в Linux - в килобайтах
+    peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    return {'items': items, 'seconds': elapsed, 'peak_mb': peak_mb}
+
+
+def run_child(stage: str, tree: str, zip_path: str, jobs: int) -> Dict[str, float]:
+    """Запускает замер этапа в отдельном процессе."""
+    with tempfile.TemporaryDirectory() as work_dir:
+        result = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), '--child', stage, tree, zip_path, work_dir,
+             '--jobs', str(jobs)],
+            check=True, capture_output=True, text=True)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def compare(results: Dict[str, Dict[str, float]], baseline: Dict[str, Dict[str, float]],
+            tolerance: float) -> List[str]:
+    """Возвращает описания замеров, которые хуже базовых больше чем на tolerance."""
+    regressions = []
+    for key, result in results.items():
+        base = baseline.get(key)
+        if base is None:
+            continue
+        if result['rate'] < base['rate'] * (1 - tolerance):
+            regressions.append(f"{key}: скорость {result['rate']:.0f}/с, базовая {base['rate']:.0f}/с")
+        if result['peak_mb'] > base['peak_mb'] * (1 + tolerance):
+            regressions.append(f"{key}: пик RSS {result['peak_mb']:.1f} МБ, базовый {base['peak_mb']:.1f} МБ")
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description='Бенчмарки импорта на синтетических выгрузках')
+    parser.add_argument('--scales', default=DEFAULT_SCALES,
+                        help=f'Масштабы через запятую, в файлах выгрузки (по умолчанию: {DEFAULT_SCALES})')
+    parser.add_argument('--stages', default=','.join(STAGES),
+                        help=f'Этапы через запятую (по умолчанию: {",".join(STAGES)})')
+    parser.add_argument('--forms', type=int, default=2, help='Форм у каждого объекта (по умолчанию: 2)')
+    parser.add_argument('--methods', type=int, default=10, help='Методов в модуле (по умолчанию: 10)')
+    parser.add_argument('-j', '--jobs', type=int, default=1,
+                        help='Количество процессов analyze_directory и команды импорта (по умолчанию: 1)')
+    parser.add_argument('--repeat', type=int, default=1,
+                        help='Повторов каждого замера, берется лучший (по умолчанию: 1)')
+    parser.add_argument('--save-baseline', metavar='PATH', help='Сохранить результаты как базовые (JSON)')
+    parser.add_argument('--baseline', metavar='PATH', help='Сравнить результаты с базовыми (JSON)')
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help='Допустимое ухудшение относительно базовых результатов (по умолчанию: 0.2)')
+    parser.add_argument('--child', nargs=4, metavar=('STAGE', 'TREE', 'ZIP', 'WORK_DIR'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(run_stage(*args.child, jobs=args.jobs)))
+        return 0
+
+    stages = [stage for stage in args.stages.split(',') if stage]
+    unknown = set(stages) - set(STAGES)
+    if unknown:
+        parser.error(f"Неизвестные этапы: {', '.join(sorted(unknown))}")
+
+    results: Dict[str, Dict[str, float]] = {}
+    print(f"{'этап':<16}{'масштаб':>9}{'единиц':>9}{'единица':>9}{'время, с':>10}{'единиц/с':>11}{'пик RSS, МБ':>13}")
+    for scale in (int(s) for s in args.scales.split(',') if s):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            tree = os.path.join(temp_dir, 'tree')
+            zip_path = os.path.join(temp_dir, 'cfg.zip')
+            params = dict(objects=objects_for_files(scale, args.forms), forms=args.forms, methods=args.methods)
+            generate_configuration(tree, **params)
+            if {'extract', 'cli', 'cli_incremental'} & set(stages):
+                generate_archive(zip_path, **params)
+            for stage in stages:
+                runs = [run_child(stage, tree, zip_path, args.jobs) for _ in range(args.repeat)]
+                best = min(runs, key=lambda r: r['seconds'])
+                rate = best['items'] / best['seconds'] if best['seconds'] else 0.0
+                peak_mb = min(r['peak_mb'] for r in runs)
+                results[f"{stage}/{scale}"] = {'items': best['items'], 'seconds': best['seconds'],
+                                               'rate': rate, 'peak_mb': peak_mb}
+                print(f"{stage:<16}{scale:>9}{best['items']:>9}{UNITS[stage]:>9}{best['seconds']:>10.3f}"
+                      f"{rate:>11.0f}{peak_mb:>13.1f}", flush=True)
+
+    if args.save_baseline:
+        with open(args.save_baseline, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        print(f"Базовые результаты сохранены: {args.save_baseline}")
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print(f"Ухудшение больше {args.tolerance:.0%} относительно {args.baseline}:")
+            for line in regressions:
+                print(f"  {line}")
+            return 1
+        print(f"Результаты не хуже базовых ({args.baseline}, допуск {args.tolerance:.0%})")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,114 @@
+"""
+Пиковая память (RSS) при чтении больших XML: полное дерево ET.parse
+против потокового чтения iter_elements.
+
+Каждый замер выполняется в отдельном процессе, чтобы пик RSS одного способа
+не влиял на другой.
+
+Запуск: python benchmarks/bench_xml_memory.py --objects 200000 --form-items 200000
+"""
+
+import argparse
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import xml.etree.ElementTree as ET
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from ent1ctosqlite.utils import iter_elements
+
+MD_NS = 'http://v8.1c.ru/8.3/MDClasses'
+CORE_NS = 'http://v8.1c.ru/8.1/data/core'
+TYPES = ['Catalog', 'Document', 'InformationRegister', 'AccumulationRegister', 'CommonModule']
+
+
+def write_configuration(path: str, objects: int) -> None:
+    """Пишет Configuration.xml с заданным количеством объектов."""
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(f'<?xml version="1.0" encoding="UTF-8"?>\n<MetaDataObject xmlns="{MD_NS}">'
+                '<Configuration><ChildObjects>\n')
+        for i in range(objects):
+            obj_type = TYPES[i % len(TYPES)]
+            f.write(f'<{obj_type}>Объект{i}</{obj_type}>\n')
+        f.write('</ChildObjects></Configuration></MetaDataObject>\n')
+
+
+def write_form(path: str, items: int) -> None:
+    """Пишет описание формы с синонимом в начале и большим деревом элементов."""
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(f'<?xml version="1.0" encoding="UTF-8"?>\n'
+                f'<MetaDataObject xmlns="{MD_NS}" xmlns:v8="{CORE_NS}"><Form><Properties>'
+                '<Synonym><v8:item><v8:lang>ru</v8:lang><v8:content>Форма</v8:content></v8:item></Synonym>'
+                '</Properties><ChildItems>\n')
+        for i in range(items):
+            f.write(f'<InputField name="Поле{i}" id="{i}"><DataPath>Объект.Реквизит{i}</DataPath>'
+                    f'<Title><v8:item><v8:lang>ru</v8:lang><v8:content>Поле {i}</v8:content></v8:item></Title>'
+                    '</InputField>\n')
+        f.write('</ChildItems></Form></MetaDataObject>\n')
+
+
+def measure(mode: str, kind: str, path: str) -> None:
+    """Читает файл одним способом и печатает время и пиковый RSS процесса."""
+    start = time.perf_counter()
+    if mode == 'dom':
+        root = ET.parse(path).getroot()
+        if kind == 'configuration':
+            count = len(root.find(f'.//{{{MD_NS}}}Configuration/{{{MD_NS}}}ChildObjects'))
+        else:
+            count = len(root.findall('.//{*}Properties/{*}Synonym/{*}item/{*}content'))
+    else:
+        with open(path, 'rb') as f:
+            if kind == 'configuration':
+                wanted = lambda p: p[-3:-1] == ('Configuration', 'ChildObjects')
+            else:
+                wanted = lambda p: p[-4:] == ('Properties', 'Synonym', 'item', 'content')
+            count = sum(1 for _ in iter_elements(f, wanted))
+    elapsed = time.perf_counter() - start
+    # ru_maxrss в Linux - в килобайтах
+    peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(f"{peak_mb:.1f} {elapsed:.3f} {count}")
+
+
+def run_child(mode: str, kind: str, path: str) -> str:
+    """Запускает замер в отдельном процессе."""
+    result = subprocess.run([sys.executable, os.path.abspath(__file__), '--child', mode, kind, path],
+                            check=True, capture_output=True, text=True)
+    return result.stdout.strip()
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description='Бенчмарк памяти при чтении XML')
+    parser.add_argument('--objects', type=int, default=100000,
+                        help='Количество объектов в Configuration.xml (по умолчанию: 100000)')
+    parser.add_argument('--form-items', type=int, default=100000,
+                        help='Количество элементов формы (по умолчанию: 100000)')
+    parser.add_argument('--child', nargs=3, metavar=('MODE', 'KIND', 'PATH'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        measure(*args.child)
+        return 0
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        files = {
+            'configuration': os.path.join(temp_dir, 'Configuration.xml'),
+            'form': os.path.join(temp_dir, 'Form.xml'),
+        }
+        write_configuration(files['configuration'], args.objects)
+        write_form(files['form'], args.form_items)
+
+        print(f"{'файл':<15}{'размер, МБ':>12}{'способ':>10}{'пик RSS, МБ':>14}{'время, с':>10}")
+        for kind, path in files.items():
+            size_mb = os.path.getsize(path) / 1024 / 1024
+            for mode in ('dom', 'stream'):
+                peak_mb, elapsed, _ = run_child(mode, kind, path).split()
+                print(f"{kind:<15}{size_mb:>12.1f}{mode:>10}{float(peak_mb):>14.1f}{float(elapsed):>10.3f}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
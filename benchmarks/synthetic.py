@@ -0,0 +1,240 @@
+"""
+Генератор синтетических выгрузок конфигурации 1С для бенчмарков и тестов.
+
+Выгрузка повторяет структуру, которую создает конфигуратор: Configuration.xml,
+описания объектов с реквизитами, формы с модулями, модули объектов и менеджеров,
+общие модули и Predefined.xml справочников. Имена объектов и методов - кириллические,
+часть модулей записывается в windows-1251 без BOM.
+
+Запуск: python benchmarks/synthetic.py --files 10000 --zip /tmp/cfg.zip
+"""
+
+import argparse
+import os
+import random
+import sys
+import zipfile
+from typing import Iterator, List, Tuple
+
+MD_NS = 'http://v8.1c.ru/8.3/MDClasses'
+CORE_NS = 'http://v8.1c.ru/8.1/data/core'
+PREDEF_NS = 'http://v8.1c.ru/8.3/xcf/predef'
+XML_HEADER = '<?xml version="1.0" encoding="UTF-8"?>\n'
+
+# Типы объектов: (тип, каталог выгрузки, коллекция менеджеров, имя модуля объекта)
+OBJECT_TYPES = [
+    ('Catalog', 'Catalogs', 'Справочники', 'ObjectModule'),
+    ('Document', 'Documents', 'Документы', 'ObjectModule'),
+    ('InformationRegister', 'InformationRegisters', 'РегистрыСведений', 'RecordSetModule'),
+    ('AccumulationRegister', 'AccumulationRegisters', 'РегистрыНакопления', 'RecordSetModule'),
+    ('DataProcessor', 'DataProcessors', 'Обработки', 'ObjectModule'),
+]
+FORM_NAMES = ['ФормаЭлемента', 'ФормаСписка', 'ФормаВыбора', 'ФормаЗаписи', 'ФормаНастроек']
+WORDS = ['Товар', 'Заказ', 'Контрагент', 'Склад', 'Цена', 'Остаток', 'Партия', 'Договор',
+         'Сотрудник', 'Проводка', 'Номенклатура', 'Оплата', 'Поставка', 'Счет', 'Упаковка']
+TYPE_NAMES = ['xs:string', 'xs:decimal', 'xs:boolean', 'xs:dateTime', 'cfg:CatalogRef.Товар0']
+
+# Файлов на объект без форм (описание, модули объекта и менеджера, Predefined.xml у справочников)
+# и на каждую форму (описание, Form.xml, модуль)
+FILES_PER_OBJECT = 3.2
+FILES_PER_FORM = 3
+
+
+def objects_for_files(files: int, forms: int = 2) -> int:
+    """Подбирает количество объектов, при котором выгрузка содержит около files файлов."""
+    return max(1, round(files / (FILES_PER_OBJECT + FILES_PER_FORM * forms)))
+
+
+def object_name(index: int) -> str:
+    """Возвращает кириллическое имя объекта по его номеру."""
+    return f"{WORDS[index % len(WORDS)]}{index}"
+
+
+def _methods(rng: random.Random, prefix: str, count: int, common_modules: List[str],
+             managers: List[Tuple[str, str]], directive: str = '') -> Iterator[str]:
+    """Генерирует тексты методов с комментариями, строками, конструкторами и вызовами."""
+    for i in range(count):
+        kind = 'Функция' if i % 3 == 0 else 'Процедура'
+        end = 'КонецФункции' if kind == 'Функция' else 'КонецПроцедуры'
+        export = ' Экспорт' if i % 2 == 0 else ''
+        lines = [f"// {prefix}{i}: обработка {rng.choice(WORDS).lower()}"]
+        if directive:
+            lines.append(directive)
+        lines.append(f"{kind} {prefix}{i}(Параметр, Знач Количество = 0){export}")
+        lines.append(f"    Запрос = Новый Запрос(\"ВЫБРАТЬ {rng.choice(WORDS)} ИЗ Справочник.{rng.choice(WORDS)}\");")
+        for _ in range(rng.randint(2, 6)):
+            choice = rng.random()
+            if choice < 0.3 and common_modules:
+                lines.append(f"    {rng.choice(common_modules)}.Метод{rng.randrange(0, count, 2)}(Параметр);")
+            elif choice < 0.5 and managers:
+                collection, name = rng.choice(managers)
+                lines.append(f"    Результат = {collection}.{name}.Метод{rng.randrange(0, max(1, count // 2), 2)}(Параметр);")
+            elif choice < 0.7 and i > 0:
+                lines.append(f"    {prefix}{rng.randrange(i)}(Параметр);")
+            else:
+                lines.append(f"    Если Количество > {rng.randint(0, 999)} Тогда")
+                lines.append("        Сообщить(\"Превышено: \" + Количество); // Сообщить(1)")
+                lines.append("    КонецЕсли;")
+        if kind == 'Функция':
+            lines.append("    Возврат Запрос.Выполнить();")
+        lines.append(end)
+        yield '\n'.join(lines) + '\n\n'
+
+
+def _object_xml(obj_type: str, name: str, rng: random.Random, forms: List[str]) -> str:
+    """Возвращает описание объекта с реквизитами, табличной частью и формами."""
+    attrs = ''.join(
+        f'<Attribute><Properties><Name>Реквизит{i}</Name>'
+        f'<Type><v8:Type>{rng.choice(TYPE_NAMES)}</v8:Type></Type></Properties></Attribute>'
+        for i in range(rng.randint(3, 12)))
+    if obj_type.endswith('Register'):
+        attrs = ('<Dimension><Properties><Name>Измерение</Name>'
+                 '<Type><v8:Type>cfg:CatalogRef.Товар0</v8:Type></Type></Properties></Dimension>'
+                 '<Resource><Properties><Name>Количество</Name>'
+                 '<Type><v8:Type>xs:decimal</v8:Type></Type></Properties></Resource>') + attrs
+    elif obj_type in ('Catalog', 'Document'):
+        attrs += ('<TabularSection><Properties><Name>Товары</Name></Properties><ChildObjects>'
+                  '<Attribute><Properties><Name>Количество</Name>'
+                  '<Type><v8:Type>xs:decimal</v8:Type></Type></Properties></Attribute>'
+                  '</ChildObjects></TabularSection>')
+    attrs += ''.join(f'<Form>{form}</Form>' for form in forms)
+    return (f'{XML_HEADER}<MetaDataObject xmlns="{MD_NS}" xmlns:v8="{CORE_NS}" '
+            'xmlns:xs="http://www.w3.org/2001/XMLSchema" '
+            'xmlns:cfg="http://v8.1c.ru/8.1/data/enterprise/current-config">'
+            f'<{obj_type}><Properties><Name>{name}</Name>{_synonym(name)}</Properties>'
+            f'<ChildObjects>{attrs}</ChildObjects></{obj_type}></MetaDataObject>\n')
+
+
+def _synonym(text: str) -> str:
+    """Возвращает синоним на русском и английском языках."""
+    return (f'<Synonym><v8:item><v8:lang>ru</v8:lang><v8:content>{text}</v8:content></v8:item>'
+            f'<v8:item><v8:lang>en</v8:lang><v8:content>{text} (en)</v8:content></v8:item></Synonym>')
+
+
+def _form_xml(name: str) -> str:
+    """Возвращает описание формы: <Объект>/Forms/<Форма>.xml."""
+    return (f'{XML_HEADER}<MetaDataObject xmlns="{MD_NS}" xmlns:v8="{CORE_NS}">'
+            f'<Form><Properties><Name>{name}</Name>{_synonym(name)}</Properties></Form></MetaDataObject>\n')
+
+
+def _form_items_xml(rng: random.Random) -> str:
+    """Возвращает дерево элементов формы: <Форма>/Ext/Form.xml."""
+    items = ''.join(f'<InputField name="Поле{i}" id="{i}"><DataPath>Объект.Реквизит{i}</DataPath></InputField>'
+                    for i in range(rng.randint(5, 30)))
+    return f'{XML_HEADER}<Form xmlns="http://v8.1c.ru/8.3/xcf/logform"><ChildItems>{items}</ChildItems></Form>\n'
+
+
+def _predefined_xml(rng: random.Random) -> str:
+    """Возвращает предопределенные элементы справочника: Ext/Predefined.xml."""
+    items = ''.join(f'<Item><Name>Предопределенный{i}</Name><Code>{i:03}</Code></Item>'
+                    for i in range(rng.randint(1, 5)))
+    return f'{XML_HEADER}<PredefinedData xmlns="{PREDEF_NS}">{items}</PredefinedData>\n'
+
+
+def iter_configuration(objects: int = 100, forms: int = 2, methods: int = 10,
+                       common_modules: int = 0, cp1251_share: float = 0.2,
+                       seed: int = 0) -> Iterator[Tuple[str, bytes]]:
+    """Генерирует файлы выгрузки: (относительный путь, содержимое).
+
+    common_modules = 0 означает один общий модуль на каждые 20 объектов.
+    Доля cp1251_share модулей записывается в windows-1251, остальные - в UTF-8 с BOM.
+    """
+    rng = random.Random(seed)
+    common_modules = common_modules or max(1, objects // 20)
+    common_names = [f"Общий{object_name(i)}" for i in range(common_modules)]
+    children = []
+    managers = []
+    for i in range(objects):
+        obj_type, folder, collection, _ = OBJECT_TYPES[i % len(OBJECT_TYPES)]
+        children.append((obj_type, object_name(i)))
+        managers.append((collection, object_name(i)))
+    children.extend(('CommonModule', name) for name in common_names)
+
+    def module(text: str) -> bytes:
+        """Кодирует текст модуля в UTF-8 с BOM или в windows-1251."""
+        if rng.random() < cp1251_share:
+            return text.encode('windows-1251')
+        return text.encode('utf-8-sig')
+
+    items = ''.join(f'<{obj_type}>{name}</{obj_type}>' for obj_type, name in children)
+    yield 'Configuration.xml', (
+        f'{XML_HEADER}<MetaDataObject xmlns="{MD_NS}" xmlns:v8="{CORE_NS}"><Configuration>'
+        f'<Properties><Name>СинтетическаяКонфигурация</Name></Properties>'
+        f'<ChildObjects>{items}</ChildObjects></Configuration></MetaDataObject>\n').encode('utf-8')
+
+    for name in common_names:
+        yield f'CommonModules/{name}.xml', _object_xml('CommonModule', name, rng, []).encode('utf-8')
+        yield f'CommonModules/{name}/Ext/Module.bsl', module(
+            ''.join(_methods(rng, 'Метод', methods, [], managers)))
+
+    for i in range(objects):
+        obj_type, folder, _, object_module = OBJECT_TYPES[i % len(OBJECT_TYPES)]
+        name = object_name(i)
+        form_names = FORM_NAMES[:forms] if forms <= len(FORM_NAMES) else \
+            FORM_NAMES + [f"Форма{j}" for j in range(len(FORM_NAMES), forms)]
+        base = f'{folder}/{name}'
+        yield f'{base}.xml', _object_xml(obj_type, name, rng, form_names).encode('utf-8')
+        yield f'{base}/Ext/{object_module}.bsl', module(
+            ''.join(_methods(rng, 'Метод', methods, common_names, managers)))
+        yield f'{base}/Ext/ManagerModule.bsl', module(
+            ''.join(_methods(rng, 'Метод', max(1, methods // 2), common_names, managers)))
+        if obj_type == 'Catalog':
+            yield f'{base}/Ext/Predefined.xml', _predefined_xml(rng).encode('utf-8')
+        for form in form_names:
+            yield f'{base}/Forms/{form}.xml', _form_xml(form).encode('utf-8')
+            yield f'{base}/Forms/{form}/Ext/Form.xml', _form_items_xml(rng).encode('utf-8')
+            yield f'{base}/Forms/{form}/Ext/Form/Module.bsl', module(
+                ''.join(_methods(rng, 'Команда', methods, common_names, managers, '&НаКлиенте')))
+
+
+def generate_configuration(path: str, **kwargs) -> int:
+    """Записывает синтетическую выгрузку в каталог path; возвращает количество файлов.
+
+    Параметры генерации - как у iter_configuration.
+    """
+    count = 0
+    for rel_path, data in iter_configuration(**kwargs):
+        file_path = os.path.join(path, *rel_path.split('/'))
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        with open(file_path, 'wb') as f:
+            f.write(data)
+        count += 1
+    return count
+
+
+def generate_archive(zip_path: str, root: str = 'Конфигурация', **kwargs) -> int:
+    """Записывает синтетическую выгрузку в zip архив внутрь каталога root; возвращает количество файлов."""
+    count = 0
+    with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as zf:
+        for rel_path, data in iter_configuration(**kwargs):
+            zf.writestr(f'{root}/{rel_path}' if root else rel_path, data)
+            count += 1
+    return count
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description='Генератор синтетической выгрузки конфигурации 1С')
+    parser.add_argument('--files', type=int, default=1000,
+                        help='Примерное количество файлов выгрузки (по умолчанию: 1000)')
+    parser.add_argument('--forms', type=int, default=2, help='Форм у каждого объекта (по умолчанию: 2)')
+    parser.add_argument('--methods', type=int, default=10, help='Методов в модуле (по умолчанию: 10)')
+    parser.add_argument('--cp1251-share', type=float, default=0.2,
+                        help='Доля модулей в кодировке windows-1251 (по умолчанию: 0.2)')
+    parser.add_argument('--seed', type=int, default=0, help='Начальное значение генератора')
+    parser.add_argument('--dir', help='Каталог для выгрузки')
+    parser.add_argument('--zip', help='Путь к создаваемому zip архиву')
+    args = parser.parse_args()
+
+    if not args.dir and not args.zip:
+        parser.error('Укажите --dir и/или --zip')
+    params = dict(objects=objects_for_files(args.files, args.forms), forms=args.forms,
+                  methods=args.methods, cp1251_share=args.cp1251_share, seed=args.seed)
+    if args.dir:
+        print(f"Каталог {args.dir}: файлов {generate_configuration(args.dir, **params)}")
+    if args.zip:
+        print(f"Архив {args.zip}: файлов {generate_archive(args.zip, **params)}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -4,12 +4,16 @@ VCV Parser - инструмент для анализа конфигураций
 
 from .core import (
     extract_vcv,
+    open_vcv,
+    analyze_directory,
     parse_configuration,
     parse_form_and_code,
     parse_module,
     parse_methods,
+    extract_methods,
     parse_method_args,
     parse_predefined,
+    parse_object_attributes,
     analyze_object
 )
 
@@ -24,11 +28,71 @@ from .utils import (
     setup_logger,
     find_configuration_root,
     extract_synonym,
+    extract_synonyms,
     determine_module_type,
     get_type_ru,
     get_type_en,
     get_english_folder,
-    is_in_excluded_types
+    is_in_excluded_types,
+    decode_module,
+    parse_type_body
+)
+
+from .bsl import (
+    MethodHeader,
+    scan_methods,
+    scan_module
+)
+
+from .callgraph import (
+    build_call_graph,
+    find_methods,
+    get_callers
+)
+
+from .blobs import (
+    get_module_code
+)
+
+from .search import (
+    build_fts_index,
+    search_code
+)
+
+from .names import (
+    NameHit,
+    build_name_index,
+    search_names
+)
+
+from .ingest import (
+    BulkWriter,
+    DEFAULT_BATCH_SIZE
+)
+
+from .reports import (
+    object_report,
+    print_object_report,
+    clear_report_cache,
+    iter_object_reports,
+    export_reports
+)
+
+from .pipeline import (
+    Pipeline,
+    DEFAULT_QUEUE_SIZE
+)
+
+from .vfs import (
+    DirectorySource,
+    ZipSource
+)
+
+from .server import (
+    ConnectionPool,
+    OutdatedDatabaseError,
+    QueryServer,
+    serve
 )
 
 __version__ = '0.1.1'
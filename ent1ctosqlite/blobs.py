@@ -0,0 +1,56 @@
+"""
+Хранение текстов модулей: сжатые zlib блоки, адресуемые хешем содержимого.
+"""
+
+import hashlib
+import sqlite3
+import zlib
+from typing import Optional, Tuple, Union
+from .ingest import BulkWriter
+
+COMPRESSION_LEVEL = 6
+
+# Блок текста модуля: (SHA-1 текста в UTF-8, размер текста в байтах, сжатый текст)
+ModuleBlob = Tuple[str, int, bytes]
+
+
+def pack_module(module_code: str) -> ModuleBlob:
+    """Сжимает текст модуля и вычисляет ключ блока по его содержимому."""
+    return pack_module_data(module_code.encode('utf-8'))
+
+
+def pack_module_data(data: Union[bytes, memoryview]) -> ModuleBlob:
+    """Сжимает текст модуля, уже записанный в UTF-8 (без BOM), не декодируя его."""
+    return hashlib.sha1(data).hexdigest(), len(data), zlib.compress(data, COMPRESSION_LEVEL)
+
+
+def unpack_module(data: Optional[bytes]) -> Optional[str]:
+    """Распаковывает текст модуля из сжатого блока."""
+    return None if data is None else zlib.decompress(data).decode('utf-8')
+
+
+def register_functions(conn: sqlite3.Connection) -> None:
+    """Регистрирует SQL функцию module_text(data), на которой построено представление code_modules."""
+    conn.create_function('module_text', 1, unpack_module, deterministic=True)
+
+
+def get_module_code(conn: sqlite3.Connection, code_body_id: int) -> Optional[str]:
+    """Возвращает текст модуля по его идентификатору."""
+    cursor = conn.cursor()
+    cursor.execute('''
+        SELECT cb.code_body_module, b.module_blobs_data
+        FROM code_body cb
+        LEFT JOIN module_blobs b ON b.module_blobs_hash = cb.code_body_blob
+        WHERE cb.code_body_id = ?
+    ''', (code_body_id,))
+    row = cursor.fetchone()
+    if row is None:
+        return None
+    # Базы, созданные до появления module_blobs, хранят текст прямо в code_body
+    return row[0] if row[0] is not None else unpack_module(row[1])
+
+
+def write_module_blob(writer: BulkWriter, blob: ModuleBlob) -> str:
+    """Добавляет сжатый текст модуля в буфер writer, если его еще нет в базе; возвращает ключ."""
+    writer.insert_unique('module_blobs', blob[0], blob)
+    return blob[0]
@@ -0,0 +1,346 @@
+"""
+Разбор текста модулей встроенного языка 1С (BSL) за один проход.
+"""
+
+import codecs
+import mmap
+import re
+from functools import lru_cache, partial
+from typing import Callable, Iterable, List, NamedTuple, Optional, Pattern, Tuple, Union
+
+# Одно регулярное выражение на все интересующие лексемы. Комментарии, строки, даты
+# и инструкции препроцессора распознаются, чтобы ключевые слова внутри них не
+# принимались за объявления и вызовы методов. Вызов - это Метод(, Модуль.Метод(
+# или Справочники.Имя.Метод(; более длинные цепочки и конструкторы не учитываются.
+#
+# Совпадение начинается с пропуска текста, в котором лексем быть не может: пробелов
+# и знаков, комментариев, строк, дат, инструкций препроцессора и слов, за которыми
+# не следуют скобка или точка. Весь этот текст проходит внутри регулярного выражения,
+# и в Python возвращаются только лексемы - в несколько раз меньше совпадений, чем
+# при отдельном совпадении на каждый комментарий и строку. Слово, не ставшее
+# лексемой, и конец текста завершают совпадение без именованной группы.
+#
+# Выражение записано шаблоном: из него строятся выражение для текста (TOKEN_PATTERN)
+# и выражения для байтов модуля в UTF-8 и windows-1251 (см. scan_module), в которых
+# буквы, пробелы и ключевые слова заменены их байтовыми записями.
+KEYWORDS = r'Процедура|Procedure|Функция|Function|КонецПроцедуры|EndProcedure|КонецФункции|EndFunction|Новый|New'
+
+TOKEN_TEMPLATE = r'''
+    (?:
+        %(other)s+
+      | //[^\n]*
+      | "[^"]*(?:""[^"]*)*"
+      | '[^'\n]*'
+      | \#[^\n]*
+      | (?!(?:%(keywords)s)%(word_end)s)%(word)s+%(word_end)s(?!%(space)s*[.(])
+      | [/"'] | &%(word_end)s
+    )*
+    (?:
+        &(?P<directive>%(word)s+)
+      | %(word_start)s(?:
+            (?P<kind>%(kind)s)%(space)s+(?P<name>%(word)s+)%(space)s*
+                \((?P<params>(?:[^()"]|"[^"]*(?:""[^"]*)*")*)\)
+                (?:%(space)s*(?P<export>%(export)s)%(word_end)s)?
+          | (?P<end>%(end)s)%(word_end)s
+          | (?P<new>%(new)s)%(space)s+%(word)s+
+          | (?:(?P<qualifier>%(word)s+(?:%(space)s*\.%(space)s*%(word)s+)?)%(space)s*\.%(space)s*)?(?P<call>%(word)s+)%(space)s*\(
+        )
+      | %(word)s+
+      | \Z
+    )
+'''
+
+TEMPLATE_KEYWORDS = {
+    'keywords': KEYWORDS,
+    'kind': 'Процедура|Procedure|Функция|Function',
+    'export': 'Экспорт|Export',
+    'end': 'КонецПроцедуры|EndProcedure|КонецФункции|EndFunction',
+    'new': 'Новый|New',
+}
+
+TOKEN_PATTERN = re.compile(TOKEN_TEMPLATE % dict(
+    TEMPLATE_KEYWORDS, word=r'\w', word_end=r'(?!\w)', word_start=r'(?<![.\w])',
+    space=r'\s', other=r'''[^/"'\#&\w]'''
+), re.IGNORECASE | re.VERBOSE)
+
+UTF8_BOM = codecs.BOM_UTF8
+
+# Сколько первых байтов модуля просматривается для определения кодировки
+ENCODING_PREFIX_SIZE = 4096
+
+# Байтовый разбор модуля в UTF-8 совпадает с разбором текста, если кроме ASCII в модуле
+# есть только буквы U+0400-U+047F: первый байт D0 или D1, второй - 80-BF (все они -
+# буквы для \w). Таблица для bytes.translate помечает байты модуля классами
+# (A - ASCII, L - первый байт буквы, C - второй, X - прочие байты), чтобы проверять
+# модуль поиском пар классов без регулярных выражений.
+UTF8_BYTE_CLASSES = bytes(
+    ord('A') if byte < 0x80 else ord('C') if byte < 0xc0 else ord('L') if byte in (0xd0, 0xd1) else ord('X')
+    for byte in range(0x100)
+)
+# Пары классов, невозможные в модуле из ASCII и букв U+0400-U+047F
+UTF8_INVALID_PAIRS = (b'LL', b'LA', b'AC', b'CC')
+
+# Размер участка mmap, который проверяется за один вызов bytes.translate
+UTF8_CHECK_CHUNK = 1 << 20
+
+# Байт, которого нет в windows-1251: такой модуль не декодируется и текстовым разбором
+CP1251_UNDEFINED = b'\x98'
+
+FUNCTION_KEYWORDS = {'функция', 'function'}
+VALUE_KEYWORDS = {'знач', 'val'}
+# Ключевые слова, за которыми может стоять скобка, но которые не являются вызовами
+NOT_CALL_KEYWORDS = {
+    'если', 'иначеесли', 'пока', 'для', 'каждого', 'из', 'по', 'цикл', 'тогда', 'возврат',
+    'и', 'или', 'не', 'if', 'elsif', 'while', 'for', 'each', 'in', 'to', 'do', 'then',
+    'return', 'and', 'or', 'not'
+}
+
+# Вызов метода: (квалификатор - модуль или менеджер объекта, имя метода, номер строки)
+MethodCall = Tuple[Optional[str], str, int]
+
+# Текст модуля в байтах: bytes или отображение файла в память (mmap)
+ModuleBuffer = Union[bytes, mmap.mmap]
+
+
+class MethodHeader(NamedTuple):
+    """Метод модуля: заголовок и границы в тексте (смещения в символах, строки с 1)."""
+    name: str
+    is_function: bool
+    is_export: bool
+    args: List[str]
+    directive: Optional[str]
+    start_offset: int
+    end_offset: int
+    start_line: int
+    end_line: int
+    calls: List[MethodCall] = []
+
+
+def split_params(params_str: str) -> List[str]:
+    """Возвращает имена параметров метода из строки параметров заголовка."""
+    args: List[str] = []
+    for param in params_str.split(','):
+        # Убираем Знач, значения по умолчанию и комментарии внутри заголовка
+        param = re.sub(r'//[^\n]*', '', param).split('=')[0]
+        words = param.split()
+        if words and words[0].lower() in VALUE_KEYWORDS:
+            words = words[1:]
+        if words and words[0] not in args:
+            args.append(words[0])
+    return args
+
+
+def _byte_class(encoding: str, pattern: str) -> str:
+    """Записывает байты кодировки, символы которых подходят под pattern, для класса символов."""
+    chars = []
+    for byte in range(0x80, 0x100):
+        try:
+            char = bytes([byte]).decode(encoding)
+        except UnicodeDecodeError:
+            continue
+        if re.match(pattern, char):
+            chars.append(_byte_string(bytes([byte])))
+    return ''.join(chars)
+
+
+def _byte_string(value: bytes) -> str:
+    """Записывает байты для регулярного выражения в виде \\xNN."""
+    return ''.join(f'\\x{byte:02x}' for byte in value)
+
+
+def _byte_keywords(keywords: str, encoding: str) -> str:
+    """Записывает ключевые слова байтами кодировки; кириллица - в обоих регистрах."""
+    result = []
+    for char in keywords:
+        if char.isascii():
+            # Регистр латиницы в байтовом выражении учитывает re.IGNORECASE
+            result.append(char)
+            continue
+        variants = sorted({variant.encode(encoding) for variant in (char.lower(), char.upper())})
+        if len(variants) == 1:
+            result.append(_byte_string(variants[0]))
+        elif len({variant[:-1] for variant in variants}) == 1:
+            # Варианты различаются последним байтом: класс вместо альтернативы
+            result.append(_byte_string(variants[0][:-1]) + f"[{''.join(_byte_string(v[-1:]) for v in variants)}]")
+        else:
+            result.append(f"(?:{'|'.join(_byte_string(variant) for variant in variants)})")
+    return ''.join(result)
+
+
+@lru_cache(maxsize=None)
+def byte_token_pattern(encoding: str) -> Pattern[bytes]:
+    """Строит по TOKEN_TEMPLATE выражение для байтов модуля в кодировке utf-8 или cp1251."""
+    keywords = {name: _byte_keywords(value, encoding) for name, value in TEMPLATE_KEYWORDS.items()}
+    if encoding == 'utf-8':
+        # Буква кириллицы - два байта; первый байт D0 или D1 отличает ее от знаков ASCII
+        # Буква кириллицы - два байта (D0 или D1, затем 80-BF). Модуль проверен
+        # utf8_scannable, поэтому оба байта можно считать буквами одного класса:
+        # граница слова никогда не приходится на середину буквы
+        parts = dict(word=r'[\w\xd0\xd1\x80-\xbf]', word_end=r'(?![\w\xd0\xd1\x80-\xbf])',
+                     word_start=r'(?<![.\w])(?<![\xd0\xd1][\x80-\xbf])',
+                     space=r'[\s\x1c-\x1f]', other=r'''[^/"'\#&\w\xd0\xd1\x80-\xbf]''')
+    else:
+        letters = _byte_class(encoding, r'\w')
+        spaces = _byte_class(encoding, r'\s')
+        parts = dict(word=f'[\\w{letters}]', word_end=f'(?![\\w{letters}])', word_start=f'(?<![.\\w{letters}])',
+                     space=f'[\\s\\x1c-\\x1f{spaces}]', other=f'''[^/"'\\#&\\w{letters}]''')
+    return re.compile((TOKEN_TEMPLATE % dict(keywords, **parts)).encode('ascii'), re.IGNORECASE | re.VERBOSE)
+
+
+def detect_encoding(prefix: bytes) -> Tuple[str, int]:
+    """Определяет кодировку модуля по началу файла: (utf-8 или cp1251, длина BOM).
+
+    Начало без BOM, которое декодируется как UTF-8 (последний символ может быть обрезан),
+    считается UTF-8, иначе - windows-1251.
+    """
+    if prefix.startswith(UTF8_BOM):
+        return 'utf-8', len(UTF8_BOM)
+    try:
+        codecs.getincrementaldecoder('utf-8')().decode(prefix, final=False)
+    except UnicodeDecodeError:
+        return 'cp1251', 0
+    return 'utf-8', 0
+
+
+def utf8_scannable(data: ModuleBuffer, start: int = 0) -> bool:
+    """Проверяет, что байты модуля с позиции start - ASCII и буквы U+0400-U+047F в UTF-8."""
+    size = len(data)
+    if start < size and UTF8_BYTE_CLASSES[data[start]] == ord('C'):
+        return False
+    if start < size and UTF8_BYTE_CLASSES[data[size - 1]] == ord('L'):
+        return False
+    # Участки перекрываются на байт, чтобы проверить и пары на их границах
+    for chunk_start in range(start, size, UTF8_CHECK_CHUNK):
+        classes = data[max(start, chunk_start - 1):chunk_start + UTF8_CHECK_CHUNK].translate(UTF8_BYTE_CLASSES)
+        if b'X' in classes or any(pair in classes for pair in UTF8_INVALID_PAIRS):
+            return False
+    return True
+
+
+def scan_methods(code: str) -> List[MethodHeader]:
+    """Находит методы модуля за один линейный проход по тексту.
+
+    Для каждого метода возвращаются директива компиляции (&НаСервере и т.п.),
+    признаки функции и экспорта, параметры, смещения начала и конца метода
+    номера строк и вызовы других методов в теле. Методы и вызовы в комментариях
+    и строковых литералах не учитываются.
+    """
+    return _scan(TOKEN_PATTERN.finditer(code), code.count, '\n', len(code), str, lambda offset: offset)
+
+
+def scan_module(data: ModuleBuffer, encodings: Iterable[str] = ('utf-8', 'cp1251')
+                ) -> Optional[Tuple[str, int, List[MethodHeader]]]:
+    """Находит методы модуля по его байтам, не декодируя модуль целиком.
+
+    Кодировка и BOM определяются по началу модуля; декодируются только найденные имена,
+    параметры, директивы и квалификаторы вызовов. Смещения методов пересчитываются
+    в символы, как у scan_methods для декодированного текста. Возвращает кодировку,
+    длину BOM и методы или None, если кодировки модуля нет в encodings или байтовый
+    разбор может разойтись с разбором текста (в модуле UTF-8 есть символы кроме ASCII и кириллицы U+0400-U+047F или неверные
+    последовательности, в модуле windows-1251 - неопределенный байт): такой модуль
+    разбирается scan_methods после decode_module.
+    """
+    encoding, bom = detect_encoding(data[:ENCODING_PREFIX_SIZE])
+    if encoding not in encodings:
+        return None
+    if encoding == 'utf-8':
+        if not utf8_scannable(data, bom):
+            return None
+    elif data.find(CP1251_UNDEFINED) >= 0:
+        return None
+
+    if isinstance(data, bytes):
+        count = data.count
+    else:
+        # У mmap нет count: считаем в копии участка
+        def count(sub: bytes, start: int, end: int) -> int:
+            return data[start:end].count(sub)
+
+    if encoding == 'utf-8':
+        # Каждая буква кириллицы - два байта с первым байтом D0 или D1
+        consumed = [bom, 0]  # последнее пересчитанное смещение в байтах и в символах
+
+        def char_offset(offset: int) -> int:
+            start, chars = consumed
+            chars += offset - start - count(b'\xd0', start, offset) - count(b'\xd1', start, offset)
+            consumed[:] = [offset, chars]
+            return chars
+    else:
+        def char_offset(offset: int) -> int:
+            return offset
+
+    methods = _scan(byte_token_pattern(encoding).finditer(data, bom), count, b'\n', len(data),
+                    partial(bytes.decode, encoding=encoding), char_offset)
+    return encoding, bom, methods
+
+
+def _scan(matches, count: Callable, newline, size: int, decode: Callable,
+          char_offset: Callable[[int], int]) -> List[MethodHeader]:
+    """Собирает методы из совпадений TOKEN_TEMPLATE в тексте или в байтах модуля.
+
+    count - count текста или байтов, decode - преобразование найденных групп в строку,
+    char_offset - пересчет смещений в символы (вызывается с неубывающими смещениями).
+    """
+    methods: List[MethodHeader] = []
+    directive: Optional[str] = None
+    current = None  # (заголовок без границы конца, смещение начала, строка начала)
+    calls: List[MethodCall] = []
+    line = 1
+    pos = 0
+
+    def close(end_offset: int, end_line: int) -> None:
+        header, start_offset, start_line = current
+        methods.append(header._replace(start_offset=start_offset, end_offset=char_offset(end_offset),
+                                       start_line=start_line, end_line=end_line, calls=calls))
+
+    for match in matches:
+        group = match.lastgroup
+        if group is None:
+            # Пропущенный текст завершился словом, не ставшим лексемой, или концом текста
+            continue
+        if group == 'directive':
+            directive = decode(match.group('directive'))
+            continue
+        if group == 'new':
+            continue
+        # Лексема начинается после пропущенного текста в начале совпадения
+        if group == 'call':
+            start = match.start('qualifier') if match.group('qualifier') is not None else match.start('call')
+        elif group == 'end':
+            start = match.start('end')
+        else:
+            start = match.start('kind')
+        line += count(newline, pos, start)
+        pos = start
+
+        if match.group('kind') is not None:
+            if current is not None:
+                # Предыдущий метод не закрыт - считаем, что он закончился перед этим
+                close(start, line)
+            header = MethodHeader(
+                name=decode(match.group('name')),
+                is_function=decode(match.group('kind')).lower() in FUNCTION_KEYWORDS,
+                is_export=match.group('export') is not None,
+                args=split_params(decode(match.group('params'))),
+                directive=directive,
+                start_offset=0, end_offset=0, start_line=0, end_line=0
+            )
+            current = (header, char_offset(start), line)
+            calls = []
+            directive = None
+        elif group == 'call':
+            name = decode(match.group('call'))
+            if current is not None and name.lower() not in NOT_CALL_KEYWORDS:
+                qualifier = match.group('qualifier')
+                if qualifier is not None:
+                    qualifier = re.sub(r'\s+', '', decode(qualifier))
+                calls.append((qualifier, name, line))
+        elif group == 'end':
+            if current is not None:
+                close(match.end(), line)
+                current = None
+            directive = None
+
+    if current is not None:
+        close(size, line + count(newline, pos, size))
+    return methods
@@ -0,0 +1,194 @@
+"""
+Граф вызовов методов: разрешение вызовов и поиск прямых и косвенных вызывающих методов.
+"""
+
+import sqlite3
+import logging
+from typing import Dict, List, NamedTuple, Optional, Tuple
+from .utils import fold_name
+
+logger = logging.getLogger('ent1ctosqlite')
+
+# Менеджеры объектов в выражениях вида Справочники.Имя.Метод() и типы объектов в базе
+MANAGER_TYPES: Dict[str, str] = {
+    'справочники': 'Catalog',
+    'документы': 'Document',
+    'журналыдокументов': 'DocumentJournal',
+    'перечисления': 'Enum',
+    'отчеты': 'Report',
+    'обработки': 'DataProcessor',
+    'планывидовхарактеристик': 'ChartOfCharacteristicTypes',
+    'планысчетов': 'ChartOfAccounts',
+    'планывидоврасчета': 'ChartOfCalculationTypes',
+    'планыобмена': 'ExchangePlan',
+    'регистрысведений': 'InformationRegister',
+    'регистрынакопления': 'AccumulationRegister',
+    'регистрыбухгалтерии': 'AccountingRegister',
+    'регистрырасчета': 'CalculationRegister',
+    'бизнеспроцессы': 'BusinessProcess',
+    'задачи': 'Task',
+    'catalogs': 'Catalog',
+    'documents': 'Document',
+    'documentjournals': 'DocumentJournal',
+    'enums': 'Enum',
+    'reports': 'Report',
+    'dataprocessors': 'DataProcessor',
+    'chartsofcharacteristictypes': 'ChartOfCharacteristicTypes',
+    'chartsofaccounts': 'ChartOfAccounts',
+    'chartsofcalculationtypes': 'ChartOfCalculationTypes',
+    'exchangeplans': 'ExchangePlan',
+    'informationregisters': 'InformationRegister',
+    'accumulationregisters': 'AccumulationRegister',
+    'accountingregisters': 'AccountingRegister',
+    'calculationregisters': 'CalculationRegister',
+    'businessprocesses': 'BusinessProcess',
+    'tasks': 'Task',
+}
+
+# Наибольшая длина цепочки вызовов, по которой по умолчанию ищутся вызывающие методы.
+# Замыкание графа не хранится: в большой конфигурации у популярного метода десятки
+# тысяч косвенных вызывающих, и таблица замыкания растет квадратично
+DEFAULT_CALLER_DEPTH = 10
+
+
+class CallerInfo(NamedTuple):
+    """Метод, вызывающий заданный метод прямо (depth = 1) или через цепочку вызовов.
+
+    module_name модуля формы или команды - <Форма>.<Модуль>.
+    """
+    methods_id: int
+    depth: int
+    object_type: Optional[str]
+    object_name: Optional[str]
+    module_name: Optional[str]
+    method_name: str
+
+
+def _module_index(conn: sqlite3.Connection) -> Tuple[Dict[str, int], Dict[Tuple[str, str], int]]:
+    """Возвращает модули общих модулей по имени и модули менеджеров по (тип, имя)."""
+    cursor = conn.cursor()
+    cursor.execute('''
+        SELECT cb.code_body_id, cb.code_body_name, o.obj_type, o.obj_name
+        FROM code_body cb
+        JOIN objects o ON o.obj_id = cb.code_body_owner
+        WHERE cb.code_body_owner_id IS NULL
+          AND (o.obj_type = 'CommonModule' OR cb.code_body_name = 'ManagerModule')
+    ''')
+    common: Dict[str, int] = {}
+    managers: Dict[Tuple[str, str], int] = {}
+    for code_body_id, module_name, obj_type, obj_name in cursor.fetchall():
+        if obj_type == 'CommonModule':
+            common[obj_name.lower()] = code_body_id
+        else:
+            managers[(obj_type, obj_name.lower())] = code_body_id
+    return common, managers
+
+
+def resolve_calls(conn: sqlite3.Connection) -> int:
+    """Находит вызываемые методы для еще не разрешенных вызовов.
+
+    Локальный вызов ищется в модуле вызывающего метода, Модуль.Метод - среди
+    экспортных методов общего модуля, Справочники.Имя.Метод - среди экспортных
+    методов модуля менеджера. Имена сравниваются без учета регистра, как в 1С.
+    Возвращает количество разрешенных вызовов.
+    """
+    cursor = conn.cursor()
+    cursor.execute("SELECT methods_id, methods_owner_id, methods_name, methods_is_export FROM methods")
+    methods: Dict[Tuple[int, str], Tuple[int, bool]] = {}
+    for methods_id, code_body_id, name, is_export in cursor.fetchall():
+        methods.setdefault((code_body_id, name.lower()), (methods_id, bool(is_export)))
+    common, managers = _module_index(conn)
+
+    cursor.execute('''
+        SELECT c.method_calls_id, m.methods_owner_id, c.method_calls_module, c.method_calls_name
+        FROM method_calls c
+        JOIN methods m ON m.methods_id = c.method_calls_caller
+        WHERE c.method_calls_callee IS NULL
+    ''')
+    updates = []
+    for call_id, caller_module, module, name in cursor.fetchall():
+        if module is None:
+            target = methods.get((caller_module, name.lower()))
+        else:
+            parts = module.lower().split('.')
+            if len(parts) == 1:
+                code_body_id = common.get(parts[0])
+            else:
+                code_body_id = managers.get((MANAGER_TYPES.get(parts[0]), parts[1]))
+            target = methods.get((code_body_id, name.lower()))
+            if target is not None and not target[1]:
+                # Из другого модуля доступны только экспортные методы
+                target = None
+        if target is not None:
+            updates.append((target[0], call_id))
+
+    cursor.executemany("UPDATE method_calls SET method_calls_callee = ? WHERE method_calls_id = ?", updates)
+    return len(updates)
+
+
+def build_call_graph(conn: sqlite3.Connection) -> int:
+    """Разрешает еще не разрешенные вызовы методов; возвращает количество разрешенных.
+
+    Косвенные вызовы не сохраняются: их находит get_callers запросом по ребрам графа.
+    """
+    try:
+        resolved = resolve_calls(conn)
+        conn.commit()
+    except sqlite3.Error as e:
+        logger.error(f"Ошибка при построении графа вызовов: {e}")
+        conn.rollback()
+        raise
+    logger.info(f"Граф вызовов: разрешено вызовов {resolved}")
+    return resolved
+
+
+def find_methods(conn: sqlite3.Connection, name: str) -> List[int]:
+    """Находит идентификаторы методов по имени 'Метод' или 'Объект.Метод' без учета регистра.
+
+    Методы ищутся по индексу idx_methods_name_folded; имя объекта сравнивается
+    SQL функцией fold_name только у методов с подходящим именем.
+    """
+    owner, _, method = name.rpartition('.')
+    conn.create_function('fold_name', 1, fold_name, deterministic=True)
+    cursor = conn.cursor()
+    cursor.execute('''
+        SELECT m.methods_id
+        FROM methods m
+        JOIN code_body cb ON cb.code_body_id = m.methods_owner_id
+        LEFT JOIN objects o ON o.obj_id = cb.code_body_owner
+        WHERE m.methods_name_folded = :method
+          AND (:owner = '' OR fold_name(o.obj_name) = :owner)
+        ORDER BY m.methods_id
+    ''', {'method': fold_name(method), 'owner': fold_name(owner)})
+    return [row[0] for row in cursor.fetchall()]
+
+
+def get_callers(conn: sqlite3.Connection, methods_id: int,
+                max_depth: int = DEFAULT_CALLER_DEPTH) -> List[CallerInfo]:
+    """Возвращает методы, из которых прямо или косвенно вызывается метод.
+
+    Вызывающие методы находятся рекурсивным запросом по индексу idx_method_calls_callee_caller,
+    по цепочкам вызовов длиной не больше max_depth; для каждого метода возвращается
+    длина кратчайшей цепочки. Рекурсивный метод входит в число своих вызывающих.
+    """
+    cursor = conn.cursor()
+    cursor.execute('''
+        WITH RECURSIVE callers(methods_id, depth) AS (
+            SELECT method_calls_caller, 1 FROM method_calls WHERE method_calls_callee = :method
+            UNION
+            SELECT c.method_calls_caller, callers.depth + 1
+            FROM callers
+            JOIN method_calls c ON c.method_calls_callee = callers.methods_id
+            WHERE callers.depth < :max_depth
+        )
+        SELECT cl.methods_id, MIN(cl.depth) AS depth, o.obj_type, o.obj_name,
+               COALESCE(ct.commands_templates_name || '.', '') || cb.code_body_name, m.methods_name
+        FROM callers cl
+        JOIN methods m ON m.methods_id = cl.methods_id
+        JOIN code_body cb ON cb.code_body_id = m.methods_owner_id
+        LEFT JOIN objects o ON o.obj_id = cb.code_body_owner
+        LEFT JOIN commands_templates ct ON ct.commands_templates_id = cb.code_body_owner_id
+        GROUP BY cl.methods_id
+        ORDER BY depth, o.obj_name, m.methods_name
+    ''', {'method': methods_id, 'max_depth': max_depth})
+    return [CallerInfo(*row) for row in cursor.fetchall()]
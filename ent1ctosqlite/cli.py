@@ -2,21 +2,37 @@ import argparse
 import os
 import logging
 import sqlite3
-from typing import Optional
-from .core import extract_vcv, parse_configuration
-from .database import create_database, check_database_integrity
-from .utils import setup_logger
+import sys
+from typing import List, Optional
+from .core import extract_vcv, open_vcv, parse_configuration, analyze_directory
+from .database import (
+    create_database, check_database_integrity, check_and_update_database_structure,
+    begin_fast_import, end_fast_import, optimize_database,
+    open_staging_database, publish_database, discard_staging_database
+)
+from .ingest import BulkWriter, DEFAULT_BATCH_SIZE
+from .callgraph import build_call_graph, find_methods, get_callers, DEFAULT_CALLER_DEPTH
+from .search import build_fts_index, search_code
+from .names import build_name_index, has_name_index, search_names, TRIGRAM_SQLITE_VERSION
+from .reports import export_reports, REPORT_FORMATS
+from .metrics import enable_metrics, disable_metrics, stage
+from .pipeline import DEFAULT_QUEUE_SIZE
+from .server import serve, OutdatedDatabaseError, DEFAULT_HOST, DEFAULT_PORT, DEFAULT_POOL_SIZE
+from .utils import setup_logger, DEFAULT_ROOT_SEARCH_DEPTH
+from .vfs import DEFAULT_SOURCE
 
 def parse_args() -> argparse.Namespace:
     """Разбор аргументов командной строки."""
     parser = argparse.ArgumentParser(
         description='Парсер конфигураций 1С:Предприятие 8.3',
+        epilog='HTTP сервис запросов к базе: ent1ctosqlite serve --help',
         formatter_class=argparse.RawDescriptionHelpFormatter
     )
     
     parser.add_argument(
         'zip_path',
-        help='Путь к zip-архиву с выгрузкой конфигурации'
+        nargs='?',
+        help='Путь к zip-архиву с выгрузкой конфигурации (не нужен для --check-db, --search, --find-name, --build-fts, --callers, --export-reports)'
     )
     
     parser.add_argument(
@@ -25,12 +41,98 @@ def parse_args() -> argparse.Namespace:
         default='temp'
     )
     
+    parser.add_argument(
+        '--no-extract',
+        help='Читать конфигурацию прямо из zip-архива, не распаковывая его на диск',
+        action='store_true'
+    )
+    
+    parser.add_argument(
+        '--root-depth',
+        help=f'Максимальная глубина поиска Configuration.xml в выгрузке (по умолчанию: {DEFAULT_ROOT_SEARCH_DEPTH})',
+        type=int,
+        default=DEFAULT_ROOT_SEARCH_DEPTH
+    )
+    
+    parser.add_argument(
+        '--dump-tree',
+        help='Вывести в лог содержимое архива и дерево каталогов выгрузки (вместе с --debug)',
+        action='store_true'
+    )
+    
+    parser.add_argument(
+        '-j', '--jobs',
+        help='Количество процессов для разбора модулей (по умолчанию: 1)',
+        type=int,
+        default=1
+    )
+    
+    parser.add_argument(
+        '--queue-size',
+        help='Размер очередей конвейера чтение -> разбор -> запись модулей; 0 - без конвейера, '
+             f'все этапы в основном потоке (по умолчанию: {DEFAULT_QUEUE_SIZE})',
+        type=int,
+        default=DEFAULT_QUEUE_SIZE
+    )
+    
+    parser.add_argument(
+        '--batch-size',
+        help=f'Количество строк в пакете записи в базу (по умолчанию: {DEFAULT_BATCH_SIZE})',
+        type=int,
+        default=DEFAULT_BATCH_SIZE
+    )
+    
+    parser.add_argument(
+        '--checkpoint-rows',
+        help='Фиксировать транзакцию после каждых N строк (по умолчанию: одна транзакция на импорт)',
+        type=int,
+        default=0
+    )
+    
+    parser.add_argument(
+        '--fast-import',
+        help='Загружать без журнала на диске и без fsync (WAL, synchronous=OFF, большой кэш), '
+             'затем вернуть надежные настройки и выполнить ANALYZE',
+        action='store_true'
+    )
+    
+    parser.add_argument(
+        '--build-in',
+        choices=['memory', 'file'],
+        help='Собрать базу в памяти или во временном файле рядом с ней и заменить базу '
+             'целиком после успешного импорта (читатели не видят частично загруженных данных)'
+    )
+    
+    parser.add_argument(
+        '--vacuum',
+        help='Сжать файл базы (VACUUM) после импорта',
+        action='store_true'
+    )
+    
+    parser.add_argument(
+        '--incremental',
+        help='Обновить существующую базу: разобрать только добавленные, измененные и удаленные файлы',
+        action='store_true'
+    )
+    
     parser.add_argument(
         '-d', '--database',
         help='Путь к файлу базы данных SQLite (по умолчанию: vcv_parser.db)',
         default='vcv_parser.db'
     )
     
+    parser.add_argument(
+        '--metrics-json',
+        metavar='PATH',
+        help='Сохранить время, процессорное время и объем данных по этапам импорта в JSON файл'
+    )
+    
+    parser.add_argument(
+        '--profile',
+        metavar='DIR',
+        help='Профилировать этапы импорта (cProfile) и сохранить профили в DIR/<этап>.prof'
+    )
+    
     parser.add_argument(
         '--log-file',
         help='Сохранять лог в файл',
@@ -49,41 +151,283 @@ def parse_args() -> argparse.Namespace:
         action='store_true'
     )
     
+    parser.add_argument(
+        '--build-fts',
+        help='Построить полнотекстовый индекс по коду модулей (после импорта или для существующей базы)',
+        action='store_true'
+    )
+    
+    parser.add_argument(
+        '--search',
+        metavar='TEXT',
+        help='Найти текст в коде модулей существующей базы (нужен индекс --build-fts)'
+    )
+    
+    parser.add_argument(
+        '--find-name',
+        metavar='TEXT',
+        help='Найти объекты, реквизиты и методы существующей базы по имени или синониму с учетом опечаток'
+    )
+    
+    parser.add_argument(
+        '--callers',
+        metavar='NAME',
+        help='Показать все методы, из которых прямо или косвенно вызывается метод (Метод или Модуль.Метод)'
+    )
+    
+    parser.add_argument(
+        '--callers-depth',
+        help=f'Наибольшая длина цепочки вызовов для --callers (по умолчанию: {DEFAULT_CALLER_DEPTH})',
+        type=int,
+        default=DEFAULT_CALLER_DEPTH
+    )
+    
+    parser.add_argument(
+        '--export-reports',
+        metavar='PATH',
+        help='Выгрузить отчеты по всем объектам существующей базы в файл (реквизиты, табличные части, '
+             'формы, методы, основания, движения)'
+    )
+    
+    parser.add_argument(
+        '--report-format',
+        choices=REPORT_FORMATS,
+        help='Формат выгрузки отчетов (по умолчанию: markdown для файлов .md, иначе jsonl)'
+    )
+    
+    parser.add_argument(
+        '--report-type',
+        metavar='TYPE',
+        help='Выгружать отчеты только по объектам типа TYPE (Справочник или Catalog)'
+    )
+    
+    parser.add_argument(
+        '--report-lang',
+        metavar='LANG',
+        help='Язык синонимов в отчетах (ru, en, ...; по умолчанию - первый язык описания)'
+    )
+    
+    parser.add_argument(
+        '--limit',
+        help='Максимальное количество результатов поиска (по умолчанию: 50)',
+        type=int,
+        default=50
+    )
+    
     return parser.parse_args()
 
+def parse_serve_args(argv: List[str]) -> argparse.Namespace:
+    """Разбор аргументов команды serve."""
+    parser = argparse.ArgumentParser(
+        prog='ent1ctosqlite serve',
+        description='HTTP сервис запросов к базе: отчеты по объектам, поиск по коду и именам, '
+                    'вызывающие методы (JSON, только чтение)'
+    )
+    parser.add_argument(
+        '-d', '--database',
+        help='Путь к файлу базы данных SQLite (по умолчанию: vcv_parser.db)',
+        default='vcv_parser.db'
+    )
+    parser.add_argument(
+        '--host',
+        help=f'Адрес, на котором принимаются запросы (по умолчанию: {DEFAULT_HOST})',
+        default=DEFAULT_HOST
+    )
+    parser.add_argument(
+        '--port',
+        help=f'Порт (по умолчанию: {DEFAULT_PORT})',
+        type=int,
+        default=DEFAULT_PORT
+    )
+    parser.add_argument(
+        '--pool-size',
+        help=f'Количество соединений с базой (по умолчанию: {DEFAULT_POOL_SIZE})',
+        type=int,
+        default=DEFAULT_POOL_SIZE
+    )
+    parser.add_argument(
+        '--log-file',
+        help='Сохранять лог в файл',
+        action='store_true'
+    )
+    parser.add_argument(
+        '--debug',
+        help='Включить режим отладки (каждый запрос выводится в лог)',
+        action='store_true'
+    )
+    return parser.parse_args(argv)
+
+def serve_main(argv: List[str]) -> int:
+    """Команда serve: сервис запросов к существующей базе."""
+    args = parse_serve_args(argv)
+    logger = setup_logger(args.log_file, args.debug)
+    if not os.path.exists(args.database):
+        logger.error(f"База данных не найдена: {args.database}")
+        return 1
+    try:
+        serve(args.database, args.host, args.port, args.pool_size)
+    except OutdatedDatabaseError:
+        return 1
+    except Exception:
+        logger.exception("Произошла непредвиденная ошибка:")
+        return 1
+    return 0
+
+def print_code_hits(conn: sqlite3.Connection, text: str, limit: int) -> None:
+    """Выводит результаты полнотекстового поиска по коду."""
+    hits = search_code(conn, text, limit)
+    if not hits:
+        print("Ничего не найдено")
+    for hit in hits:
+        owner = f"{hit.object_type}.{hit.object_name}" if hit.object_name else ""
+        method = f".{hit.method_name}" if hit.method_name else ""
+        print(f"{owner} {hit.module_name}{method}:{hit.line}: {hit.text}")
+
+NAME_KIND_TITLES = {
+    'object': 'Объект',
+    'attribute': 'Реквизит',
+    'tabular_section': 'Табличная часть',
+    'dimension': 'Измерение',
+    'resource': 'Ресурс',
+    'method': 'Метод',
+}
+
+def print_name_hits(conn: sqlite3.Connection, text: str, limit: int) -> None:
+    """Выводит результаты нечеткого поиска по именам."""
+    if not has_name_index(conn):
+        # База создана до появления индекса имен
+        build_name_index(conn)
+    hits = search_names(conn, text, limit)
+    if not hits:
+        print("Ничего не найдено")
+    for hit in hits:
+        owner = f"{hit.object_type}.{hit.object_name}" if hit.object_name else ""
+        if hit.kind != 'object':
+            owner += f" {hit.container}.{hit.name}" if hit.container else f" {hit.name}"
+        matched = f" ({hit.text})" if hit.text != hit.name else ""
+        print(f"{hit.score:.2f} {NAME_KIND_TITLES[hit.kind]} {owner.strip()}{matched}")
+
+def print_callers(conn: sqlite3.Connection, name: str, max_depth: int = DEFAULT_CALLER_DEPTH) -> None:
+    """Выводит прямые и косвенные вызовы метода по графу вызовов."""
+    methods_ids = find_methods(conn, name)
+    if not methods_ids:
+        print(f"Метод не найден: {name}")
+    for methods_id in methods_ids:
+        callers = get_callers(conn, methods_id, max_depth)
+        print(f"{name} (ID: {methods_id}): вызывающих методов {len(callers)}")
+        for caller in callers:
+            owner = f"{caller.object_type}.{caller.object_name} " if caller.object_name else ""
+            print(f"  [{caller.depth}] {owner}{caller.module_name}.{caller.method_name}")
+
 def main() -> Optional[int]:
     """Основная функция программы."""
+    if sys.argv[1:2] == ['serve']:
+        return serve_main(sys.argv[2:])
     args = parse_args()
     
     # Настраиваем логирование
     logger = setup_logger(args.log_file, args.debug)
+    source = DEFAULT_SOURCE
+    conn = None
+    metrics = None
+    fast_import = False
+    staging_path = None
+    building = False
     
     try:
-        # Проверяем существование zip-файла
-        if not os.path.exists(args.zip_path):
-            logger.error(f"Файл не найден: {args.zip_path}")
-            return 1
-            
-        # Если указан флаг проверки БД
-        if args.check_db:
+        # Действия над существующей базой данных
+        if (args.check_db or args.search or args.find_name or args.callers or args.export_reports
+                or (args.build_fts and not args.zip_path)):
             if not os.path.exists(args.database):
                 logger.error(f"База данных не найдена: {args.database}")
                 return 1
-            check_database_integrity(args.database)
+            if args.check_db:
+                check_database_integrity(args.database)
+            conn = sqlite3.connect(args.database)
+            if args.build_fts:
+                build_fts_index(conn)
+            if args.search:
+                print_code_hits(conn, args.search, args.limit)
+            if args.find_name:
+                print_name_hits(conn, args.find_name, args.limit)
+            if args.callers:
+                print_callers(conn, args.callers, args.callers_depth)
+            if args.export_reports:
+                report_format = args.report_format
+                if report_format is None:
+                    report_format = 'markdown' if args.export_reports.endswith('.md') else 'jsonl'
+                export_reports(conn, args.export_reports, report_format, args.report_type, args.report_lang)
             return 0
+        
+        # Проверяем существование zip-файла
+        if not args.zip_path:
+            logger.error("Не указан путь к zip-архиву с выгрузкой конфигурации")
+            return 1
+        if not os.path.exists(args.zip_path):
+            logger.error(f"Файл не найден: {args.zip_path}")
+            return 1
             
+        if args.metrics_json or args.profile:
+            metrics = enable_metrics(args.profile)
+        
         # Создаем/подключаемся к базе данных
-        conn = sqlite3.connect(args.database)
+        if args.build_in:
+            conn, staging_path = open_staging_database(args.database, args.build_in == 'memory')
+            building = True
+        else:
+            conn = sqlite3.connect(args.database)
+        if args.fast_import:
+            begin_fast_import(conn)
+            fast_import = True
         create_database(conn)
+        check_and_update_database_structure(conn)
         
-        # Распаковываем архив
-        config_path = extract_vcv(args.zip_path, args.output)
-        if not config_path:
+        # Распаковываем архив или читаем его напрямую
+        if args.no_extract:
+            source, config_path = open_vcv(args.zip_path, args.root_depth, args.dump_tree)
+        else:
+            config_path = extract_vcv(args.zip_path, args.output, args.root_depth, args.dump_tree)
+        if config_path is None:
             logger.error("Не удалось найти Configuration.xml")
             return 1
             
         # Разбираем конфигурацию
-        objects = parse_configuration(os.path.join(config_path, "Configuration.xml"), conn)
+        writer = BulkWriter(conn, args.batch_size, args.checkpoint_rows)
+        objects = parse_configuration(source.join(config_path, "Configuration.xml"), conn, source, writer)
+        
+        # Разбираем формы, модули и методы объектов
+        changed = analyze_directory(config_path, conn, source, jobs=args.jobs, writer=writer,
+                                    incremental=args.incremental, queue_size=args.queue_size)
+        writer.commit()
+        writer.log_stats(logger)
+        if changed:
+            with stage('call_graph'):
+                build_call_graph(conn)
+            if sqlite3.sqlite_version_info >= TRIGRAM_SQLITE_VERSION:
+                with stage('name_index'):
+                    build_name_index(conn)
+            else:
+                logger.warning(f"SQLite {sqlite3.sqlite_version} не поддерживает токенизатор trigram: "
+                               f"индекс имен не строится, поиск по именам недоступен")
+        else:
+            logger.info("Выгрузка не изменилась: граф вызовов и индекс имен не перестраиваются")
+        
+        if args.build_fts:
+            with stage('fts'):
+                build_fts_index(conn)
+        
+        if fast_import:
+            end_fast_import(conn)
+            fast_import = False
+        if args.fast_import or args.vacuum:
+            with stage('optimize'):
+                optimize_database(conn, args.vacuum)
+        
+        if building:
+            with stage('publish'):
+                staging_conn, conn = conn, None
+                publish_database(staging_conn, args.database, staging_path)
+            building = False
         
         logger.info(f"\nОбработка завершена. Найдено объектов: {len(objects)}")
         logger.info(f"База данных сохранена в: {os.path.abspath(args.database)}")
@@ -95,10 +439,22 @@ def main() -> Optional[int]:
         return 1
         
     finally:
-        try:
+        source.close()
+        if conn is not None:
+            if fast_import:
+                # После ошибки импорта база тоже возвращается к надежным настройкам
+                end_fast_import(conn)
             conn.close()
-        except:
-            pass
+        if building:
+            # Импорт не завершился: опубликованная ранее база остается нетронутой
+            discard_staging_database(staging_path)
+        if metrics is not None:
+            # Показатели сохраняются и при ошибке импорта: по ним видно, на каком этапе она произошла
+            disable_metrics()
+            metrics.log_summary(logger)
+            if args.metrics_json:
+                metrics.write_json(args.metrics_json)
+            metrics.dump_profiles()
 
 if __name__ == '__main__':
     exit(main()) 
\ No newline at end of file
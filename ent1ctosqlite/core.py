@@ -2,24 +2,52 @@ import os
 import xml.etree.ElementTree as ET
 import logging
 import sqlite3
-import re
-from typing import List, Tuple, Optional
+import hashlib
+import io
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import closing
+from typing import Dict, Iterable, List, Tuple, Optional
 from .utils import (
     find_configuration_root, 
+    DEFAULT_ROOT_SEARCH_DEPTH,
     get_english_folder,
     extract_synonym,
+    read_synonyms,
+    first_synonym,
+    iter_elements,
+    local_name,
+    decode_module,
+    fold_name,
     determine_module_type,
     get_type_ru,
-    get_type_en,
-    is_in_excluded_types
+    is_in_excluded_types,
+    parse_type_body
+)
+from .vfs import DEFAULT_SOURCE, DirectorySource, ZipSource
+from .ingest import BulkWriter
+from .metrics import stage, count_items, record_queues
+from .pipeline import Pipeline, DEFAULT_QUEUE_SIZE
+from .reports import object_report, print_object_report
+from .blobs import ModuleBlob, pack_module, pack_module_data, write_module_blob
+from .bsl import MethodHeader, ModuleBuffer, scan_methods, scan_module, split_params
+from .database import (
+    load_file_hashes, delete_modules, delete_object_attributes, delete_unused_blobs, forget_files,
+    create_indexes, drop_indexes, next_import_generation, BULK_LOAD_INDEXES
 )
 import zipfile
 
 logger = logging.getLogger('ent1ctosqlite')
 
-def extract_vcv(zip_path: str, extract_path: str) -> str:
-    """Распаковывает zip архив и находит корневой каталог конфигурации."""
+def extract_vcv(zip_path: str, extract_path: str, max_depth: int = DEFAULT_ROOT_SEARCH_DEPTH,
+                dump: bool = False) -> str:
+    """Распаковывает zip архив и находит корневой каталог конфигурации.
     
+    Содержимое архива и дерево каталогов выводятся в лог только при dump=True.
+    """
+    with stage('extract'):
+        return _extract_vcv(zip_path, extract_path, max_depth, dump)
+
+def _extract_vcv(zip_path: str, extract_path: str, max_depth: int, dump: bool) -> str:
     try:
         if not os.path.exists(zip_path):
             logger.error(f"Файл архива не найден: {zip_path}")
@@ -47,32 +75,20 @@ def extract_vcv(zip_path: str, extract_path: str) -> str:
     # Распаковываем архив
     with zipfile.ZipFile(zip_path, 'r') as zip_ref:
         # Выводим содержимое архива
-        logger.debug("\nСодержимое архива:")
-        for file in zip_ref.namelist():
-            logger.debug(f"  {file}")
+        if dump:
+            logger.debug("\nСодержимое архива:")
+            for file in zip_ref.namelist():
+                logger.debug(f"  {file}")
         
         # Распаковываем
         logger.info("\nРаспаковка...")
         zip_ref.extractall(extract_path)
+        infos = zip_ref.infolist()
+        count_items('extract', len(infos), sum(info.file_size for info in infos))
         logger.info("Распаковка завершена")
     
-    # Проверяем содержимое распакованного каталога
-    logger.info(f"\nПроверка содержимого {extract_path}:")
-    if os.path.exists(extract_path):
-        files = os.listdir(extract_path)
-        logger.debug(f"Файлы в корне: {files}")
-        
-        # Если в корне только один каталог, проверяем его
-        if len(files) == 1 and os.path.isdir(os.path.join(extract_path, files[0])):
-            subdir = os.path.join(extract_path, files[0])
-            logger.debug(f"Проверка подкаталога: {subdir}")
-            subfiles = os.listdir(subdir)
-            logger.debug(f"Файлы в подкаталоге: {subfiles}")
-    else:
-        logger.error("Каталог распаковки не существует!")
-    
     # Ищем Configuration.xml
-    config_root = find_configuration_root(extract_path)
+    config_root = find_configuration_root(extract_path, max_depth=max_depth, dump=dump)
     if config_root:
         logger.info(f"Успешно найден корневой каталог: {config_root}")
         return config_root
@@ -80,44 +96,79 @@ def extract_vcv(zip_path: str, extract_path: str) -> str:
         logger.error("Не удалось найти каталог с Configuration.xml")
         raise FileNotFoundError("Configuration.xml не найден в распакованном архиве")
 
-def parse_configuration(config_path: str, conn: sqlite3.Connection) -> List[Tuple[str, str]]:
-    """Разбирает файл Configuration.xml и возвращает список объектов конфигурации."""
+def open_vcv(zip_path: str, max_depth: int = DEFAULT_ROOT_SEARCH_DEPTH,
+             dump: bool = False) -> Tuple[ZipSource, str]:
+    """Открывает zip архив для чтения без распаковки и находит корневой каталог конфигурации."""
+    if not os.path.exists(zip_path):
+        logger.error(f"Файл архива не найден: {zip_path}")
+        raise FileNotFoundError(f"Файл архива не найден: {zip_path}")
+    
+    logger.info(f"Открываю архив без распаковки: {zip_path}")
+    with stage('extract'):
+        source = ZipSource(zip_path)
+    config_root = find_configuration_root('', source, max_depth, dump)
+    if config_root is None:
+        source.close()
+        logger.error("Не удалось найти Configuration.xml в архиве")
+        raise FileNotFoundError("Configuration.xml не найден в архиве")
+    
+    logger.info(f"Успешно найден корневой каталог в архиве: '{config_root}'")
+    return source, config_root
+
+def parse_configuration(config_path: str, conn: sqlite3.Connection,
+                        source: Optional[DirectorySource] = None,
+                        writer: Optional[BulkWriter] = None) -> List[Tuple[str, str]]:
+    """Разбирает файл Configuration.xml и возвращает список объектов конфигурации.
+    
+    Если writer не передан, строки записываются и фиксируются одной транзакцией.
+    """
+    source = source or DEFAULT_SOURCE
+    own_writer = writer is None
+    writer = writer or BulkWriter(conn)
     
     try:
         logger.info(f"Начинаю парсинг файла: {config_path}")
-        root_dir = os.path.dirname(config_path)
         
-        tree = ET.parse(config_path)
-        root = tree.getroot()
-    
-        ns = {'ns': 'http://v8.1c.ru/8.3/MDClasses'}
-        child_objects = root.find('.//ns:Configuration/ns:ChildObjects', namespaces=ns)
-        if child_objects is None:
-            logger.error("Не найден элемент ChildObjects")
-            return []
-            
         objects_found = []  # Список для возврата
         total_objects = 0
+        has_child_objects = False
         
-        for obj in child_objects:
-            object_type = obj.tag.split('}')[-1]  # Убираем пространство имен из тега
-            name = obj.text.strip() if obj.text else ''
-            
-            if name and not is_in_excluded_types(object_type):
+        # Объекты, уже загруженные при предыдущем импорте, повторно не добавляются
+        writer.flush()
+        cursor = conn.cursor()
+        cursor.execute("SELECT obj_type, obj_name FROM objects")
+        existing = set(cursor.fetchall())
+        
+        # Файл читается потоково: в памяти остается только текущий элемент ChildObjects
+        with stage('configuration'), source.open(config_path) as f:
+            for path, obj in iter_elements(f, _is_child_object):
+                if path[-1] == 'ChildObjects':
+                    has_child_objects = True
+                    continue
+                object_type = path[-1]
+                name = obj.text.strip() if obj.text else ''
+                
+                if not name or is_in_excluded_types(object_type):
+                    continue
+                
                 total_objects += 1
                 
                 # Сохраняем информацию об объекте
-                cursor = conn.cursor()
-                cursor.execute("""
-                    INSERT INTO objects (obj_type, obj_name)
-                    VALUES (?, ?)
-                """, (object_type, name))
+                if (object_type, name) not in existing:
+                    writer.insert('objects', (writer.next_id('objects'), object_type, name))
+                    existing.add((object_type, name))
                 
                 objects_found.append((object_type, name))
                 logger.debug(f"Добавлен объект: {object_type}/{name}")
         
+        if not has_child_objects:
+            logger.error("Не найден элемент ChildObjects")
+            return []
+        
         logger.info(f"Всего найдено объектов: {total_objects}")
-        conn.commit()
+        count_items('configuration', total_objects)
+        if own_writer:
+            writer.commit()
         return objects_found
         
     except ET.ParseError as e:
@@ -128,204 +179,331 @@ def parse_configuration(config_path: str, conn: sqlite3.Connection) -> List[Tupl
         logger.exception("Полный стек ошибки:")
         raise
 
-def parse_predefined(obj_id: int, predefined_path: str, conn: sqlite3.Connection) -> None:
+def parse_predefined(obj_id: int, predefined_path: str, conn: sqlite3.Connection,
+                     source: Optional[DirectorySource] = None,
+                     writer: Optional[BulkWriter] = None) -> None:
     """Разбирает предопределенные значения объекта."""
-    cursor = conn.cursor()
+    source = source or DEFAULT_SOURCE
+    own_writer = writer is None
+    writer = writer or BulkWriter(conn)
     
     try:
-        tree = ET.parse(predefined_path)
-        root = tree.getroot()
-        ns = {'v8': 'http://v8.1c.ru/8.1/data/core'}
-        
-        for item in root.findall(".//Item", namespaces=ns):
-            name = item.findtext("Name", namespaces=ns)
-            
-            # Добавляем запись в predefined_attrs
-            cursor.execute("""
-                INSERT INTO predefined_attrs (
-                    predefined_attrs_owner,
-                    predefined_attrs_name
-                ) VALUES (?, ?)
-            """, (obj_id, name))
-            
-            predefined_id = cursor.lastrowid
-            
-            # Обрабатываем значения атрибутов
-            for child in item:
-                if child.tag != 'Name':  # пропускаем уже обработанное имя
-                    cursor.execute("""
-                        INSERT INTO predefined_attrs_values (
-                            predefined_attrs_values_owner,
-                            predefined_attrs_values_atr,
-                            predefined_attrs_values_val
-                        ) VALUES (?, ?, ?)
-                    """, (obj_id, predefined_id, child.text))
+        # Вложенные элементы (ChildItems) обрабатываются раньше родительского
+        # и удаляются из него, поэтому в памяти остается только текущий элемент
+        with source.open(predefined_path) as f:
+            for _, item in iter_elements(f, lambda p: p[-1] == 'Item'):
+                name = None
+                values = []
+                for child in item:
+                    tag = local_name(child.tag)
+                    if tag == 'Name':
+                        name = child.text
+                    elif tag != 'ChildItems':
+                        values.append(child.text)
+                
+                # Добавляем запись в predefined_attrs
+                predefined_id = writer.next_id('predefined_attrs')
+                writer.insert('predefined_attrs', (predefined_id, obj_id, name))
+                
+                # Обрабатываем значения атрибутов
+                for value in values:
+                    writer.insert('predefined_attrs_values', (obj_id, predefined_id, value))
         
-        conn.commit()
+        if own_writer:
+            writer.commit()
         logger.debug(f"Обработаны предопределенные значения: {predefined_path}")
         
     except Exception as e:
         logger.error(f"Ошибка при разборе предопределенных значений {predefined_path}: {e}")
         raise
 
-def parse_form_and_code(obj_id: int, form_path: str, conn: sqlite3.Connection) -> None:
+# Элементы ChildObjects, описывающие реквизиты: тег -> (измерение, ресурс, реквизит)
+ATTRIBUTE_KINDS = {
+    'Attribute': (False, False, True),
+    'Dimension': (True, False, False),
+    'Resource': (False, True, False),
+}
+
+# Элементы описания типа реквизита (пространство имен http://v8.1c.ru/8.1/data/core)
+TYPE_TAGS = {'{http://v8.1c.ru/8.1/data/core}Type', '{http://v8.1c.ru/8.1/data/core}TypeSet'}
+
+# Элементы синонима: Synonym/v8:item/(v8:lang, v8:content)
+SYNONYM_LANG_TAG = '{http://v8.1c.ru/8.1/data/core}lang'
+SYNONYM_CONTENT_TAG = '{http://v8.1c.ru/8.1/data/core}content'
+
+def _write_attribute(writer: BulkWriter, obj_id: int, name: Optional[str], table_part: Optional[str],
+                     flags: Tuple[bool, bool, bool, bool, bool], type_element: Optional[ET.Element]) -> int:
+    """Добавляет реквизит и типы его значений в буферы writer; возвращает идентификатор реквизита.
+    
+    flags - признаки измерения, ресурса, реквизита, стандартного реквизита и табличной части.
+    """
+    attr_id = writer.next_id('obj_attributes')
+    writer.insert('obj_attributes', (attr_id, obj_id, name, table_part) + flags)
+    if type_element is None:
+        return attr_id
+    for type_item in type_element:
+        # v8:Type и v8:TypeSet; квалификаторы (v8:StringQualifiers и т.п.) пропускаем
+        if type_item.tag in TYPE_TAGS and type_item.text:
+            type_body = type_item.text.strip()
+            writer.insert('obj_attr_types', (attr_id, type_body) + parse_type_body(type_body))
+    return attr_id
+
+def _write_synonyms(writer: BulkWriter, obj_id: int, attr_id: Optional[int],
+                    synonym: Optional[ET.Element]) -> None:
+    """Добавляет синоним объекта (attr_id=None), реквизита или табличной части на всех языках."""
+    if synonym is None:
+        return
+    position = 0
+    for item in synonym:
+        content = item.findtext(SYNONYM_CONTENT_TAG)
+        if content:
+            writer.insert('object_synonyms', (obj_id, attr_id, item.findtext(SYNONYM_LANG_TAG) or '',
+                                              position, content))
+            position += 1
+
+def _write_standard_attributes(writer: BulkWriter, obj_id: int, table_part: Optional[str],
+                               standard_attributes: Optional[ET.Element]) -> None:
+    """Добавляет стандартные реквизиты (Description, LineNumber и т.п.)."""
+    if standard_attributes is None:
+        return
+    for elem in standard_attributes:
+        _write_attribute(writer, obj_id, elem.get('name'), table_part,
+                         (False, False, False, True, False), None)
+
+def write_object_attributes(root: ET.Element, obj_id: int, writer: BulkWriter) -> None:
+    """Добавляет в буферы writer реквизиты объекта из его XML описания.
+    
+    Читаются реквизиты, измерения, ресурсы, стандартные реквизиты и табличные
+    части с их реквизитами. Реквизиты табличной части получают table_part.
+    Синонимы объекта, реквизитов и табличных частей сохраняются в object_synonyms.
+    Элементы ищутся по полным именам с пространством имен корня: это быстрее
+    поиска по шаблону {*} на тысячах объектов.
+    """
+    ns = root.tag[:root.tag.index('}') + 1] if root.tag.startswith('{') else ''
+    properties_tag, name_tag, type_tag = f'{ns}Properties', f'{ns}Name', f'{ns}Type'
+    synonym_tag = f'{ns}Synonym'
+    standard_tag, children_tag = f'{ns}StandardAttributes', f'{ns}ChildObjects'
+    attribute_tag, tabular_tag = f'{ns}Attribute', f'{ns}TabularSection'
+    
+    for obj in root:
+        properties = obj.find(properties_tag)
+        if properties is not None:
+            _write_synonyms(writer, obj_id, None, properties.find(synonym_tag))
+            _write_standard_attributes(writer, obj_id, None, properties.find(standard_tag))
+        children = obj.find(children_tag)
+        if children is None:
+            continue
+        for elem in children:
+            tag = elem.tag[len(ns):]
+            if tag != 'TabularSection' and tag not in ATTRIBUTE_KINDS:
+                continue
+            properties = elem.find(properties_tag)
+            if properties is None:
+                continue
+            name = properties.findtext(name_tag)
+            if elem.tag != tabular_tag:
+                attr_id = _write_attribute(writer, obj_id, name, None, ATTRIBUTE_KINDS[tag] + (False, False),
+                                           properties.find(type_tag))
+                _write_synonyms(writer, obj_id, attr_id, properties.find(synonym_tag))
+                continue
+            attr_id = _write_attribute(writer, obj_id, name, None, (False, False, False, False, True), None)
+            _write_synonyms(writer, obj_id, attr_id, properties.find(synonym_tag))
+            _write_standard_attributes(writer, obj_id, name, properties.find(standard_tag))
+            for attribute in elem.iterfind(f'{children_tag}/{attribute_tag}'):
+                attr_properties = attribute.find(properties_tag)
+                if attr_properties is not None:
+                    attr_id = _write_attribute(writer, obj_id, attr_properties.findtext(name_tag), name,
+                                               (False, False, True, False, False), attr_properties.find(type_tag))
+                    _write_synonyms(writer, obj_id, attr_id, attr_properties.find(synonym_tag))
+
+def parse_object_attributes(obj_id: int, xml_path: str, conn: sqlite3.Connection,
+                            source: Optional[DirectorySource] = None,
+                            writer: Optional[BulkWriter] = None) -> None:
+    """Разбирает реквизиты и табличные части объекта из его XML описания."""
+    source = source or DEFAULT_SOURCE
+    own_writer = writer is None
+    writer = writer or BulkWriter(conn)
+    
+    try:
+        write_object_attributes(ET.fromstring(source.read_bytes(xml_path)), obj_id, writer)
+        if own_writer:
+            writer.commit()
+        logger.debug(f"Обработаны реквизиты объекта: {xml_path}")
+        
+    except Exception as e:
+        logger.error(f"Ошибка при разборе реквизитов {xml_path}: {e}")
+        raise
+
+def parse_form_and_code(obj_id: int, form_path: str, conn: sqlite3.Connection,
+                        source: Optional[DirectorySource] = None,
+                        writer: Optional[BulkWriter] = None) -> None:
     """Разбирает форму и её модуль."""
-    cursor = conn.cursor()
+    source = source or DEFAULT_SOURCE
+    own_writer = writer is None
+    writer = writer or BulkWriter(conn)
     
     try:
         # Получаем имя формы из пути
         form_name = os.path.basename(os.path.dirname(form_path))
         
-        # Читаем XML формы для получения синонима
-        tree = ET.parse(form_path)
-        root = tree.getroot()
-        
-        # Регистрируем пространство имен
-        ns = {'v8': 'http://v8.1c.ru/8.1/data/core'}
-        synonym = root.findtext(".//Properties/Synonym/v8:item/v8:content", namespaces=ns) or ""
-        
-        # Проверяем существование записи
-        cursor.execute("""
-            SELECT commands_templates_id FROM commands_templates 
-            WHERE commands_templates_owner = ? AND commands_templates_name = ?
-        """, (obj_id, form_name))
+        # Читаем XML формы потоково только ради синонима
+        synonym = extract_synonym(form_path, source) or ""
         
-        if not cursor.fetchone():
-            # Добавляем запись в commands_templates
-            cursor.execute("""
-                INSERT INTO commands_templates (
-                    commands_templates_owner, 
-                    commands_templates_name,
-                    commands_templates_is_form,
-                    commands_templates_is_templ,
-                    commands_templates_synonym
-                ) VALUES (?, ?, ?, ?, ?)
-            """, (obj_id, form_name, True, False, synonym))
-            
-            template_id = cursor.lastrowid
+        # Добавляем запись в commands_templates, если формы с таким именем у объекта еще нет
+        template_id = writer.upsert('commands_templates', (writer.next_id('commands_templates'), obj_id,
+                                                           form_name, True, False, synonym))
+        if template_id is not None:
             logger.debug(f"Добавлена форма: {form_name} (ID: {template_id})")
             
             # Проверяем наличие модуля формы
-            module_path = os.path.join(os.path.dirname(form_path), "Module.bsl")
-            if os.path.exists(module_path):
-                with open(module_path, 'r', encoding='utf-8-sig') as f:
-                    module_code = f.read()
+            module_path = source.join(os.path.dirname(form_path), "Module.bsl")
+            if source.exists(module_path):
+                blob, methods = parse_module_bytes(source.read_bytes(module_path))
                 
                 # Добавляем запись в code_body
-                cursor.execute("""
-                    INSERT INTO code_body (
-                        code_body_owner_id,
-                        code_body_name,
-                        code_body_module,
-                        code_body_module_type
-                    ) VALUES (?, ?, ?, ?)
-                """, (template_id, form_name, module_code, "МодульФормы"))
-                
-                code_body_id = cursor.lastrowid
+                code_body_id = writer.next_id('code_body')
+                blob_hash = write_module_blob(writer, blob)
+                writer.insert('code_body', (code_body_id, template_id, form_name, blob_hash,
+                                            "МодульФормы", obj_id))
                 logger.debug(f"Добавлен модуль формы для: {form_name} (ID: {code_body_id})")
                 
                 # Разбираем методы модуля
-                parse_methods(module_code, code_body_id, conn)
+                write_methods(methods, code_body_id, writer, check_existing=False)
             
-            conn.commit()
+            if own_writer:
+                writer.commit()
             logger.debug(f"Обработана форма: {form_name}")
         
     except Exception as e:
         logger.error(f"Ошибка при разборе формы {form_path}: {e}")
         raise
 
-def parse_methods(module_code: str, code_body_id: int, conn: sqlite3.Connection) -> None:
-    """Разбирает код модуля на методы."""
-    cursor = conn.cursor()
+def _is_child_object(path: Tuple[str, ...]) -> bool:
+    """Проверяет, что элемент - ChildObjects конфигурации или объект внутри него."""
+    return path[-2:] == ('Configuration', 'ChildObjects') or path[-3:-1] == ('Configuration', 'ChildObjects')
+
+# Запись о методе, полученная при разборе модуля
+MethodRecord = MethodHeader
+
+def extract_method_args(params_str: str) -> List[str]:
+    """Возвращает имена параметров метода из строки параметров."""
+    return split_params(params_str)
+
+def extract_methods(module_code: str) -> List[MethodRecord]:
+    """Находит методы модуля, не обращаясь к базе данных."""
+    return unique_methods(scan_methods(module_code))
+
+def unique_methods(headers: List[MethodHeader]) -> List[MethodRecord]:
+    """Оставляет из найденных методов модуля первые объявления каждого имени."""
+    methods: List[MethodRecord] = []
+    seen = set()
+    for method in headers:
+        # Повторные объявления метода с тем же именем не сохраняются
+        if method.name not in seen:
+            seen.add(method.name)
+            methods.append(method)
+    return methods
+
+# Кодировки модулей, которые разбираются по байтам (bsl.scan_module). В UTF-8 кириллица
+# занимает два байта на букву, и регулярное выражение по байтам медленнее декодирования
+# и разбора текста (benchmarks/bench_scan.py)
+BYTE_SCAN_ENCODINGS = ('cp1251',)
+
+def parse_module_bytes(data: ModuleBuffer,
+                       encodings: Iterable[str] = BYTE_SCAN_ENCODINGS) -> Tuple[ModuleBlob, List[MethodRecord]]:
+    """Сжимает текст модуля и находит его методы.
+    
+    Модули в кодировках encodings разбираются по байтам: декодируются только найденные
+    имена и параметры, а модуль в UTF-8 сжимается без декодирования. Остальные модули
+    декодируются целиком (decode_module) и разбираются по тексту.
+    """
+    scanned = scan_module(data, encodings)
+    if scanned is None:
+        # data[:] - bytes и для отображения файла в память
+        module_code = decode_module(data[:])
+        return pack_module(module_code), extract_methods(module_code)
+    encoding, bom, headers = scanned
+    if encoding == 'utf-8':
+        with memoryview(data) as view:
+            blob = pack_module_data(view[bom:])
+    else:
+        blob = pack_module(data[:].decode(encoding))
+    return blob, unique_methods(headers)
+
+def write_methods(methods: List[MethodRecord], code_body_id: int, writer: BulkWriter,
+                  check_existing: bool = True) -> None:
+    """Добавляет разобранные методы модуля и их параметры в буферы writer.
     
-    # Обновленные регулярные выражения для поиска процедур и функций с учетом экспорта
-    patterns = {
-        'function': r'(?:Функция|Function)\s+([a-zA-Zа-яА-Я0-9_]+)\s*\((.*?)\)(?:\s+Экспорт)?',
-        'procedure': r'(?:Процедура|Procedure)\s+([a-zA-Zа-яА-Я0-9_]+)\s*\((.*?)\)(?:\s+Экспорт)?'
-    }
+    check_existing=False допустимо только для только что созданного модуля.
+    """
+    existing = set()
+    if check_existing:
+        # Методы, уже сохраненные для модуля, повторно не добавляются
+        cursor = writer.conn.cursor()
+        cursor.execute("SELECT methods_name FROM methods WHERE methods_owner_id = ?", (code_body_id,))
+        existing = {row[0] for row in cursor.fetchall()}
     
-    try:
-        for method_type, pattern in patterns.items():
-            is_function = method_type == 'function'
-            
-            for match in re.finditer(pattern, module_code, re.IGNORECASE | re.MULTILINE):
-                method_name = match.group(1)
-                params_str = match.group(2)
-                # Проверяем наличие ключевого слова Экспорт
-                is_export = bool(re.search(r'\bЭкспорт\b|\bExport\b', match.group(0), re.IGNORECASE))
-                
-                # Проверяем существование метода
-                cursor.execute("""
-                    SELECT methods_id FROM methods 
-                    WHERE methods_owner_id = ? AND methods_name = ?
-                """, (code_body_id, method_name))
-                
-                if not cursor.fetchone():
-                    cursor.execute("""
-                        INSERT INTO methods (
-                            methods_owner_id,
-                            methods_name,
-                            methods_if_func,
-                            methods_is_export
-                        ) VALUES (?, ?, ?, ?)
-                    """, (code_body_id, method_name, is_function, is_export))
-                    
-                    method_id = cursor.lastrowid
-                    logger.debug(f"Добавлен метод: {method_name} (ID: {method_id}, Экспорт: {is_export})")
-                    
-                    # Разбираем параметры метода
-                    parse_method_args(method_id, params_str, method_name, conn)
+    for method in methods:
+        if method.name in existing:
+            continue
+        method_id = writer.next_id('methods')
+        writer.insert('methods', (
+            method_id, code_body_id, method.name, fold_name(method.name), method.is_function, method.is_export,
+            method.directive, method.start_line, method.end_line, method.start_offset, method.end_offset
+        ))
+        logger.debug(f"Добавлен метод: {method.name} (ID: {method_id}, Экспорт: {method.is_export})")
         
-        conn.commit()
+        for arg in method.args:
+            writer.insert('methods_args', (method_id, method.name, arg))
+        for module, name, line in method.calls:
+            writer.insert('method_calls', (method_id, module, name, line))
+
+def parse_methods(module_code: str, code_body_id: int, conn: sqlite3.Connection,
+                  writer: Optional[BulkWriter] = None) -> None:
+    """Разбирает код модуля на методы."""
+    own_writer = writer is None
+    writer = writer or BulkWriter(conn)
+    try:
+        writer.flush()
+        write_methods(extract_methods(module_code), code_body_id, writer)
+        if own_writer:
+            writer.commit()
     
     except Exception as e:
         logger.error(f"Ошибка при разборе методов модуля: {e}")
         raise
 
-def parse_method_args(method_id: int, params_str: str, method_name: str, conn: sqlite3.Connection) -> None:
+def parse_method_args(method_id: int, params_str: str, method_name: str, conn: sqlite3.Connection,
+                      writer: Optional[BulkWriter] = None) -> None:
     """Разбирает параметры метода."""
-    cursor = conn.cursor()
+    own_writer = writer is None
+    writer = writer or BulkWriter(conn)
     
     try:
-        if params_str.strip():
-            # Разбиваем строку параметров на отдельные параметры
-            params = [p.strip() for p in params_str.split(',')]
-            
-            for param in params:
-                # Убираем знаки экспорта и значения по умолчанию
-                param_name = param.split('=')[0].strip()
-                param_name = param_name.split(' ')[0].strip()
-                
-                # Проверяем существование параметра
-                cursor.execute("""
-                    SELECT methods_args_id FROM methods_args 
-                    WHERE methods_args_owner_id = ? AND methods_args_method_name = ? AND methods_args_arg_name = ?
-                """, (method_id, method_name, param_name))
-                
-                if not cursor.fetchone():
-                    cursor.execute("""
-                        INSERT INTO methods_args (
-                            methods_args_owner_id,
-                            methods_args_method_name,
-                            methods_args_arg_name
-                        ) VALUES (?, ?, ?)
-                    """, (method_id, method_name, param_name))
-                    
-                    logger.debug(f"Добавлен параметр {param_name} для метода {method_name}")
-    
-            conn.commit()
+        # Уже сохраненные параметры пропускаются при записи (ON CONFLICT DO NOTHING)
+        for param_name in extract_method_args(params_str):
+            writer.insert('methods_args', (method_id, method_name, param_name))
+            logger.debug(f"Добавлен параметр {param_name} для метода {method_name}")
+    
+        if own_writer:
+            writer.commit()
     
     except Exception as e:
         logger.error(f"Ошибка при разборе параметров метода {method_name}: {e}")
         raise
 
-def parse_module(module_path: str, template_id: int, module_type: str, conn: sqlite3.Connection) -> None:
+def parse_module(module_path: str, template_id: int, module_type: str, conn: sqlite3.Connection,
+                 source: Optional[DirectorySource] = None,
+                 writer: Optional[BulkWriter] = None) -> None:
     """Разбирает модуль и сохраняет его код."""
+    source = source or DEFAULT_SOURCE
+    own_writer = writer is None
+    writer = writer or BulkWriter(conn)
     cursor = conn.cursor()
     
     try:
-        with open(module_path, 'r', encoding='utf-8-sig') as f:
-            module_code = f.read()
+        blob, methods = parse_module_bytes(source.read_bytes(module_path))
+        writer.flush()
         
         # Получаем owner_id из commands_templates
         cursor.execute("""
@@ -336,286 +514,365 @@ def parse_module(module_path: str, template_id: int, module_type: str, conn: sql
         result = cursor.fetchone()
         owner_id = result[0] if result else None
         
-        # Проверяем существование записи в code_body
-        cursor.execute("""
-            SELECT code_body_id FROM code_body 
-            WHERE code_body_owner_id = ? AND code_body_module_type = ?
-        """, (template_id, module_type))
-        
-        if not cursor.fetchone():
-            cursor.execute("""
-                INSERT INTO code_body (
-                    code_body_owner_id,
-                    code_body_name,
-                    code_body_module,
-                    code_body_module_type,
-                    code_body_owner
-                ) VALUES (?, ?, ?, ?, ?)
-            """, (template_id, os.path.basename(module_path), module_code, module_type, owner_id))
-            
-            code_body_id = cursor.lastrowid
+        # Добавляем модуль, если у формы/команды еще нет модуля этого типа
+        code_body_id = writer.upsert('code_body', (writer.next_id('code_body'), template_id,
+                                                   os.path.basename(module_path), blob[0], module_type, owner_id))
+        if code_body_id is not None:
+            write_module_blob(writer, blob)
             logger.debug(f"Добавлен модуль типа {module_type} (ID: {code_body_id})")
             
             # Разбираем методы модуля
-            parse_methods(module_code, code_body_id, conn)
-        conn.commit()            
+            write_methods(methods, code_body_id, writer, check_existing=False)
+        if own_writer:
+            writer.commit()
     except Exception as e:
         logger.error(f"Ошибка при разборе модуля {module_path}: {e}")
-        conn.rollback()
+        writer.rollback()
         raise
 
 def analyze_object(cursor: sqlite3.Cursor, obj_type: str, obj_name: str) -> None:
-    """Анализирует структуру объекта метаданных и выводит подробную информацию."""
-    eng_type = get_type_en(obj_type)
-    if not eng_type:
+    """Анализирует структуру объекта метаданных и выводит подробную информацию (см. reports.object_report)."""
+    report = object_report(cursor.connection, obj_type, obj_name)
+    if report is None:
         print(f"Тип объекта {obj_type} не найден")
         return
+    print_object_report(report)
+
+# Каталоги объекта, подкаталоги которых содержат формы, макеты и команды:
+# имя каталога -> (признак формы, признак макета)
+TEMPLATE_FOLDERS = {
+    'Forms': (True, False),
+    'Templates': (False, True),
+    'Commands': (False, False)
+}
+
+def _get_template_id(writer: BulkWriter, templates_map: Dict[Tuple[int, str, str], int],
+                     owner_id: int, folder: str, name: str, synonym: Optional[str] = None) -> int:
+    """Возвращает идентификатор формы/макета/команды, создавая запись при необходимости."""
+    key = (owner_id, folder, name)
+    template_id = templates_map.get(key)
+    if template_id is None:
+        # Одним запросом: новая запись или идентификатор существующей (с обновленным синонимом)
+        is_form, is_templ = TEMPLATE_FOLDERS[folder]
+        template_id = writer.upsert('commands_templates', (writer.next_id('commands_templates'), owner_id, name,
+                                                           is_form, is_templ, synonym),
+                                    update=('commands_templates_synonym',))
+        templates_map[key] = template_id
+    elif synonym:
+        writer.flush()
+        cursor = writer.conn.cursor()
+        cursor.execute('''
+            UPDATE commands_templates SET commands_templates_synonym = ?
+            WHERE commands_templates_id = ?''', (synonym, template_id))
+    return template_id
+
+def build_owner_index(conn: sqlite3.Connection) -> Dict[Tuple[str, str], int]:
+    """Возвращает индекс объектов по пути: (каталог типа, имя объекта) -> obj_id."""
+    cursor = conn.cursor()
+    cursor.execute("SELECT obj_id, obj_type, obj_name FROM objects")
+    owner_index = {}
+    for obj_id, obj_type, obj_name in cursor.fetchall():
+        eng_folder = get_english_folder(obj_type)
+        if eng_folder:
+            owner_index[(eng_folder, obj_name)] = obj_id
+    return owner_index
+
+def resolve_owner(owner_index: Dict[Tuple[str, str], int], parts: List[str]) -> Optional[int]:
+    """Находит объект-владелец по компонентам относительного пути: <Каталог типа>/<Объект>/..."""
+    if len(parts) < 2:
+        return None
+    return owner_index.get((parts[0], parts[1]))
+
+# Результат разбора файла модуля: (тип модуля, сжатый текст модуля, методы, SHA-1 файла)
+ModuleRecord = Tuple[str, ModuleBlob, List[MethodRecord], str]
+
+def read_module_file(task: Tuple[DirectorySource, str, str]) -> Tuple[str, bytes]:
+    """Читает файл модуля: (относительный путь, содержимое)."""
+    source, file_path, rel_file = task
+    return rel_file, source.read_bytes(file_path)
+
+def parse_module_file(task: Tuple[DirectorySource, str, str]) -> ModuleRecord:
+    """Читает и разбирает файл модуля, не обращаясь к базе данных."""
+    return parse_module_data(read_module_file(task))
+
+def parse_module_data(item: Tuple[str, bytes]) -> ModuleRecord:
+    """Разбирает прочитанный файл модуля, не обращаясь к базе данных.
     
-    print(f"\n=== Поиск объекта типа {eng_type} с именем/синонимом '{obj_name}' ===")
-    
-    # Ищем объект по имени или синониму
-    cursor.execute("""
-        SELECT o.obj_id, o.obj_name,
-               (SELECT pav.predefined_attrs_values_val 
-                FROM predefined_attrs_values pav
-                JOIN predefined_attrs pa ON pa.predefined_attrs_id = pav.predefined_attrs_values_atr
-                JOIN obj_attributes a ON a.obj_attr_id = pa.predefined_attrs_owner
-                WHERE a.obj_attr_owner = o.obj_id 
-                AND pa.predefined_attrs_name = 'Synonym'
-                LIMIT 1) as synonym
-        FROM objects o
-        WHERE o.obj_type = ? 
-        AND (o.obj_name LIKE ? 
-             OR EXISTS (
-                 SELECT 1 
-                 FROM predefined_attrs_values pav
-                 JOIN predefined_attrs pa ON pa.predefined_attrs_id = pav.predefined_attrs_values_atr
-                 JOIN obj_attributes a ON a.obj_attr_id = pa.predefined_attrs_owner
-                 WHERE a.obj_attr_owner = o.obj_id 
-                 AND pa.predefined_attrs_name = 'Synonym'
-                 AND pav.predefined_attrs_values_val LIKE ?
-             ))
-    """, (obj_type, f"%{obj_name}%", f"%{obj_name}%"))
-    
-    results = cursor.fetchall()
-    
-    if not results:
-        print(f"Объект не найден")
-        return
-        
-    if len(results) > 1:
-        print("\nНайдено несколько объектов:")
-        for row in results:
-            synonym = f" ({row[2]})" if row[2] else ""
-            print(f"- {row[1]}{synonym}")
-        return
-        
-    obj_id = results[0][0]
-    obj_full_name = results[0][1]
-    obj_synonym = f" ({results[0][2]})" if results[0][2] else ""
-    
-    print(f"\n=== Информация об объекте {obj_full_name}{obj_synonym} ===")
-    
-    # Получаем реквизиты объекта
-    cursor.execute("""
-        SELECT a.prop_name, a.table_part,
-               (SELECT pav.predefined_attrs_values_val 
-                FROM predefined_attrs_values pav
-                JOIN predefined_attrs pa ON pa.predefined_attrs_id = pav.predefined_attrs_values_atr
-                WHERE pa.predefined_attrs_owner = a.obj_attr_id 
-                AND pa.predefined_attrs_name = 'Synonym'
-                LIMIT 1) as synonym,
-               GROUP_CONCAT(
-                   CASE 
-                       WHEN t.is_configuration_type = 1 THEN t.type_body 
-                       ELSE t.type_class_ru 
-                   END
-               ) as types
-        FROM obj_attributes a
-        LEFT JOIN obj_attr_types t ON t.obj_attr_type_owner = a.obj_attr_id
-        WHERE a.obj_attr_owner = ? AND a.is_attribute = 1
-        GROUP BY a.prop_name, a.table_part
-        ORDER BY a.table_part NULLS FIRST, a.prop_name
-    """, (obj_id,))
-    
-    attributes = cursor.fetchall()
-    if attributes:
-        print("\nРеквизиты объекта:")
-        current_table = None
-        for attr in attributes:
-            prop_name = attr[0]
-            table_part = attr[1]
-            synonym = f" ({attr[2]})" if attr[2] else ""
-            types = f" - {attr[3]}" if attr[3] else ""
-            
-            if table_part != current_table:
-                current_table = table_part
-                if current_table:
-                    cursor.execute("""
-                        SELECT pav.predefined_attrs_values_val 
-                        FROM predefined_attrs_values pav
-                        JOIN predefined_attrs pa ON pa.predefined_attrs_id = pav.predefined_attrs_values_atr
-                        JOIN obj_attributes a ON a.obj_attr_id = pa.predefined_attrs_owner
-                        WHERE a.obj_attr_owner = ? 
-                        AND a.prop_name = ?
-                        AND pa.predefined_attrs_name = 'Synonym'
-                        LIMIT 1
-                    """, (obj_id, current_table))
-                    table_synonym = cursor.fetchone()
-                    table_synonym_str = f" ({table_synonym[0]})" if table_synonym else ""
-                    print(f"\nТабличная часть '{current_table}'{table_synonym_str}:")
-            
-            print(f"  - {prop_name}{synonym}{types}")
-            
-    # Для документов добавляем специфичную информацию
-    if obj_type == 'Document':
-        # Получаем основания документа
-        cursor.execute("""
-            SELECT based_on_name FROM based_on 
-            WHERE based_on_owner = ?
-            ORDER BY based_on_name
-        """, (obj_id,))
-        based_on = cursor.fetchall()
-        if based_on:
-            print("\nОснования документа:")
-            for base in based_on:
-                print(f"  - {base[0]}")
-                
-        # Получаем регистры, в которые пишет документ
-        cursor.execute("""
-            SELECT register_records_name FROM register_records 
-            WHERE register_records_owner = ?
-            ORDER BY register_records_name
-        """, (obj_id,))
-        registers = cursor.fetchall()
-        if registers:
-            print("\nРегистры, в которые пишет документ:")
-            for reg in registers:
-                print(f"  - {reg[0]}")
-                
-    # Получаем методы объекта
-    cursor.execute("""
-        SELECT m.methods_name, m.methods_if_func, m.methods_is_export
-        FROM methods m
-        JOIN code_body cb ON m.methods_owner_id = cb.code_body_id
-        WHERE cb.code_body_owner_id = ?
-        ORDER BY m.methods_name
-    """, (obj_id,))
-    
-    methods = cursor.fetchall()
-    if methods:
-        print("\nМетоды объекта:")
-        for method in methods:
-            method_type = "Функция" if method[1] else "Процедура"
-            export_mark = " Экспорт" if method[2] else ""
-            print(f"  - {method_type} {method[0]}(){export_mark}")
-
-def analyze_directory(base_path: str, conn: sqlite3.Connection) -> None:
-    """Анализирует структуру каталогов конфигурации."""
+    Выполняется как в основном процессе, так и в потоке и процессах пула конвейера
+    (analyze_directory, queue_size > 0 или jobs > 1).
+    """
+    rel_file, data = item
+    # Текст сжимается здесь же, чтобы при jobs > 1 сжатие выполнялось в процессах пула
+    blob, methods = parse_module_bytes(data)
+    return determine_module_type(rel_file), blob, methods, hashlib.sha1(data).hexdigest()
+
+def analyze_directory(base_path: str, conn: sqlite3.Connection,
+                      source: Optional[DirectorySource] = None, jobs: int = 1,
+                      writer: Optional[BulkWriter] = None, incremental: bool = False,
+                      queue_size: int = DEFAULT_QUEUE_SIZE) -> int:
+    """Анализирует структуру каталогов конфигурации.
+    
+    Каталог может находиться как на диске, так и внутри zip архива (см. open_vcv).
+    Модули обрабатываются конвейером (см. pipeline.Pipeline): файлы читает отдельный поток,
+    разбирает второй поток или, при jobs > 1, пул из jobs процессов, а запись в базу
+    выполняет только текущий поток. Очереди между этапами вмещают queue_size элементов;
+    при queue_size=0 модули читаются, разбираются и записываются по очереди в текущем потоке
+    (при jobs > 1 - разбираются в пуле без ограничения очереди).
+    Если writer не передан, все строки записываются и фиксируются одной транзакцией.
+    
+    Из описаний объектов (<Каталог типа>/<Объект>.xml) загружаются реквизиты
+    и табличные части (obj_attributes, obj_attr_types).
+    
+    Для каждого модуля и описания формы или объекта сохраняется SHA-1 содержимого (file_hashes).
+    При incremental=True повторно разбираются только добавленные и измененные файлы.
+    При любом повторном импорте данные файлов, удаленных из выгрузки, удаляются из базы.
+    
+    Возвращает количество загруженных и удаленных файлов: 0 означает, что импорт
+    ничего не изменил и графы и индексы, построенные по базе, можно не перестраивать.
+    """
+    source = source or DEFAULT_SOURCE
+    own_writer = writer is None
+    writer = writer or BulkWriter(conn)
     cursor = conn.cursor()
     
     # Находим корневой каталог конфигурации
-    root_path = find_configuration_root(base_path)
-    if not root_path:
+    root_path = find_configuration_root(base_path, source)
+    if root_path is None:
         raise ValueError("Не найден корневой каталог конфигурации (Configuration.xml)")
     
-    # Получаем словарь соответствия путей и obj_id
-    cursor.execute("SELECT obj_id, obj_type, obj_name FROM objects")
-    objects_map = {}
-    for row in cursor.fetchall():
-        obj_id, obj_type, obj_name = row
-        eng_folder = get_english_folder(obj_type)
-        if eng_folder:
-            objects_map[f"{eng_folder}/{obj_name}"] = obj_id
+    # Если объекты конфигурации еще не загружены, загружаем их из Configuration.xml
+    writer.flush()
+    cursor.execute("SELECT COUNT(*) FROM objects")
+    if cursor.fetchone()[0] == 0:
+        parse_configuration(source.join(root_path, "Configuration.xml"), conn, source, writer)
+        writer.flush()
     
-    for root, dirs, files in os.walk(base_path):
-        try:
-            rel_path = os.path.relpath(root, base_path)
-            if rel_path == '.':
-                continue
+    # Загрузка в пустую базу: индексы таблиц модулей и методов строятся один раз после нее
+    cursor.execute("SELECT NOT EXISTS (SELECT 1 FROM code_body)")
+    bulk_load = bool(cursor.fetchone()[0])
+    if bulk_load:
+        drop_indexes(conn, BULK_LOAD_INDEXES)
+    
+    # Индекс владельцев по первым двум компонентам пути
+    owner_index = build_owner_index(conn)
+    type_folders = {folder for folder, _ in owner_index}
+    
+    templates_map: Dict[Tuple[int, str, str], int] = {}
+    # Объекты, реквизиты которых уже загружены: при изменении описания они загружаются заново
+    cursor.execute("SELECT DISTINCT obj_attr_owner FROM obj_attributes")
+    described = {row[0] for row in cursor.fetchall()}
+    described_count = 0
+    templates_count = 0
+    # Найденные модули: (путь к файлу, относительный путь, объект, форма/команда)
+    modules: List[Tuple[str, str, int, Optional[int]]] = []
+    # Хеши предыдущего импорта; модули измененных и удаленных файлов удаляются.
+    # Повторный импорт без incremental заменяет прежние модули тех же файлов
+    known = load_file_hashes(conn) if incremental or not bulk_load else {}
+    seen = set()
+    stale_modules: List[int] = []
+    
+    def is_unchanged(rel_file: str, sha1: str) -> bool:
+        """Проверяет файл по сохраненному хешу и отмечает устаревший модуль."""
+        seen.add(rel_file)
+        old = known.get(rel_file)
+        if old is None:
+            return False
+        if old[0] == sha1:
+            return True
+        if old[1] is not None:
+            stale_modules.append(old[1])
+        return False
+    
+    walked_files = 0
+    walked_bytes = 0
+    with stage('directory_walk'):
+        for root, dirs, files in source.walk(root_path):
+            walked_files += len(files)
+            try:
+                rel_path = source.relpath(root, root_path)
+                if rel_path == '.':
+                    # Не спускаемся в каталоги, не относящиеся к загруженным объектам
+                    dirs[:] = [d for d in dirs if d in type_folders]
+                    continue
+                rel_path = rel_path.replace(os.sep, '/')
+                parts = source.split(rel_path)
+                if len(parts) == 1:
+                    dirs[:] = [d for d in dirs if (parts[0], d) in owner_index]
+                    # Описания объектов: <Каталог типа>/<Объект>.xml
+                    for file in files:
+                        obj_id = owner_index.get((parts[0], os.path.splitext(file)[0]))
+                        if obj_id is None or not file.endswith(".xml"):
+                            continue
+                        rel_file = f"{rel_path}/{file}"
+                        data = source.read_bytes(source.join(root, file))
+                        walked_bytes += len(data)
+                        sha1 = hashlib.sha1(data).hexdigest()
+                        if is_unchanged(rel_file, sha1):
+                            continue
+                        if obj_id in described:
+                            writer.flush()
+                            delete_object_attributes(conn, [obj_id])
+                        # Описание объекта невелико и уже прочитано ради хеша - разбираем его целиком
+                        write_object_attributes(ET.fromstring(data), obj_id, writer)
+                        writer.insert('file_hashes', (rel_file, sha1, None))
+                        described.add(obj_id)
+                        described_count += 1
+                    continue
             
-            # Находим владельца (объект) для текущей директории
-            owner_id = None
-            for obj_path, obj_id in objects_map.items():
-                if obj_path in rel_path:
-                    owner_id = obj_id
-                    break
-                    
-            if owner_id is None:
-                continue
+                # Находим владельца (объект) для текущей директории: <Каталог типа>/<Объект>/...
+                owner_id = resolve_owner(owner_index, parts)
+                if owner_id is None:
+                    continue
             
-            for file in files:
-                try:
-                    file_path = os.path.join(root, file)
-                    if file.endswith(".xml"):
-                        synonym = extract_synonym(file_path)
-                        cursor.execute('''
-                            INSERT OR IGNORE INTO commands_templates (
-                            commands_templates_owner,
-                            commands_templates_name,
-                            commands_templates_is_form,
-                            commands_templates_is_templ,
-                            commands_templates_synonym
-                            ) VALUES (?, ?, ?, ?, ?)''',
-                            (owner_id, os.path.splitext(file)[0],
-                            'Форма' in file, 'Макет' in file, synonym))
-                        conn.commit()
-                
-                        cursor.execute('''
-                            SELECT commands_templates_id 
-                            FROM commands_templates 
-                            WHERE commands_templates_owner = ? 
-                            AND commands_templates_name = ?''',
-                            (owner_id, os.path.splitext(file)[0]))
-                        result = cursor.fetchone()
-                        if result is None:
-                            continue
-                        template_id = result[0]
+                # <Каталог типа>/<Объект>/Forms/<Форма>/...
+                in_template = len(parts) >= 4 and parts[2] in TEMPLATE_FOLDERS
+            
+                for file in files:
+                    try:
+                        file_path = source.join(root, file)
+                        rel_file = f"{rel_path}/{file}"
+                        if file.endswith(".xml"):
+                            # Описание формы, макета или команды: <Каталог типа>/<Объект>/Forms/<Форма>.xml
+                            if len(parts) == 3 and parts[2] in TEMPLATE_FOLDERS:
+                                data = source.read_bytes(file_path)
+                                walked_bytes += len(data)
+                                sha1 = hashlib.sha1(data).hexdigest()
+                                if is_unchanged(rel_file, sha1):
+                                    continue
+                                # Файл уже прочитан ради хеша: синоним берем из начала его содержимого
+                                try:
+                                    synonym = first_synonym(read_synonyms(io.BytesIO(data)))
+                                except ET.ParseError:
+                                    logger.warning(f"Ошибка парсинга XML файла: {file_path}")
+                                    synonym = None
+                                _get_template_id(writer, templates_map, owner_id,
+                                                 parts[2], os.path.splitext(file)[0], synonym)
+                                writer.insert('file_hashes', (rel_file, sha1, None))
+                                templates_count += 1
                         
-                    elif file.endswith(".bsl"):
-                        module_code = ""
-                        module_type = determine_module_type(file_path)
-                        try:
-                            with open(file_path, 'r', encoding='utf-8') as f:
-                                module_code = f.read()
-                        except UnicodeDecodeError:
-                            with open(file_path, 'r', encoding='windows-1251') as f:
-                                module_code = f.read()
-                        try:
-                            cursor.execute('''
-                                INSERT OR IGNORE INTO code_body (
-                                code_body_owner_id,
-                                code_body_module,
-                                code_body_module_type                                        ) VALUES (?, ?, ?)''',
-                            (template_id, module_code, module_type))
-                            conn.commit()
-                        except sqlite3.OperationalError as e:
-                            logger.error(f"Ошибка при добавлении записи в таблицу code_body: {e}")
-                            conn.rollback()
-                            raise
-                
-                        try:
-                            cursor.execute('''
-                                SELECT code_body_id 
-                                FROM code_body 
-                                WHERE code_body_owner_id = ? 
-                                AND code_body_module_type = ?''',
-                                (template_id, module_type))
-                            result = cursor.fetchone()
-                            if result is None:
+                        elif file.endswith(".bsl"):
+                            if incremental and is_unchanged(
+                                    rel_file, hashlib.sha1(source.read_bytes(file_path)).hexdigest()):
                                 continue
-                            code_body_id = result[0]        
-                            parse_methods(module_code, code_body_id, conn)
-                            conn.commit()
-                        except sqlite3.OperationalError as e:
-                            logger.error(f"Ошибка при добавлении записи в таблицу code_body: {e}")
-                            conn.rollback()
-                            raise
-                except Exception as e:
-                    logger.error(f"Ошибка при обработке файла {file}: {e}")
-                    raise
-        except Exception as e:
-            logger.error(f"Ошибка при обработке каталога {root}: {e}")
-            raise
+                            # Модули форм и команд принадлежат форме/команде, модули объекта - только объекту
+                            template_id = None
+                            if in_template:
+                                template_id = _get_template_id(writer, templates_map, owner_id,
+                                                               parts[2], parts[3])
+                            if not incremental and not bulk_load:
+                                seen.add(rel_file)
+                                stale_modules.extend(_replaced_modules(cursor, known, rel_file, template_id))
+                            modules.append((file_path, rel_file, owner_id, template_id))
+                    except Exception as e:
+                        logger.error(f"Ошибка при обработке файла {file}: {e}")
+                        raise
+            except Exception as e:
+                logger.error(f"Ошибка при обработке каталога {root}: {e}")
+                raise
+    count_items('directory_walk', walked_files, walked_bytes)
+    logger.info(f"Загружены реквизиты объектов: {described_count}")
+    
+    stale_paths: List[str] = []
+    if incremental or known:
+        # Файлы, исчезнувшие из выгрузки, удаляются и при повторном импорте без incremental
+        stale_paths = [rel_file for rel_file in known if rel_file not in seen]
+        stale_objects = []
+        for rel_file in stale_paths:
+            if known[rel_file][1] is not None:
+                stale_modules.append(known[rel_file][1])
+            stale_parts = rel_file.split('/')
+            if len(stale_parts) == 2:
+                # Удалено описание объекта - удаляем его реквизиты
+                obj_id = owner_index.get((stale_parts[0], os.path.splitext(stale_parts[1])[0]))
+                if obj_id is not None:
+                    stale_objects.append(obj_id)
+        if incremental:
+            logger.info(f"Инкрементальный импорт: изменено или добавлено модулей - {len(modules)}, "
+                        f"удалено файлов - {len(stale_paths)}")
+        else:
+            logger.info(f"Повторный импорт: заменяются прежние модули - {len(stale_modules)}, "
+                        f"удалено файлов - {len(stale_paths)}")
+        writer.flush()
+        delete_modules(conn, stale_modules)
+        delete_object_attributes(conn, stale_objects)
+        forget_files(conn, stale_paths)
+    elif stale_modules:
+        # База без сохраненных хешей: модули форм и команд найдены по естественному ключу
+        logger.info(f"Повторный импорт: заменяются прежние модули - {len(stale_modules)}")
+        writer.flush()
+        delete_modules(conn, stale_modules)
+    
+    tasks = [(source, file_path, rel_file) for file_path, rel_file, _, _ in modules]
+    try:
+        # Время записи в базу (db_flush) из времени разбора модулей исключается
+        with stage('module_parse'):
+            if queue_size > 0 and tasks:
+                if jobs > 1:
+                    logger.info(f"Разбор {len(tasks)} модулей в {jobs} процессах")
+                pipeline = Pipeline(read_module_file, parse_module_data, jobs, queue_size)
+                # closing: потоки конвейера останавливаются и при ошибке записи
+                with closing(pipeline.run(tasks)) as records:
+                    _write_modules(writer, modules, records)
+                pipeline.log_stats()
+                record_queues(pipeline.stats())
+            elif jobs > 1 and len(tasks) > 1:
+                logger.info(f"Разбор {len(tasks)} модулей в {jobs} процессах")
+                with ProcessPoolExecutor(max_workers=jobs) as pool:
+                    chunksize = max(1, min(64, len(tasks) // (jobs * 4)))
+                    _write_modules(writer, modules, pool.map(parse_module_file, tasks, chunksize=chunksize))
+            else:
+                _write_modules(writer, modules, map(parse_module_file, tasks))
+        if stale_modules:
+            # Тексты удаленных и измененных модулей, которые больше ни на что не ссылаются
+            writer.flush()
+            logger.info(f"Удалено неиспользуемых текстов модулей: {delete_unused_blobs(conn)}")
+            writer.forget_unique_keys('module_blobs')
+        # Закэшированные отчеты по объектам (reports.object_report) устаревают
+        writer.flush()
+        next_import_generation(conn)
+        if bulk_load:
+            writer.flush()
+            with stage('indexes'):
+                create_indexes(conn, BULK_LOAD_INDEXES)
+        if own_writer:
+            writer.commit()
+    except sqlite3.Error as e:
+        logger.error(f"Ошибка при записи модулей: {e}")
+        writer.rollback()
+        raise
+    return len(modules) + described_count + templates_count + len(stale_paths)
 
+def _replaced_modules(cursor: sqlite3.Cursor, known: Dict[str, Tuple[str, Optional[int]]],
+                      rel_file: str, template_id: Optional[int]) -> List[int]:
+    """Возвращает модули, которые заменяет модуль файла при повторном импорте без incremental.
+    
+    Модуль находится по пути файла (file_hashes), а модуль формы или команды в базе без
+    сохраненных хешей - по естественному ключу code_body (форма/команда, тип модуля).
+    """
+    old = known.get(rel_file)
+    if old is not None and old[1] is not None:
+        return [old[1]]
+    if template_id is None:
+        return []
+    cursor.execute(
+        "SELECT code_body_id FROM code_body WHERE code_body_owner_id = ? AND code_body_module_type = ?",
+        (template_id, determine_module_type(rel_file))
+    )
+    return [row[0] for row in cursor.fetchall()]
 
+def _write_modules(writer: BulkWriter, modules: List[Tuple[str, str, int, Optional[int]]],
+                   records: Iterable[ModuleRecord]) -> None:
+    """Добавляет разобранные модули в буферы writer в порядке обхода каталогов."""
+    parsed = 0
+    parsed_bytes = 0
+    for (file_path, rel_file, owner_id, template_id), record in zip(modules, records):
+        module_type, blob, methods, sha1 = record
+        parsed += 1
+        parsed_bytes += blob[1]
+        code_body_id = writer.next_id('code_body')
+        blob_hash = write_module_blob(writer, blob)
+        writer.insert('code_body', (code_body_id, template_id, os.path.splitext(os.path.basename(rel_file))[0],
+                                    blob_hash, module_type, owner_id))
+        write_methods(methods, code_body_id, writer, check_existing=False)
+        writer.insert('file_hashes', (rel_file, sha1, code_body_id))
+    count_items('module_parse', parsed, parsed_bytes)
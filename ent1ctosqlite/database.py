@@ -1,12 +1,129 @@
+import os
 import sqlite3
 import logging
-from typing import Optional
+import tempfile
+from urllib.parse import quote
+from typing import Dict, Iterable, List, Optional, Tuple
+from .search import delete_from_fts_index
+from .blobs import register_functions
+from .ingest import NATURAL_KEYS
+from .utils import fold_name
 
-logger = logging.getLogger('vcv_parser')
+logger = logging.getLogger('ent1ctosqlite')
+
+# Наименьшая поддерживаемая версия SQLite: INSERT ... ON CONFLICT (3.24) и
+# ORDER BY ... NULLS FIRST (3.30, reports.py). Без INSERT ... RETURNING (3.35)
+# BulkWriter.upsert обходится отдельными запросами; индексу имен (names.py)
+# нужен токенизатор trigram FTS5 (3.34)
+MIN_SQLITE_VERSION = (3, 30, 0)
+
+# Индексы для поиска по внешним ключам и именам: имя -> (таблица, колонки).
+# Ограничения UNIQUE(<первичный ключ>, ...) в описаниях таблиц начинаются с первичного
+# ключа, поэтому для поиска по другим колонкам не годятся. Колонки индексов подобраны
+# так, чтобы основные запросы (поиск методов модуля, форм объекта, реквизитов объекта)
+# читали только индекс. Индексы uq_<таблица> - уникальные, по естественным ключам
+# таблиц (ingest.NATURAL_KEYS): на них опираются INSERT ... ON CONFLICT в BulkWriter.
+INDEXES: Dict[str, Tuple[str, Tuple[str, ...]]] = {
+    'uq_objects': ('objects', NATURAL_KEYS['objects']),
+    'uq_commands_templates': ('commands_templates', NATURAL_KEYS['commands_templates']),
+    'uq_code_body': ('code_body', NATURAL_KEYS['code_body']),
+    'uq_methods': ('methods', NATURAL_KEYS['methods']),
+    'uq_methods_args': ('methods_args', NATURAL_KEYS['methods_args']),
+    'idx_methods_name_folded': ('methods', ('methods_name_folded',)),
+    'idx_obj_attributes_owner': ('obj_attributes', ('obj_attr_owner', 'is_attribute', 'table_part', 'prop_name')),
+    'idx_obj_attr_types_owner': ('obj_attr_types', ('obj_attr_type_owner',)),
+    'idx_object_synonyms_owner': ('object_synonyms', ('object_synonyms_owner', 'object_synonyms_attr',
+                                                      'object_synonyms_position')),
+    'idx_object_synonyms_attr': ('object_synonyms', ('object_synonyms_attr', 'object_synonyms_position')),
+    'idx_code_body_owner': ('code_body', ('code_body_owner', 'code_body_name')),
+    'idx_code_body_blob': ('code_body', ('code_body_blob',)),
+    'idx_predefined_attrs_owner': ('predefined_attrs', ('predefined_attrs_owner', 'predefined_attrs_name')),
+    'idx_predefined_attrs_values_atr': ('predefined_attrs_values', ('predefined_attrs_values_atr',)),
+    'idx_predefined_attrs_values_owner': ('predefined_attrs_values', ('predefined_attrs_values_owner',)),
+    'idx_register_records_owner': ('register_records', ('register_records_owner',)),
+    'idx_based_on_owner': ('based_on', ('based_on_owner',)),
+    'idx_file_hashes_code_body': ('file_hashes', ('file_hashes_code_body',)),
+    'idx_method_calls_caller': ('method_calls', ('method_calls_caller',)),
+    'idx_method_calls_callee_caller': ('method_calls', ('method_calls_callee', 'method_calls_caller')),
+}
+
+UNIQUE_INDEXES = {name for name in INDEXES if name.startswith('uq_')}
+
+# Таблицы и индексы прежних версий, которые удаляет check_and_update_database_structure:
+# транзитивное замыкание графа вызовов (теперь его заменяет запрос callgraph.get_callers)
+# и индекс вызовов, который заменил idx_method_calls_callee_caller
+OBSOLETE_TABLES = ['method_callers']
+OBSOLETE_INDEXES = ['idx_method_calls_callee']
+
+# Таблицы, которые создаются не create_database, а при построении индексов поиска:
+# полнотекстового (search.py, с теневыми таблицами FTS5) и индекса имен (names.py)
+ON_DEMAND_TABLE_PREFIXES = ('code_fts', 'name_')
+
+# Индексы таблиц, которые при загрузке в пустую базу только пополняются и не читаются:
+# analyze_directory удаляет их перед загрузкой и строит один раз после нее.
+# Уникальные индексы остаются: без них ON CONFLICT не находит естественный ключ
+BULK_LOAD_INDEXES = [
+    name for name, (table, _) in INDEXES.items()
+    if table in ('obj_attr_types', 'code_body', 'methods', 'methods_args', 'method_calls', 'file_hashes')
+    and name not in UNIQUE_INDEXES
+]
+
+def create_indexes(conn: sqlite3.Connection, names: Optional[Iterable[str]] = None) -> int:
+    """Создает отсутствующие индексы (по умолчанию - все INDEXES); возвращает количество созданных.
+    
+    Индекс старой базы, колонки которого отличаются от описания в INDEXES, пересоздается.
+    Индексы по колонкам, которых еще нет в таблице старой базы, пропускаются:
+    их создаст check_and_update_database_structure после добавления колонок.
+    Уникальный индекс не создается, если в старой базе уже есть строки
+    с повторяющимся естественным ключом.
+    """
+    cursor = conn.cursor()
+    cursor.execute("SELECT name FROM sqlite_master WHERE type = 'index'")
+    existing = {row[0] for row in cursor.fetchall()}
+    columns: Dict[str, set] = {}
+    created = 0
+    for name in (INDEXES if names is None else names):
+        table, index_columns = INDEXES[name]
+        if name in existing:
+            cursor.execute(f"PRAGMA index_info({name})")
+            if tuple(row[2] for row in sorted(cursor.fetchall())) == index_columns:
+                continue
+            logger.info(f"Пересоздание индекса {name} по колонкам {', '.join(index_columns)}")
+            cursor.execute(f"DROP INDEX {name}")
+        if table not in columns:
+            cursor.execute(f"PRAGMA table_info({table})")
+            columns[table] = {row[1] for row in cursor.fetchall()}
+        if not set(index_columns) <= columns[table]:
+            logger.debug(f"Индекс {name} пропущен: в таблице {table} нет нужных колонок")
+            continue
+        unique = 'UNIQUE ' if name in UNIQUE_INDEXES else ''
+        try:
+            cursor.execute(f"CREATE {unique}INDEX {name} ON {table}({', '.join(index_columns)})")
+        except sqlite3.IntegrityError:
+            logger.warning(f"Индекс {name} не создан: в таблице {table} есть строки с одинаковыми "
+                           f"значениями {', '.join(index_columns)}; импортируйте конфигурацию в новую базу")
+            continue
+        created += 1
+    return created
+
+def drop_indexes(conn: sqlite3.Connection, names: Iterable[str]) -> None:
+    """Удаляет индексы перед массовой загрузкой."""
+    cursor = conn.cursor()
+    for name in names:
+        cursor.execute(f"DROP INDEX IF EXISTS {name}")
+
+def check_sqlite_version() -> None:
+    """Проверяет, что библиотека SQLite не старше MIN_SQLITE_VERSION."""
+    if sqlite3.sqlite_version_info < MIN_SQLITE_VERSION:
+        required = '.'.join(map(str, MIN_SQLITE_VERSION))
+        logger.error(f"Нужна SQLite {required} или новее, Python использует SQLite {sqlite3.sqlite_version}")
+        raise RuntimeError(f"SQLite {sqlite3.sqlite_version} старше {required}")
 
 def create_database(conn: sqlite3.Connection) -> sqlite3.Connection:
     """Создаёт базу данных SQLite и основные таблицы."""
+    check_sqlite_version()
     cursor = conn.cursor()
+    register_functions(conn)
     
     # Таблица объектов конфигурации
     cursor.execute('''
@@ -50,6 +167,19 @@ def create_database(conn: sqlite3.Connection) -> sqlite3.Connection:
         )
     ''')
 
+    # Синонимы объектов, их реквизитов и табличных частей на всех языках описания
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS object_synonyms (
+            object_synonyms_owner INTEGER,      -- Ссылка на объект
+            object_synonyms_attr INTEGER,       -- Реквизит или табличная часть (NULL - синоним объекта)
+            object_synonyms_lang TEXT,          -- Код языка (ru, en, ...)
+            object_synonyms_position INTEGER,   -- Порядок языка в описании (0 - основной синоним)
+            object_synonyms_text TEXT,          -- Синоним
+            FOREIGN KEY(object_synonyms_owner) REFERENCES objects(obj_id),
+            FOREIGN KEY(object_synonyms_attr) REFERENCES obj_attributes(obj_attr_id)
+        )
+    ''')
+
     # Таблица форм и макетов
     cursor.execute('''
         CREATE TABLE IF NOT EXISTS commands_templates (
@@ -64,29 +194,56 @@ def create_database(conn: sqlite3.Connection) -> sqlite3.Connection:
         )
     ''')
     
+    # Сжатые тексты модулей; одинаковые модули хранятся один раз
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS module_blobs (
+            module_blobs_hash TEXT PRIMARY KEY, -- SHA-1 текста модуля в UTF-8
+            module_blobs_size INTEGER,          -- Размер текста модуля в байтах
+            module_blobs_data BLOB              -- Текст модуля, сжатый zlib
+        ) WITHOUT ROWID
+    ''')
+    
     # Таблица модулей объектов
     cursor.execute('''
         CREATE TABLE IF NOT EXISTS code_body (
             code_body_id INTEGER PRIMARY KEY AUTOINCREMENT,
-            code_body_owner_id INTEGER,         -- Ссылка на родительскую форму/макет
+            code_body_owner_id INTEGER,         -- Ссылка на родительскую форму/макет (NULL для модулей объекта)
             code_body_name TEXT,                -- Имя модуля
-            code_body_module TEXT,              -- Текст модуля
+            code_body_module TEXT,              -- Текст модуля (только в базах, созданных до module_blobs)
             code_body_module_type TEXT,         -- Тип модуля
             code_body_owner INTEGER,            -- Ссылка на объект (для обратной совместимости)
+            code_body_blob TEXT,                -- Ссылка на сжатый текст модуля
             FOREIGN KEY(code_body_owner_id) REFERENCES commands_templates(commands_templates_id),
             FOREIGN KEY(code_body_owner) REFERENCES objects(obj_id),
+            FOREIGN KEY(code_body_blob) REFERENCES module_blobs(module_blobs_hash),
             UNIQUE(code_body_id, code_body_owner_id, code_body_name)
         )
     ''')
     
+    # Модули с распакованным текстом (функция module_text регистрируется register_functions)
+    cursor.execute('''
+        CREATE VIEW IF NOT EXISTS code_modules AS
+        SELECT cb.code_body_id, cb.code_body_owner_id, cb.code_body_name, cb.code_body_module_type,
+               cb.code_body_owner, cb.code_body_blob,
+               COALESCE(cb.code_body_module, module_text(b.module_blobs_data)) AS code_body_module
+        FROM code_body cb
+        LEFT JOIN module_blobs b ON b.module_blobs_hash = cb.code_body_blob
+    ''')
+    
     # Таблица методов
     cursor.execute('''
         CREATE TABLE IF NOT EXISTS methods (
             methods_id INTEGER PRIMARY KEY AUTOINCREMENT,
             methods_owner_id INTEGER,           -- Ссылка на родительский модуль
             methods_name TEXT,                  -- Имя метода
+            methods_name_folded TEXT,           -- Имя метода в нижнем регистре (utils.fold_name)
             methods_if_func BOOLEAN,            -- Признак функции (иначе процедура)
             methods_is_export BOOLEAN DEFAULT FALSE,  -- Признак экспортируемости
+            methods_directive TEXT,             -- Директива компиляции (НаСервере, НаКлиенте, ...)
+            methods_start_line INTEGER,         -- Строка заголовка метода (с 1)
+            methods_end_line INTEGER,           -- Строка окончания метода
+            methods_start_offset INTEGER,       -- Смещение начала метода в тексте модуля (в символах)
+            methods_end_offset INTEGER,         -- Смещение конца метода в тексте модуля
             FOREIGN KEY(methods_owner_id) REFERENCES code_body(code_body_id),
             UNIQUE(methods_id, methods_owner_id, methods_name)
         )
@@ -147,9 +304,255 @@ def create_database(conn: sqlite3.Connection) -> sqlite3.Connection:
             UNIQUE(based_on_id, based_on_owner, based_on_name)
         )
     ''')
+    
+    # Таблица хешей содержимого файлов для повторного (инкрементального) импорта
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS file_hashes (
+            file_hashes_path TEXT PRIMARY KEY,  -- Путь к файлу относительно корня конфигурации
+            file_hashes_sha1 TEXT,              -- SHA-1 содержимого файла
+            file_hashes_code_body INTEGER,      -- Модуль, полученный из файла (для .bsl)
+            FOREIGN KEY(file_hashes_code_body) REFERENCES code_body(code_body_id)
+        )
+    ''')
+    
+    # Таблица вызовов методов (ребра графа вызовов)
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS method_calls (
+            method_calls_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            method_calls_caller INTEGER,        -- Вызывающий метод
+            method_calls_module TEXT,           -- Модуль или менеджер перед точкой (NULL для локального вызова)
+            method_calls_name TEXT,             -- Имя вызываемого метода
+            method_calls_line INTEGER,          -- Номер строки вызова в модуле
+            method_calls_callee INTEGER,        -- Вызываемый метод (NULL, если не найден в конфигурации)
+            FOREIGN KEY(method_calls_caller) REFERENCES methods(methods_id),
+            FOREIGN KEY(method_calls_callee) REFERENCES methods(methods_id)
+        )
+    ''')
+    
+    # Поколения импорта: номер увеличивается при каждом импорте, по нему
+    # сбрасываются закэшированные отчеты (см. reports.object_report)
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS import_generations (
+            import_generations_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            import_generations_time TEXT        -- Время импорта (UTC)
+        )
+    ''')
+    create_indexes(conn)
     conn.commit()
     return conn
 
+def next_import_generation(conn: sqlite3.Connection) -> int:
+    """Начинает новое поколение импорта (в текущей транзакции); возвращает его номер."""
+    cursor = conn.cursor()
+    cursor.execute("INSERT INTO import_generations (import_generations_time) VALUES (datetime('now'))")
+    return cursor.lastrowid
+
+def get_import_generation(conn: sqlite3.Connection) -> int:
+    """Возвращает номер последнего поколения импорта (0, если импорта еще не было)."""
+    cursor = conn.cursor()
+    cursor.execute("SELECT COALESCE(MAX(import_generations_id), 0) FROM import_generations")
+    return cursor.fetchone()[0]
+
+def load_file_hashes(conn: sqlite3.Connection) -> Dict[str, Tuple[str, Optional[int]]]:
+    """Возвращает сохраненные хеши файлов: путь -> (SHA-1, идентификатор модуля)."""
+    cursor = conn.cursor()
+    cursor.execute("SELECT file_hashes_path, file_hashes_sha1, file_hashes_code_body FROM file_hashes")
+    return {row[0]: (row[1], row[2]) for row in cursor.fetchall()}
+
+def _chunks(values: List, size: int = 500) -> Iterable[List]:
+    for i in range(0, len(values), size):
+        yield values[i:i + size]
+
+def delete_modules(conn: sqlite3.Connection, code_body_ids: Iterable[int]) -> None:
+    """Удаляет модули вместе с их методами, параметрами, вызовами и полнотекстовым индексом."""
+    cursor = conn.cursor()
+    code_body_ids = list(code_body_ids)
+    delete_from_fts_index(conn, code_body_ids)
+    for chunk in _chunks(code_body_ids):
+        marks = ', '.join('?' * len(chunk))
+        cursor.execute(f"""
+            DELETE FROM methods_args WHERE methods_args_owner_id IN (
+                SELECT methods_id FROM methods WHERE methods_owner_id IN ({marks}))
+        """, chunk)
+        # Вызовы из удаляемых методов удаляются, вызовы удаляемых методов снова не разрешены
+        cursor.execute(f"""
+            DELETE FROM method_calls WHERE method_calls_caller IN (
+                SELECT methods_id FROM methods WHERE methods_owner_id IN ({marks}))
+        """, chunk)
+        cursor.execute(f"""
+            UPDATE method_calls SET method_calls_callee = NULL WHERE method_calls_callee IN (
+                SELECT methods_id FROM methods WHERE methods_owner_id IN ({marks}))
+        """, chunk)
+        cursor.execute(f"DELETE FROM methods WHERE methods_owner_id IN ({marks})", chunk)
+        cursor.execute(f"DELETE FROM code_body WHERE code_body_id IN ({marks})", chunk)
+
+def delete_object_attributes(conn: sqlite3.Connection, obj_ids: Iterable[int]) -> None:
+    """Удаляет реквизиты и табличные части объектов вместе с типами реквизитов и синонимами."""
+    cursor = conn.cursor()
+    for chunk in _chunks(list(obj_ids)):
+        marks = ', '.join('?' * len(chunk))
+        cursor.execute(f"DELETE FROM object_synonyms WHERE object_synonyms_owner IN ({marks})", chunk)
+        cursor.execute(f"""
+            DELETE FROM obj_attr_types WHERE obj_attr_type_owner IN (
+                SELECT obj_attr_id FROM obj_attributes WHERE obj_attr_owner IN ({marks}))
+        """, chunk)
+        cursor.execute(f"DELETE FROM obj_attributes WHERE obj_attr_owner IN ({marks})", chunk)
+
+def delete_unused_blobs(conn: sqlite3.Connection) -> int:
+    """Удаляет тексты модулей, на которые больше не ссылается ни один модуль."""
+    cursor = conn.cursor()
+    cursor.execute("""
+        DELETE FROM module_blobs WHERE module_blobs_hash NOT IN (
+            SELECT code_body_blob FROM code_body WHERE code_body_blob IS NOT NULL)
+    """)
+    return cursor.rowcount
+
+def forget_files(conn: sqlite3.Connection, paths: Iterable[str]) -> None:
+    """Удаляет сохраненные хеши файлов."""
+    cursor = conn.cursor()
+    for chunk in _chunks(list(paths)):
+        marks = ', '.join('?' * len(chunk))
+        cursor.execute(f"DELETE FROM file_hashes WHERE file_hashes_path IN ({marks})", chunk)
+
+# Размер страницы новой базы при --fast-import: сжатые тексты модулей (module_blobs)
+# реже выходят за пределы страницы, база получается меньше
+FAST_IMPORT_PAGE_SIZE = 8192
+
+# Настройки соединения на время массовой загрузки. WAL, в отличие от journal_mode=OFF,
+# сохраняет работоспособность ROLLBACK, на который опирается BulkWriter.rollback
+FAST_IMPORT_PRAGMAS: List[Tuple[str, str]] = [
+    ('journal_mode', 'WAL'),
+    ('synchronous', 'OFF'),
+    ('cache_size', '-262144'),  # 256 МБ
+    ('temp_store', 'MEMORY'),
+]
+
+# Настройки после загрузки: база в одном файле, надежная фиксация транзакций
+DURABLE_PRAGMAS: List[Tuple[str, str]] = [
+    ('journal_mode', 'DELETE'),
+    ('synchronous', 'FULL'),
+    ('cache_size', '-2000'),
+    ('temp_store', 'DEFAULT'),
+]
+
+def _set_pragmas(conn: sqlite3.Connection, pragmas: List[Tuple[str, str]]) -> None:
+    """Устанавливает настройки соединения."""
+    cursor = conn.cursor()
+    for name, value in pragmas:
+        cursor.execute(f"PRAGMA {name} = {value}")
+        logger.debug(f"PRAGMA {name} = {value}")
+
+def begin_fast_import(conn: sqlite3.Connection) -> None:
+    """Переключает соединение в режим быстрой загрузки (--fast-import).
+    
+    Вызывается до create_database: размер страницы можно задать только пустой базе.
+    До end_fast_import сбой питания или ОС может повредить базу; после него
+    база снова в режиме journal_mode=DELETE, synchronous=FULL.
+    """
+    cursor = conn.cursor()
+    cursor.execute("SELECT COUNT(*) FROM sqlite_master")
+    if cursor.fetchone()[0] == 0:
+        cursor.execute(f"PRAGMA page_size = {FAST_IMPORT_PAGE_SIZE}")
+    _set_pragmas(conn, FAST_IMPORT_PRAGMAS)
+    logger.info("Включен режим быстрой загрузки")
+
+def end_fast_import(conn: sqlite3.Connection) -> None:
+    """Возвращает надежные настройки после загрузки; незафиксированные изменения откатываются."""
+    # Журнал нельзя переключить внутри транзакции
+    conn.rollback()
+    _set_pragmas(conn, DURABLE_PRAGMAS)
+    logger.info("Режим быстрой загрузки выключен")
+
+def optimize_database(conn: sqlite3.Connection, vacuum: bool = False) -> None:
+    """Собирает статистику для планировщика запросов и при vacuum=True сжимает файл базы."""
+    cursor = conn.cursor()
+    try:
+        cursor.execute("ANALYZE")
+        cursor.execute("PRAGMA optimize")
+        conn.commit()
+        if vacuum:
+            cursor.execute("VACUUM")
+    except sqlite3.Error as e:
+        logger.error(f"Ошибка при оптимизации базы данных: {e}")
+        raise
+    logger.info(f"Статистика базы данных обновлена{', файл базы сжат' if vacuum else ''}")
+
+def _staging_file(db_path: str) -> str:
+    """Создает пустой временный файл в каталоге базы: os.replace атомарен только в пределах одной ФС."""
+    db_path = os.path.abspath(db_path)
+    fd, staging_path = tempfile.mkstemp(prefix=f"{os.path.basename(db_path)}.", suffix='.building',
+                                        dir=os.path.dirname(db_path))
+    os.close(fd)
+    return staging_path
+
+def open_staging_database(db_path: str, in_memory: bool = False) -> Tuple[sqlite3.Connection, Optional[str]]:
+    """Открывает базу для сборки импорта, не изменяя db_path до публикации (publish_database).
+    
+    База собирается в памяти (in_memory=True) или во временном файле рядом с db_path.
+    Если db_path существует, в новую базу сначала копируется ее содержимое, поэтому
+    повторный и инкрементальный импорт работают как при записи прямо в db_path.
+    Возвращает соединение и путь к временному файлу (None для базы в памяти).
+    """
+    staging_path = None if in_memory else _staging_file(db_path)
+    conn = sqlite3.connect(':memory:' if in_memory else staging_path)
+    if os.path.exists(db_path):
+        # Текущая база открывается только для чтения: ее читатели не блокируются
+        source = sqlite3.connect(f"file:{quote(os.path.abspath(db_path))}?mode=ro", uri=True)
+        try:
+            source.backup(conn)
+        except sqlite3.Error as e:
+            logger.error(f"Ошибка при копировании базы {db_path}: {e}")
+            conn.close()
+            discard_staging_database(staging_path)
+            raise
+        finally:
+            source.close()
+    logger.info(f"База собирается {'в памяти' if in_memory else f'во временном файле {staging_path}'}")
+    return conn, staging_path
+
+def publish_database(conn: sqlite3.Connection, db_path: str, staging_path: Optional[str]) -> None:
+    """Заменяет db_path собранной базой одним переименованием и закрывает соединение.
+    
+    База в памяти сначала целиком копируется (Connection.backup, последовательная запись)
+    во временный файл рядом с db_path. Читатели, открывшие прежнюю базу, продолжают
+    читать ее до закрытия соединения; новые соединения сразу видят новую базу целиком.
+    """
+    conn.commit()
+    try:
+        if staging_path is None:
+            staging_path = _staging_file(db_path)
+            target = sqlite3.connect(staging_path)
+            try:
+                conn.backup(target)
+            finally:
+                target.close()
+        conn.close()
+        # Права прежней базы; для новой - обычные права файла вместо 0600 от mkstemp
+        os.chmod(staging_path, os.stat(db_path).st_mode if os.path.exists(db_path) else 0o644)
+        # Содержимое должно попасть на диск раньше, чем новое имя
+        with open(staging_path, 'rb+') as f:
+            os.fsync(f.fileno())
+        os.replace(staging_path, db_path)
+        if hasattr(os, 'O_DIRECTORY'):
+            dir_fd = os.open(os.path.dirname(os.path.abspath(db_path)), os.O_RDONLY | os.O_DIRECTORY)
+            try:
+                os.fsync(dir_fd)
+            finally:
+                os.close(dir_fd)
+    except (sqlite3.Error, OSError) as e:
+        logger.error(f"Ошибка при публикации базы {db_path}: {e}")
+        discard_staging_database(staging_path)
+        raise
+    logger.info(f"База опубликована: {db_path}")
+
+def discard_staging_database(staging_path: Optional[str]) -> None:
+    """Удаляет временный файл несостоявшейся сборки вместе с его журналами."""
+    if staging_path is None:
+        return
+    for path in (staging_path, f"{staging_path}-journal", f"{staging_path}-wal", f"{staging_path}-shm"):
+        if os.path.exists(path):
+            os.remove(path)
+
 def check_database_integrity(db_path: str) -> bool:
     """Проверяет логическую целостность базы данных."""
     conn = sqlite3.connect(db_path)
@@ -210,7 +613,7 @@ def check_database_integrity(db_path: str) -> bool:
             SELECT cb.code_body_id, cb.code_body_owner_id, ct.commands_templates_id, cb.code_body_module_type
             FROM code_body cb
             LEFT JOIN commands_templates ct ON cb.code_body_owner_id = ct.commands_templates_id
-            WHERE ct.commands_templates_id IS NULL
+            WHERE cb.code_body_owner_id IS NOT NULL AND ct.commands_templates_id IS NULL
         """)
         orphaned = cursor.fetchall()
         if orphaned:
@@ -247,6 +650,34 @@ def check_database_integrity(db_path: str) -> bool:
                     f"Аргумент метода {row[3]} (ID: {row[0]}) ссылается на несуществующий метод (ID: {row[1]})"
                 )
 
+        # 7. Проверка code_body -> module_blobs
+        cursor.execute("""
+            SELECT cb.code_body_id, cb.code_body_blob, cb.code_body_module_type
+            FROM code_body cb
+            LEFT JOIN module_blobs b ON cb.code_body_blob = b.module_blobs_hash
+            WHERE cb.code_body_blob IS NOT NULL AND b.module_blobs_hash IS NULL
+        """)
+        orphaned = cursor.fetchall()
+        if orphaned:
+            for row in orphaned:
+                integrity_issues.append(
+                    f"Модуль типа {row[2]} (ID: {row[0]}) ссылается на несуществующий текст (хеш: {row[1]})"
+                )
+
+        # 8. Проверка object_synonyms -> obj_attributes
+        cursor.execute("""
+            SELECT s.object_synonyms_attr, s.object_synonyms_text
+            FROM object_synonyms s
+            LEFT JOIN obj_attributes oa ON s.object_synonyms_attr = oa.obj_attr_id
+            WHERE s.object_synonyms_attr IS NOT NULL AND oa.obj_attr_id IS NULL
+        """)
+        orphaned = cursor.fetchall()
+        if orphaned:
+            for row in orphaned:
+                integrity_issues.append(
+                    f"Синоним {row[1]} ссылается на несуществующий реквизит (ID: {row[0]})"
+                )
+
         # Вывод результатов проверки
         if integrity_issues:
             logger.error("\nНайдены проблемы целостности базы данных:")
@@ -259,9 +690,10 @@ def check_database_integrity(db_path: str) -> bool:
         # Дополнительная статистика
         logger.info("\nСтатистика по таблицам:")
         tables = [
-            "objects", "obj_attributes", "obj_attr_types", "commands_templates",
+            "objects", "obj_attributes", "obj_attr_types", "object_synonyms", "commands_templates",
             "code_body", "methods", "methods_args", "predefined_attrs",
-            "predefined_attrs_values", "register_records", "based_on"
+            "predefined_attrs_values", "register_records", "based_on", "file_hashes", "module_blobs",
+            "method_calls"
         ]
         for table in tables:
             cursor.execute(f"SELECT COUNT(*) FROM {table}")
@@ -277,10 +709,50 @@ def check_database_integrity(db_path: str) -> bool:
 
     return len(integrity_issues) == 0
 
+def fill_folded_names(conn: sqlite3.Connection) -> int:
+    """Заполняет methods_name_folded у методов, сохраненных прежней версией; возвращает количество."""
+    conn.create_function('fold_name', 1, fold_name, deterministic=True)
+    cursor = conn.cursor()
+    cursor.execute("""
+        UPDATE methods SET methods_name_folded = fold_name(methods_name)
+        WHERE methods_name_folded IS NULL AND methods_name IS NOT NULL
+    """)
+    return cursor.rowcount
+
+def find_outdated_structure(conn: sqlite3.Connection) -> List[str]:
+    """Сравнивает структуру базы с текущим описанием, ничего в базе не изменяя.
+    
+    Возвращает описания отсутствующих таблиц и колонок; пустой список - структура актуальна.
+    Базу с устаревшей структурой обновляет check_and_update_database_structure.
+    """
+    def table_columns(connection: sqlite3.Connection) -> Dict[str, List[str]]:
+        cursor = connection.cursor()
+        cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%'")
+        tables = [row[0] for row in cursor.fetchall()]
+        return {table: [row[1] for row in cursor.execute(f"PRAGMA table_info({table})")] for table in tables}
+    
+    temp_conn = sqlite3.connect(':memory:')
+    try:
+        create_database(temp_conn)
+        required_tables = table_columns(temp_conn)
+    finally:
+        temp_conn.close()
+    existing_tables = table_columns(conn)
+    problems = []
+    for table, columns in required_tables.items():
+        if table not in existing_tables:
+            problems.append(f"нет таблицы {table}")
+            continue
+        missing = [column for column in columns if column not in existing_tables[table]]
+        if missing:
+            problems.append(f"в таблице {table} нет колонок {', '.join(missing)}")
+    return problems
+
 def check_and_update_database_structure(conn: sqlite3.Connection) -> None:
     """Проверяет и обновляет структуру базы данных в соответствии с текущим описанием."""
-    logger = logging.getLogger('vcv_parser')
+    logger = logging.getLogger('ent1ctosqlite')
     cursor = conn.cursor()
+    temp_conn = None
     
     try:
         # Получаем текущую структуру таблиц
@@ -314,7 +786,7 @@ def check_and_update_database_structure(conn: sqlite3.Connection) -> None:
                     'type': row[2],
                     'notnull': row[3],
                     'pk': row[5]
-                } for row in cursor.fetchall()
+                } for row in temp_cursor.fetchall()
             }
         
         # Сравниваем и обновляем структуру
@@ -356,11 +828,29 @@ def check_and_update_database_structure(conn: sqlite3.Connection) -> None:
                     cursor.execute(f"DROP TABLE {table}_old")
                     break
         
+        filled = fill_folded_names(conn)
+        if filled:
+            logger.info(f"Заполнены имена методов для поиска без учета регистра: {filled}")
+        
+        # Удаляем таблицы и индексы прежних версий
+        for table in OBSOLETE_TABLES:
+            if table in existing_tables:
+                logger.info(f"Удаление устаревшей таблицы: {table}")
+                cursor.execute(f"DROP TABLE {table}")
+        for index in OBSOLETE_INDEXES:
+            cursor.execute(f"DROP INDEX IF EXISTS {index}")
+        
         # Проверяем лишние таблицы
         for table in existing_tables:
-            if table not in required_tables:
+            if (table not in required_tables and table not in OBSOLETE_TABLES
+                    and not table.startswith(ON_DEMAND_TABLE_PREFIXES)):
                 logger.warning(f"Обнаружена лишняя таблица: {table}")
         
+        # Индексы по добавленным колонкам и индексы, которых не было в старой базе
+        created = create_indexes(conn)
+        if created:
+            logger.info(f"Создано индексов: {created}")
+        
         conn.commit()
         logger.info("Структура базы данных успешно обновлена")
         
@@ -369,7 +859,8 @@ def check_and_update_database_structure(conn: sqlite3.Connection) -> None:
         logger.error(f"Ошибка при обновлении структуры базы данных: {e}")
         raise
     finally:
-        temp_conn.close()
+        if temp_conn is not None:
+            temp_conn.close()
 
 def get_table_info(conn: sqlite3.Connection) -> None:
     """Выводит информацию о таблицах базы данных."""
@@ -0,0 +1,285 @@
+"""
+Пакетная запись строк в базу данных при импорте конфигурации.
+"""
+
+import sqlite3
+import logging
+from typing import Dict, Hashable, List, Optional, Sequence, Set, Tuple
+
+from .metrics import stage, count_items
+
+logger = logging.getLogger('ent1ctosqlite')
+
+DEFAULT_BATCH_SIZE = 10000
+
+# INSERT ... RETURNING появился в SQLite 3.35; в более ранних версиях upsert
+# ищет строку по естественному ключу отдельным запросом
+RETURNING_SQLITE_VERSION = (3, 35, 0)
+
+# Колонки, заполняемые при импорте. Порядок таблиц - порядок сброса буферов:
+# родительские таблицы записываются раньше дочерних.
+TABLE_COLUMNS: Dict[str, Tuple[str, ...]] = {
+    'objects': ('obj_id', 'obj_type', 'obj_name'),
+    'obj_attributes': (
+        'obj_attr_id', 'obj_attr_owner', 'prop_name', 'table_part', 'is_dimension',
+        'is_resourse', 'is_attribute', 'is_standard_attribute', 'is_tbl_part'
+    ),
+    'obj_attr_types': (
+        'obj_attr_type_owner', 'type_body', 'type_name', 'type_class', 'type_class_ru',
+        'is_configuration_type'
+    ),
+    'object_synonyms': (
+        'object_synonyms_owner', 'object_synonyms_attr', 'object_synonyms_lang', 'object_synonyms_position',
+        'object_synonyms_text'
+    ),
+    'commands_templates': (
+        'commands_templates_id', 'commands_templates_owner', 'commands_templates_name',
+        'commands_templates_is_form', 'commands_templates_is_templ', 'commands_templates_synonym'
+    ),
+    'module_blobs': ('module_blobs_hash', 'module_blobs_size', 'module_blobs_data'),
+    'code_body': (
+        'code_body_id', 'code_body_owner_id', 'code_body_name', 'code_body_blob',
+        'code_body_module_type', 'code_body_owner'
+    ),
+    'methods': (
+        'methods_id', 'methods_owner_id', 'methods_name', 'methods_name_folded', 'methods_if_func',
+        'methods_is_export', 'methods_directive', 'methods_start_line', 'methods_end_line',
+        'methods_start_offset', 'methods_end_offset'
+    ),
+    'methods_args': ('methods_args_owner_id', 'methods_args_method_name', 'methods_args_arg_name'),
+    'method_calls': ('method_calls_caller', 'method_calls_module', 'method_calls_name', 'method_calls_line'),
+    'predefined_attrs': ('predefined_attrs_id', 'predefined_attrs_owner', 'predefined_attrs_name'),
+    'predefined_attrs_values': (
+        'predefined_attrs_values_owner', 'predefined_attrs_values_atr', 'predefined_attrs_values_val'
+    ),
+    'register_records': ('register_records_owner', 'register_records_name'),
+    'based_on': ('based_on_owner', 'based_on_name'),
+    'file_hashes': ('file_hashes_path', 'file_hashes_sha1', 'file_hashes_code_body'),
+}
+
+# Таблицы, в которых новая строка заменяет существующую с тем же ключом
+REPLACE_TABLES = {'file_hashes'}
+
+# Естественные ключи таблиц: по ним в базе построены уникальные индексы (database.INDEXES),
+# а BulkWriter.upsert находит существующую строку. Модули объекта (code_body_owner_id IS NULL)
+# ключом не ограничены: их однозначно определяет путь файла (file_hashes). Имя формы,
+# команды или макета уникально только среди форм, команд или макетов объекта
+NATURAL_KEYS: Dict[str, Tuple[str, ...]] = {
+    'objects': ('obj_type', 'obj_name'),
+    'commands_templates': ('commands_templates_owner', 'commands_templates_is_form', 'commands_templates_is_templ',
+                           'commands_templates_name'),
+    'code_body': ('code_body_owner_id', 'code_body_module_type'),
+    'methods': ('methods_owner_id', 'methods_name'),
+    'methods_args': ('methods_args_owner_id', 'methods_args_arg_name'),
+}
+
+# Таблицы, в которых строка с уже существующим естественным ключом пропускается
+# (ON CONFLICT DO NOTHING): на их строки ничто не ссылается
+IGNORE_TABLES = {'methods_args'}
+
+# Ключи таблиц, строки которых добавляются через BulkWriter.insert_unique
+UNIQUE_KEYS: Dict[str, str] = {'module_blobs': 'module_blobs_hash'}
+
+# Первичные ключи таблиц, идентификаторы которых выделяет BulkWriter.next_id
+PRIMARY_KEYS: Dict[str, str] = {
+    'objects': 'obj_id',
+    'obj_attributes': 'obj_attr_id',
+    'commands_templates': 'commands_templates_id',
+    'code_body': 'code_body_id',
+    'methods': 'methods_id',
+    'predefined_attrs': 'predefined_attrs_id',
+}
+
+
+class BulkWriter:
+    """Буферизует строки по таблицам и записывает их пакетами через executemany.
+
+    Идентификаторы новых строк выделяются заранее (next_id), поэтому дочерние строки
+    можно ссылать на родительские до фактической записи. Транзакция фиксируется
+    только в commit() или, если задан checkpoint_rows, после каждых checkpoint_rows строк.
+    use_returning определяет, выполняет ли upsert INSERT ... RETURNING (SQLite 3.35+).
+    """
+
+    def __init__(self, conn: sqlite3.Connection, batch_size: int = DEFAULT_BATCH_SIZE,
+                 checkpoint_rows: int = 0):
+        if batch_size < 1:
+            raise ValueError(f"Размер пакета должен быть положительным: {batch_size}")
+        self.conn = conn
+        self.batch_size = batch_size
+        self.checkpoint_rows = checkpoint_rows
+        self.use_returning = sqlite3.sqlite_version_info >= RETURNING_SQLITE_VERSION
+        self._buffers: Dict[str, List[Sequence]] = {table: [] for table in TABLE_COLUMNS}
+        self._sql = {
+            table: f"INSERT {'OR REPLACE ' if table in REPLACE_TABLES else ''}INTO {table} "
+                   f"({', '.join(columns)}) "
+                   f"VALUES ({', '.join('?' * len(columns))})"
+                   f"{' ON CONFLICT DO NOTHING' if table in IGNORE_TABLES else ''}"
+            for table, columns in TABLE_COLUMNS.items()
+        }
+        self._next_ids: Dict[str, int] = {}
+        self._unique_keys: Dict[str, Set[Hashable]] = {}
+        self._uncommitted = 0
+        self.rows: Dict[str, int] = {table: 0 for table in TABLE_COLUMNS}
+        self.flushes: Dict[str, int] = {table: 0 for table in TABLE_COLUMNS}
+        self.duplicates: Dict[str, int] = {table: 0 for table in UNIQUE_KEYS}
+        self.commits = 0
+
+    def next_id(self, table: str) -> int:
+        """Выделяет идентификатор для новой строки таблицы."""
+        next_id = self._next_ids.get(table)
+        if next_id is None:
+            pk = PRIMARY_KEYS[table]
+            cursor = self.conn.cursor()
+            cursor.execute(f"SELECT COALESCE(MAX({pk}), 0) FROM {table}")
+            next_id = cursor.fetchone()[0]
+            # AUTOINCREMENT не переиспользует идентификаторы удаленных строк - мы тоже
+            cursor.execute("SELECT name FROM sqlite_master WHERE name = 'sqlite_sequence'")
+            if cursor.fetchone():
+                cursor.execute("SELECT seq FROM sqlite_sequence WHERE name = ?", (table,))
+                row = cursor.fetchone()
+                if row and row[0] > next_id:
+                    next_id = row[0]
+            next_id += 1
+        self._next_ids[table] = next_id + 1
+        return next_id
+
+    def insert(self, table: str, row: Sequence) -> None:
+        """Добавляет строку в буфер таблицы (колонки - TABLE_COLUMNS[table])."""
+        buffer = self._buffers[table]
+        buffer.append(row)
+        if len(buffer) >= self.batch_size:
+            self.flush()
+
+    def insert_unique(self, table: str, key: Hashable, row: Sequence) -> bool:
+        """Добавляет строку, если строки с таким ключом (UNIQUE_KEYS) еще нет в базе.
+        
+        Ключи существующих строк читаются из базы один раз. Возвращает False,
+        если строка уже есть и не добавлена.
+        """
+        keys = self._unique_keys.get(table)
+        if keys is None:
+            cursor = self.conn.cursor()
+            cursor.execute(f"SELECT {UNIQUE_KEYS[table]} FROM {table}")
+            keys = self._unique_keys[table] = {row[0] for row in cursor.fetchall()}
+        if key in keys:
+            self.duplicates[table] += 1
+            return False
+        keys.add(key)
+        self.insert(table, row)
+        return True
+
+    def upsert(self, table: str, row: Sequence, update: Sequence[str] = ()) -> Optional[int]:
+        """Добавляет строку одним запросом INSERT ... ON CONFLICT ... RETURNING.
+        
+        Строка с тем же естественным ключом (NATURAL_KEYS) не добавляется повторно:
+        если update пуст, возвращается None, иначе в ней обновляются колонки update
+        (NULL не затирает сохраненное значение) и возвращается ее первичный ключ.
+        Для новой строки возвращается ее первичный ключ (первая колонка row).
+        Без RETURNING (use_returning=False) строка ищется по ключу, затем добавляется
+        или обновляется отдельным запросом.
+        """
+        columns = TABLE_COLUMNS[table]
+        if update:
+            action = "UPDATE SET " + ", ".join(f"{column} = COALESCE(excluded.{column}, {column})"
+                                               for column in update)
+        else:
+            action = "NOTHING"
+        sql = (f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))}) "
+               f"ON CONFLICT({', '.join(NATURAL_KEYS[table])}) DO {action} RETURNING {columns[0]}")
+        cursor = self.conn.cursor()
+        # Строки таблицы, ожидающие записи в буфере, должны участвовать в проверке ключа
+        self._flush_buffer(cursor, table)
+        with stage('db_flush'):
+            if self.use_returning:
+                cursor.execute(sql, row)
+                result = cursor.fetchone()
+            else:
+                result = self._upsert_without_returning(cursor, table, row, update)
+        count_items('db_flush', 1)
+        self._uncommitted += 1
+        if result is None:
+            return None
+        self.rows[table] += 1
+        return result[0]
+
+    def _upsert_without_returning(self, cursor: sqlite3.Cursor, table: str, row: Sequence,
+                                  update: Sequence[str]) -> Optional[Tuple[int]]:
+        """Выполняет upsert без RETURNING; результат - как у fetchone() после RETURNING."""
+        columns = TABLE_COLUMNS[table]
+        values = dict(zip(columns, row))
+        key = NATURAL_KEYS[table]
+        existing = None
+        # Как и в уникальном индексе, ключ с NULL не совпадает ни с одной строкой
+        if all(values[column] is not None for column in key):
+            cursor.execute(f"SELECT {columns[0]} FROM {table} WHERE "
+                           + " AND ".join(f"{column} = ?" for column in key), [values[column] for column in key])
+            existing = cursor.fetchone()
+        if existing is None:
+            cursor.execute(self._sql[table], row)
+            return (row[0],)
+        if not update:
+            return None
+        cursor.execute(f"UPDATE {table} SET " + ", ".join(f"{column} = COALESCE(?, {column})" for column in update)
+                       + f" WHERE {columns[0]} = ?", [values[column] for column in update] + [existing[0]])
+        return existing
+
+    def forget_unique_keys(self, table: str) -> None:
+        """Сбрасывает прочитанные ключи таблицы после удаления ее строк в обход writer."""
+        self._unique_keys.pop(table, None)
+
+    def flush(self) -> None:
+        """Записывает буферы всех таблиц, не фиксируя транзакцию."""
+        cursor = self.conn.cursor()
+        for table in self._buffers:
+            self._flush_buffer(cursor, table)
+        if self.checkpoint_rows and self._uncommitted >= self.checkpoint_rows:
+            self.commit()
+
+    def _flush_buffer(self, cursor: sqlite3.Cursor, table: str) -> None:
+        """Записывает буфер одной таблицы."""
+        buffer = self._buffers[table]
+        if not buffer:
+            return
+        with stage('db_flush'):
+            cursor.executemany(self._sql[table], buffer)
+        count_items('db_flush', len(buffer))
+        self.rows[table] += len(buffer)
+        self.flushes[table] += 1
+        self._uncommitted += len(buffer)
+        buffer.clear()
+
+    def commit(self) -> None:
+        """Записывает все буферы и фиксирует транзакцию."""
+        if any(self._buffers.values()):
+            self.flush()
+        with stage('db_flush'):
+            self.conn.commit()
+        self.commits += 1
+        self._uncommitted = 0
+
+    def rollback(self) -> None:
+        """Отбрасывает буферы и откатывает незафиксированные изменения."""
+        for buffer in self._buffers.values():
+            buffer.clear()
+        self._next_ids.clear()
+        self._unique_keys.clear()
+        self._uncommitted = 0
+        self.conn.rollback()
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        """Возвращает количество записанных строк и сбросов по таблицам."""
+        return {
+            table: {'rows': self.rows[table], 'flushes': self.flushes[table]}
+            for table in TABLE_COLUMNS if self.rows[table]
+        }
+
+    def log_stats(self, log: Optional[logging.Logger] = None) -> None:
+        """Выводит статистику записи в лог."""
+        log = log or logger
+        log.info("\nЗаписано строк по таблицам:")
+        for table, counts in self.stats().items():
+            log.info(f"{table}: {counts['rows']} строк, {counts['flushes']} пакетов")
+        for table, count in self.duplicates.items():
+            if count:
+                log.info(f"{table}: пропущено повторяющихся строк - {count}")
+        log.info(f"Фиксаций транзакции: {self.commits}")
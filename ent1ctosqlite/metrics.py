@@ -0,0 +1,203 @@
+"""
+Замеры этапов импорта: время, процессорное время, количество элементов и байт.
+
+Сбор включается только явно (enable_metrics). Пока он выключен, stage() возвращает
+общий пустой контекстный менеджер, а count_items() сразу возвращается, поэтому точки
+замера в коде импорта почти ничего не стоят.
+"""
+
+import cProfile
+import json
+import logging
+import os
+import time
+from contextlib import nullcontext
+from typing import ContextManager, Dict, List, Optional
+
+try:
+    import resource
+except ImportError:
+    # Windows: модуля resource нет
+    resource = None
+
+logger = logging.getLogger('ent1ctosqlite')
+
+# Этапы импорта в порядке выполнения (в отчет попадают и этапы, не указанные здесь)
+STAGES = ['extract', 'discover', 'configuration', 'directory_walk', 'module_parse', 'db_flush', 'indexes',
+          'call_graph', 'name_index', 'fts', 'optimize', 'publish']
+
+_NULL_STAGE = nullcontext()
+_active: Optional['Metrics'] = None
+
+
+def _cpu_time() -> float:
+    """Процессорное время текущего процесса и завершившихся дочерних процессов (пул разбора модулей).
+
+    Без модуля resource (Windows) время дочерних процессов не учитывается.
+    """
+    if resource is None:
+        return time.process_time()
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return time.process_time() + children.ru_utime + children.ru_stime
+
+
+class StageStats:
+    """Накопленные показатели одного этапа."""
+    __slots__ = ('calls', 'wall_time', 'cpu_time', 'items', 'bytes')
+
+    def __init__(self):
+        self.calls = 0
+        self.wall_time = 0.0
+        self.cpu_time = 0.0
+        self.items = 0
+        self.bytes = 0
+
+    def to_dict(self) -> Dict[str, float]:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+class _Stage:
+    """Контекст выполнения этапа: время вложенных этапов вычитается из времени внешнего."""
+
+    def __init__(self, metrics: 'Metrics', name: str):
+        self.metrics = metrics
+        self.name = name
+
+    def __enter__(self) -> '_Stage':
+        metrics = self.metrics
+        if metrics.profile_dir is not None:
+            if metrics._stack:
+                metrics._profiler(metrics._stack[-1].name).disable()
+            metrics._profiler(self.name).enable()
+        metrics._stack.append(self)
+        self.nested_wall = 0.0
+        self.nested_cpu = 0.0
+        self.start_cpu = _cpu_time()
+        self.start_wall = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        wall = time.perf_counter() - self.start_wall
+        cpu = _cpu_time() - self.start_cpu
+        metrics = self.metrics
+        metrics._stack.pop()
+        stats = metrics.stats(self.name)
+        stats.calls += 1
+        stats.wall_time += wall - self.nested_wall
+        stats.cpu_time += cpu - self.nested_cpu
+        if metrics._stack:
+            parent = metrics._stack[-1]
+            parent.nested_wall += wall
+            parent.nested_cpu += cpu
+        if metrics.profile_dir is not None:
+            metrics._profiler(self.name).disable()
+            if metrics._stack:
+                metrics._profiler(metrics._stack[-1].name).enable()
+
+
+class Metrics:
+    """Сборщик показателей этапов импорта.
+
+    Время этапа (wall_time, cpu_time) не включает время вложенных в него этапов,
+    поэтому сумма по этапам не превышает общего времени. Если задан profile_dir,
+    каждый этап дополнительно профилируется cProfile; профили сохраняет dump_profiles().
+    """
+
+    def __init__(self, profile_dir: Optional[str] = None):
+        self.profile_dir = profile_dir
+        self.stages: Dict[str, StageStats] = {}
+        self.queues: Dict[str, Dict[str, float]] = {}
+        self.started = time.perf_counter()
+        self._stack: List[_Stage] = []
+        self._profilers: Dict[str, cProfile.Profile] = {}
+
+    def stats(self, name: str) -> StageStats:
+        """Возвращает показатели этапа, создавая их при первом обращении."""
+        stats = self.stages.get(name)
+        if stats is None:
+            stats = self.stages[name] = StageStats()
+        return stats
+
+    def _profiler(self, name: str) -> cProfile.Profile:
+        profiler = self._profilers.get(name)
+        if profiler is None:
+            profiler = self._profilers[name] = cProfile.Profile()
+        return profiler
+
+    def to_dict(self) -> Dict[str, object]:
+        """Возвращает показатели в виде, пригодном для сохранения в JSON."""
+        order = {name: i for i, name in enumerate(STAGES)}
+        names = sorted(self.stages, key=lambda name: (order.get(name, len(order)), name))
+        data = {
+            'total_wall_time': time.perf_counter() - self.started,
+            'stages': {name: self.stages[name].to_dict() for name in names},
+        }
+        if self.queues:
+            data['queues'] = self.queues
+        return data
+
+    def write_json(self, path: str) -> None:
+        """Сохраняет показатели в JSON файл."""
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False, indent=2)
+        logger.info(f"Показатели этапов сохранены в: {path}")
+
+    def dump_profiles(self) -> List[str]:
+        """Сохраняет профили этапов в <profile_dir>/<этап>.prof; возвращает пути к файлам."""
+        if self.profile_dir is None:
+            return []
+        os.makedirs(self.profile_dir, exist_ok=True)
+        paths = []
+        for name, profiler in self._profilers.items():
+            path = os.path.join(self.profile_dir, f"{name}.prof")
+            profiler.dump_stats(path)
+            paths.append(path)
+        logger.info(f"Профили этапов сохранены в: {self.profile_dir}")
+        return paths
+
+    def log_summary(self, log: Optional[logging.Logger] = None) -> None:
+        """Выводит в лог таблицу показателей этапов."""
+        log = log or logger
+        data = self.to_dict()
+        log.info(f"\n{'этап':<16}{'вызовов':>9}{'время, с':>10}{'CPU, с':>10}{'элементов':>11}{'МБ':>9}")
+        for name, stats in data['stages'].items():
+            log.info(f"{name:<16}{stats['calls']:>9}{stats['wall_time']:>10.3f}{stats['cpu_time']:>10.3f}"
+                     f"{stats['items']:>11}{stats['bytes'] / 1024 / 1024:>9.1f}")
+        log.info(f"{'всего':<16}{'':>9}{data['total_wall_time']:>10.3f}")
+
+
+def enable_metrics(profile_dir: Optional[str] = None) -> Metrics:
+    """Включает сбор показателей и возвращает новый сборщик."""
+    global _active
+    _active = Metrics(profile_dir)
+    return _active
+
+
+def disable_metrics() -> Optional[Metrics]:
+    """Выключает сбор показателей и возвращает последний сборщик."""
+    global _active
+    metrics, _active = _active, None
+    return metrics
+
+
+def stage(name: str) -> ContextManager:
+    """Возвращает контекст замера этапа name (пустой, если сбор выключен)."""
+    if _active is None:
+        return _NULL_STAGE
+    return _Stage(_active, name)
+
+
+def record_queues(queues: Dict[str, Dict[str, float]]) -> None:
+    """Сохраняет показатели очередей конвейера разбора модулей (см. pipeline.Pipeline.stats)."""
+    if _active is None:
+        return
+    _active.queues.update(queues)
+
+
+def count_items(name: str, items: int = 0, nbytes: int = 0) -> None:
+    """Добавляет к этапу name количество обработанных элементов и байт."""
+    if _active is None:
+        return
+    stats = _active.stats(name)
+    stats.items += items
+    stats.bytes += nbytes
@@ -0,0 +1,304 @@
+"""
+Нечеткий поиск по именам и синонимам объектов, реквизитов и методов (триграммы).
+
+Каждое различающееся имя или синоним хранится в name_index один раз, для него -
+список триграмм (name_trigrams) и ссылки на объекты, реквизиты и методы (name_refs).
+Триграммы строит токенизатор trigram FTS5 во временной таблице, поэтому построение
+индекса идет на уровне SQLite, а не Python.
+
+Поиск читает списки имен только самых редких триграмм запроса (не более
+TRIGRAM_POSTINGS_BUDGET записей), отбирает NAME_CANDIDATES имен с наибольшей оценкой
+сходства и ранжирует их по точному сходству (коэффициент Жаккара по триграммам).
+Опечатка портит не более трех триграмм, поэтому имя находится и по остальным.
+"""
+
+import sqlite3
+import logging
+from typing import Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
+
+logger = logging.getLogger('ent1ctosqlite')
+
+# Сколько записей списков триграмм читается на один запрос
+TRIGRAM_POSTINGS_BUDGET = 8000
+
+# Сколько имен ранжируется по точному сходству
+NAME_CANDIDATES = 200
+
+# Токенизатор trigram FTS5 появился в SQLite 3.34
+TRIGRAM_SQLITE_VERSION = (3, 34, 0)
+
+# Временные таблицы построения индекса
+TEMP_TABLES = ('name_fts_vocab', 'name_fts', 'name_sources')
+
+NAME_KINDS = ('object', 'attribute', 'tabular_section', 'dimension', 'resource', 'method')
+
+
+class NameHit(NamedTuple):
+    """Результат поиска по именам."""
+    score: float                  # Сходство с запросом: 1.0 - совпадение без учета регистра
+    kind: str                     # Вид: object, attribute, tabular_section, dimension, resource, method
+    text: str                     # Найденное имя или синоним
+    object_type: Optional[str]
+    object_name: Optional[str]
+    name: str                     # Имя объекта, реквизита или метода
+    container: Optional[str]      # Табличная часть реквизита или модуль метода
+    object_id: Optional[int]
+    ref_id: int                   # obj_id, obj_attr_id или methods_id в зависимости от kind
+
+
+def trigrams(text: str) -> Set[str]:
+    """Триграммы текста без учета регистра (так же, как токенизатор trigram FTS5)."""
+    text = text.lower()
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def create_name_tables(conn: sqlite3.Connection) -> None:
+    """Создает таблицы индекса имен, если они еще не созданы."""
+    conn.executescript('''
+        -- Различающиеся имена и синонимы
+        CREATE TABLE IF NOT EXISTS name_index (
+            name_index_id INTEGER PRIMARY KEY,
+            name_index_text TEXT UNIQUE          -- Имя или синоним
+        );
+
+        -- Имена, содержащие триграмму
+        CREATE TABLE IF NOT EXISTS name_trigrams (
+            name_trigrams_trigram TEXT,
+            name_trigrams_name INTEGER,          -- Ссылка на name_index
+            PRIMARY KEY (name_trigrams_trigram, name_trigrams_name)
+        ) WITHOUT ROWID;
+
+        -- Количество имен, содержащих триграмму
+        CREATE TABLE IF NOT EXISTS name_trigram_stats (
+            name_trigram_stats_trigram TEXT PRIMARY KEY,
+            name_trigram_stats_names INTEGER
+        ) WITHOUT ROWID;
+
+        -- Объекты, реквизиты и методы с этим именем или синонимом
+        CREATE TABLE IF NOT EXISTS name_refs (
+            name_refs_name INTEGER,              -- Ссылка на name_index
+            name_refs_kind TEXT,                 -- Вид (см. NAME_KINDS)
+            name_refs_object INTEGER,            -- Ссылка на объект
+            name_refs_ref INTEGER,               -- obj_id, obj_attr_id или methods_id
+            name_refs_object_type TEXT,
+            name_refs_object_name TEXT,
+            name_refs_item TEXT,                 -- Имя объекта, реквизита или метода
+            name_refs_container TEXT             -- Табличная часть или модуль
+        );
+        CREATE INDEX IF NOT EXISTS idx_name_refs_name ON name_refs (name_refs_name);
+    ''')
+
+
+def has_name_index(conn: sqlite3.Connection) -> bool:
+    """Проверяет наличие индекса имен в базе."""
+    cursor = conn.cursor()
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'name_index'")
+    return cursor.fetchone() is not None
+
+
+def _collect_names(cursor: sqlite3.Cursor) -> None:
+    """Собирает имена и синонимы объектов, реквизитов и методов во временную таблицу name_sources."""
+    cursor.execute('''
+        CREATE TEMP TABLE name_sources (
+            text TEXT, kind TEXT, object INTEGER, ref INTEGER,
+            object_type TEXT, object_name TEXT, item TEXT, container TEXT
+        )
+    ''')
+    # Объекты и их синонимы
+    cursor.execute('''
+        INSERT INTO name_sources
+        SELECT n.text, 'object', o.obj_id, o.obj_id, o.obj_type, o.obj_name, o.obj_name, NULL
+        FROM (SELECT obj_id AS owner, obj_name AS text FROM objects
+              UNION
+              SELECT object_synonyms_owner, object_synonyms_text FROM object_synonyms
+              WHERE object_synonyms_attr IS NULL) AS n
+        JOIN objects o ON o.obj_id = n.owner
+    ''')
+    # Реквизиты и их синонимы: вид определяется признаками obj_attributes
+    cursor.execute('''
+        INSERT INTO name_sources
+        SELECT n.text,
+               CASE WHEN a.is_tbl_part = 1 THEN 'tabular_section'
+                    WHEN a.is_dimension = 1 THEN 'dimension'
+                    WHEN a.is_resourse = 1 THEN 'resource'
+                    ELSE 'attribute' END,
+               o.obj_id, a.obj_attr_id, o.obj_type, o.obj_name, a.prop_name, a.table_part
+        FROM (SELECT obj_attr_id AS attr, prop_name AS text FROM obj_attributes
+              UNION
+              SELECT object_synonyms_attr, object_synonyms_text FROM object_synonyms
+              WHERE object_synonyms_attr IS NOT NULL) AS n
+        JOIN obj_attributes a ON a.obj_attr_id = n.attr
+        JOIN objects o ON o.obj_id = a.obj_attr_owner
+    ''')
+    # Методы всех модулей объекта, включая модули его форм и команд
+    cursor.execute('''
+        INSERT INTO name_sources
+        SELECT m.methods_name, 'method', o.obj_id, m.methods_id, o.obj_type, o.obj_name, m.methods_name,
+               COALESCE(ct.commands_templates_name || '.', '') || cb.code_body_name
+        FROM methods m
+        JOIN code_body cb ON cb.code_body_id = m.methods_owner_id
+        LEFT JOIN objects o ON o.obj_id = cb.code_body_owner
+        LEFT JOIN commands_templates ct ON ct.commands_templates_id = cb.code_body_owner_id
+    ''')
+
+
+def build_name_index(conn: sqlite3.Connection) -> int:
+    """Строит индекс имен заново по текущему содержимому базы.
+
+    Возвращает количество различающихся имен и синонимов в индексе.
+    """
+    # Проверяем до очистки таблиц: прежний индекс остается
+    if sqlite3.sqlite_version_info < TRIGRAM_SQLITE_VERSION:
+        logger.error(f"Индекс имен строится токенизатором trigram FTS5: нужна SQLite "
+                     f"{'.'.join(map(str, TRIGRAM_SQLITE_VERSION))} или новее, установлена {sqlite3.sqlite_version}")
+        raise RuntimeError(f"SQLite {sqlite3.sqlite_version} не поддерживает токенизатор trigram")
+    create_name_tables(conn)
+    cursor = conn.cursor()
+    for table in ('name_refs', 'name_trigram_stats', 'name_trigrams', 'name_index'):
+        cursor.execute(f"DELETE FROM {table}")
+    # Временные таблицы могли остаться от прерванного построения в этом же соединении
+    for table in TEMP_TABLES:
+        cursor.execute(f"DROP TABLE IF EXISTS temp.{table}")
+
+    _collect_names(cursor)
+    cursor.execute('''
+        INSERT INTO name_index (name_index_text)
+        SELECT text FROM name_sources
+        WHERE text IS NOT NULL AND text != ''
+        GROUP BY text
+    ''')
+    cursor.execute('''
+        INSERT INTO name_refs
+        SELECT n.name_index_id, s.kind, s.object, s.ref, s.object_type, s.object_name, s.item, s.container
+        FROM name_index n
+        JOIN name_sources s ON s.text = n.name_index_text
+        ORDER BY n.name_index_id
+    ''')
+
+    # Триграммы выделяет FTS5; fts5vocab выдает их упорядоченными по триграмме и имени,
+    # без позиций (detail = 'none') - по одной строке на триграмму имени
+    try:
+        cursor.execute('''
+            CREATE VIRTUAL TABLE temp.name_fts USING fts5(
+                text, content = '', detail = 'none', tokenize = 'trigram'
+            )
+        ''')
+    except sqlite3.OperationalError as e:
+        logger.error(f"SQLite собран без поддержки FTS5 или токенизатора trigram (нужна версия 3.34+): {e}")
+        raise
+    cursor.execute("INSERT INTO temp.name_fts (rowid, text) SELECT name_index_id, name_index_text FROM name_index")
+    cursor.execute("CREATE VIRTUAL TABLE temp.name_fts_vocab USING fts5vocab(temp, name_fts, 'instance')")
+    cursor.execute('''
+        INSERT OR IGNORE INTO name_trigrams (name_trigrams_trigram, name_trigrams_name)
+        SELECT term, doc FROM temp.name_fts_vocab
+    ''')
+    cursor.execute('''
+        INSERT INTO name_trigram_stats
+        SELECT name_trigrams_trigram, COUNT(*) FROM name_trigrams GROUP BY name_trigrams_trigram
+    ''')
+    for table in TEMP_TABLES:
+        cursor.execute(f"DROP TABLE temp.{table}")
+
+    conn.commit()
+    cursor.execute("SELECT COUNT(*) FROM name_index")
+    names = cursor.fetchone()[0]
+    logger.info(f"Проиндексировано имен и синонимов: {names}")
+    return names
+
+
+def _select_trigrams(cursor: sqlite3.Cursor, query_trigrams: Set[str]) -> List[str]:
+    """Выбирает самые редкие триграммы запроса, списки имен которых укладываются в бюджет.
+
+    Хотя бы одна триграмма выбирается всегда; триграммы, которых нет в индексе, не выбираются.
+    """
+    placeholders = ', '.join('?' * len(query_trigrams))
+    cursor.execute(f'''
+        SELECT name_trigram_stats_trigram, name_trigram_stats_names FROM name_trigram_stats
+        WHERE name_trigram_stats_trigram IN ({placeholders})
+        ORDER BY name_trigram_stats_names
+    ''', list(query_trigrams))
+    selected: List[str] = []
+    postings = 0
+    for trigram, names in cursor.fetchall():
+        if selected and postings + names > TRIGRAM_POSTINGS_BUDGET:
+            break
+        selected.append(trigram)
+        postings += names
+    return selected
+
+
+def _candidate_names(cursor: sqlite3.Cursor, text: str, query_trigrams: Set[str]) -> List[Tuple[int, str]]:
+    """Имена, похожие на запрос: (name_index_id, текст)."""
+    selected = _select_trigrams(cursor, query_trigrams)
+    candidates: List[Tuple[int, str]] = []
+    if selected:
+        params: Dict[str, object] = {f't{i}': trigram for i, trigram in enumerate(selected)}
+        placeholders = ', '.join(f':{name}' for name in params)
+        params.update({'query': len(query_trigrams), 'selected': len(selected), 'limit': NAME_CANDIDATES})
+        # Сходство оценивается в предположении, что невыбранные триграммы запроса
+        # совпадают в той же доле, что и выбранные; триграмм в имени - длина минус два
+        cursor.execute(f'''
+            SELECT name_index_id, name_index_text FROM (
+                SELECT n.name_index_id, n.name_index_text, length(n.name_index_text) - 2 AS size,
+                       MIN(1.0 * t.shared * :query / :selected, length(n.name_index_text) - 2) AS shared
+                FROM (SELECT name_trigrams_name AS name, COUNT(*) AS shared FROM name_trigrams
+                      WHERE name_trigrams_trigram IN ({placeholders})
+                      GROUP BY name_trigrams_name) AS t
+                JOIN name_index n ON n.name_index_id = t.name
+            )
+            ORDER BY shared / (:query + size - shared) DESC
+            LIMIT :limit
+        ''', params)
+        candidates = cursor.fetchall()
+    # Точное совпадение находится и тогда, когда все триграммы запроса слишком частые
+    cursor.execute("SELECT name_index_id, name_index_text FROM name_index WHERE name_index_text = ?", (text,))
+    candidates.extend(cursor.fetchall())
+    return candidates
+
+
+def _similarity(query_trigrams: Set[str], text: str) -> float:
+    """Коэффициент Жаккара по триграммам."""
+    text_trigrams = trigrams(text)
+    shared = len(query_trigrams & text_trigrams)
+    return shared / (len(query_trigrams) + len(text_trigrams) - shared)
+
+
+def search_names(conn: sqlite3.Connection, text: str, limit: int = 20,
+                 kinds: Optional[Iterable[str]] = None) -> List[NameHit]:
+    """Ищет объекты, реквизиты и методы по имени или синониму с учетом опечаток.
+
+    Возвращает до limit результатов от самых похожих к наименее похожим. kinds
+    ограничивает виды результатов (см. NAME_KINDS).
+    """
+    if not has_name_index(conn):
+        raise RuntimeError("Индекс имен не построен (используйте build_name_index)")
+    text = text.strip()
+    query_trigrams = trigrams(text)
+    if not query_trigrams:
+        raise ValueError(f"Строка поиска короче трех символов: {text!r}")
+    kinds = list(kinds) if kinds is not None else None
+
+    cursor = conn.cursor()
+    scores = {name_id: _similarity(query_trigrams, name_text)
+              for name_id, name_text in _candidate_names(cursor, text, query_trigrams)}
+    ranked = sorted(scores, key=lambda name_id: -scores[name_id])
+
+    # Ссылки читаются для имен в порядке убывания сходства, пока не наберется limit
+    hits: List[NameHit] = []
+    for start in range(0, len(ranked), limit):
+        chunk = ranked[start:start + limit]
+        kind_condition = f"AND r.name_refs_kind IN ({', '.join('?' * len(kinds))})" if kinds is not None else ""
+        cursor.execute(f'''
+            SELECT r.name_refs_name, r.name_refs_kind, n.name_index_text, r.name_refs_object_type,
+                   r.name_refs_object_name, r.name_refs_item, r.name_refs_container, r.name_refs_object,
+                   r.name_refs_ref
+            FROM name_refs r
+            JOIN name_index n ON n.name_index_id = r.name_refs_name
+            WHERE r.name_refs_name IN ({', '.join('?' * len(chunk))}) {kind_condition}
+        ''', chunk + (kinds or []))
+        hits.extend(NameHit(scores[row[0]], *row[1:]) for row in cursor.fetchall())
+        if len(hits) >= limit:
+            break
+    hits.sort(key=lambda hit: (-hit.score, NAME_KINDS.index(hit.kind), hit.object_type or '',
+                               hit.object_name or '', hit.container or '', hit.name))
+    return hits[:limit]
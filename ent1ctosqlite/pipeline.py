@@ -0,0 +1,208 @@
+"""
+Конвейер разбора модулей: чтение файлов, разбор и запись в базу перекрываются во времени.
+
+Файлы читает отдельный поток, разбирает второй поток (или пул процессов при jobs > 1),
+а результаты в исходном порядке получает вызывающий поток, который и пишет их в базу:
+соединение SQLite принадлежит ему. Этапы связаны ограниченными очередями, поэтому
+при медленной записи чтение и разбор приостанавливаются и память не растет.
+"""
+
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Callable, Dict, Iterable, Iterator, List, Optional
+
+logger = logging.getLogger('ent1ctosqlite')
+
+DEFAULT_QUEUE_SIZE = 64
+
+# Количество файлов, передаваемых процессу пула за один раз (jobs > 1)
+PARSE_CHUNK_SIZE = 16
+
+# Признак окончания данных в очереди
+_DONE = object()
+
+
+class _Failure:
+    """Исключение этапа, передаваемое по очереди следующему этапу."""
+    __slots__ = ('error',)
+
+    def __init__(self, error: BaseException):
+        self.error = error
+
+
+class StageQueue:
+    """Ограниченная очередь между этапами конвейера.
+
+    Запоминает глубину очереди после каждой вставки и время, которое этапы провели
+    в ожидании: put_wait - поставщик ждал места (следующий этап не успевает),
+    get_wait - получатель ждал данных (предыдущий этап не успевает).
+    """
+
+    def __init__(self, name: str, maxsize: int):
+        self.name = name
+        self.maxsize = maxsize
+        self._queue: queue.Queue = queue.Queue(maxsize)
+        self.puts = 0
+        self.depth_total = 0
+        self.max_depth = 0
+        self.put_wait = 0.0
+        self.get_wait = 0.0
+
+    def put(self, item) -> None:
+        start = time.perf_counter()
+        self._queue.put(item)
+        self.put_wait += time.perf_counter() - start
+        depth = self._queue.qsize()
+        self.puts += 1
+        self.depth_total += depth
+        if depth > self.max_depth:
+            self.max_depth = depth
+
+    def finish(self) -> None:
+        """Помещает в очередь признак окончания данных (в показателях не учитывается)."""
+        self._queue.put(_DONE)
+
+    def get(self):
+        start = time.perf_counter()
+        item = self._queue.get()
+        self.get_wait += time.perf_counter() - start
+        return item
+
+    def drain(self) -> None:
+        """Отбрасывает содержимое очереди, освобождая ожидающего поставщика."""
+        try:
+            while True:
+                self._queue.get_nowait()
+        except queue.Empty:
+            pass
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            'size': self.maxsize,
+            'items': self.puts,
+            'max_depth': self.max_depth,
+            'mean_depth': self.depth_total / self.puts if self.puts else 0.0,
+            'put_wait': self.put_wait,
+            'get_wait': self.get_wait,
+        }
+
+
+def _parse_chunk(parse: Callable, items: List) -> List:
+    """Разбирает пачку файлов в процессе пула."""
+    return [parse(item) for item in items]
+
+
+class Pipeline:
+    """Конвейер чтение -> разбор -> запись.
+
+    read(item) выполняется в потоке чтения, parse(результат read) - в потоке разбора
+    или в пуле из jobs процессов (parse должна быть функцией уровня модуля).
+    run(items) возвращает результаты parse в порядке items; запись выполняет
+    вызывающий поток. Очереди read и parse вмещают не более queue_size элементов
+    (при jobs > 1 элемент очереди parse - пачка из PARSE_CHUNK_SIZE файлов).
+    """
+
+    def __init__(self, read: Callable, parse: Callable, jobs: int = 1,
+                 queue_size: int = DEFAULT_QUEUE_SIZE):
+        if queue_size < 1:
+            raise ValueError(f"Размер очереди должен быть положительным: {queue_size}")
+        self.read = read
+        self.parse = parse
+        self.jobs = jobs
+        self.queues = [StageQueue('read', queue_size), StageQueue('parse', queue_size)]
+        self._stop = threading.Event()
+        # Задания, переданные пулу процессов: при остановке невыполненные отменяются
+        self._futures: List[Future] = []
+
+    def run(self, items: Iterable) -> Iterator:
+        read_queue, parse_queue = self.queues
+        pool = ProcessPoolExecutor(max_workers=self.jobs) if self.jobs > 1 else None
+        threads = [
+            threading.Thread(target=self._read_all, args=(items,), name='ent1ctosqlite-read', daemon=True),
+            threading.Thread(target=self._parse_all, args=(pool,), name='ent1ctosqlite-parse', daemon=True),
+        ]
+        for thread in threads:
+            thread.start()
+        try:
+            while True:
+                item = parse_queue.get()
+                if item is _DONE:
+                    break
+                if isinstance(item, _Failure):
+                    raise item.error
+                if pool is None:
+                    yield item
+                else:
+                    yield from item.result()
+        finally:
+            # Запись завершилась или прервалась: останавливаем этапы, освобождая их очереди
+            self._stop.set()
+            while any(thread.is_alive() for thread in threads):
+                read_queue.drain()
+                parse_queue.drain()
+                for thread in threads:
+                    thread.join(0.05)
+            if pool is not None:
+                # shutdown(cancel_futures=True) появился только в Python 3.9
+                for future in self._futures:
+                    future.cancel()
+                pool.shutdown(wait=True)
+
+    def _read_all(self, items: Iterable) -> None:
+        read_queue = self.queues[0]
+        try:
+            for item in items:
+                if self._stop.is_set():
+                    break
+                read_queue.put(self.read(item))
+        except Exception as e:
+            read_queue.put(_Failure(e))
+        finally:
+            read_queue.finish()
+
+    def _parse_all(self, pool: Optional[ProcessPoolExecutor]) -> None:
+        read_queue, parse_queue = self.queues
+        chunk: List = []
+        while not self._stop.is_set():
+            item = read_queue.get()
+            if item is _DONE or isinstance(item, _Failure):
+                if chunk:
+                    parse_queue.put(self._submit(pool, chunk))
+                if item is _DONE:
+                    parse_queue.finish()
+                else:
+                    parse_queue.put(item)
+                return
+            try:
+                if pool is None:
+                    parse_queue.put(self.parse(item))
+                    continue
+                chunk.append(item)
+                if len(chunk) >= PARSE_CHUNK_SIZE:
+                    parse_queue.put(self._submit(pool, chunk))
+                    chunk = []
+            except Exception as e:
+                parse_queue.put(_Failure(e))
+                return
+
+    def _submit(self, pool: ProcessPoolExecutor, chunk: List) -> Future:
+        # Выполненные задания не храним, чтобы не удерживать их результаты в памяти
+        self._futures = [future for future in self._futures if not future.done()]
+        future = pool.submit(_parse_chunk, self.parse, chunk)
+        self._futures.append(future)
+        return future
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        """Возвращает показатели очередей: имя -> размер, глубина, время ожидания."""
+        return {q.name: q.stats() for q in self.queues}
+
+    def log_stats(self, log: Optional[logging.Logger] = None) -> None:
+        """Выводит показатели очередей в лог."""
+        log = log or logger
+        for name, stats in self.stats().items():
+            log.info(f"Очередь {name}: элементов {stats['items']}, глубина средняя {stats['mean_depth']:.1f}, "
+                     f"наибольшая {stats['max_depth']} из {stats['size']}, "
+                     f"ожидание места {stats['put_wait']:.2f} с, ожидание данных {stats['get_wait']:.2f} с")
@@ -0,0 +1,431 @@
+"""
+Отчеты по объектам метаданных: реквизиты, табличные части, основания, движения и методы.
+
+Отчет строится постоянным числом запросов независимо от количества реквизитов
+и табличных частей объекта. Синонимы берутся из object_synonyms, заполняемой
+при импорте. Готовые отчеты кэшируются (LRU) до следующего импорта: ключ кэша
+включает номер поколения импорта (database.get_import_generation).
+
+Отчеты по всей конфигурации (iter_object_reports, export_reports) строятся
+за один проход: каждый раздел выбирается одним запросом для всех объектов.
+"""
+
+import copy
+import itertools
+import json
+import operator
+import sqlite3
+import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, Hashable, Iterable, Iterator, List, Optional
+
+from .database import get_import_generation
+from .utils import get_type_en, get_type_ru
+
+logger = logging.getLogger('ent1ctosqlite')
+
+REPORT_CACHE_SIZE = 256
+
+# Отчет по объекту (см. object_report)
+ObjectReport = Dict[str, object]
+
+_report_cache: 'OrderedDict[Hashable, ObjectReport]' = OrderedDict()
+# Кэшем пользуются потоки сервиса запросов (server.py)
+_report_cache_lock = threading.Lock()
+
+
+def clear_report_cache() -> None:
+    """Очищает кэш отчетов."""
+    with _report_cache_lock:
+        _report_cache.clear()
+
+
+def _synonym_condition(alias: str, lang: Optional[str]) -> str:
+    """Условие выбора синонима: на языке lang или основной (первый в описании)."""
+    if lang is None:
+        return f"{alias}.object_synonyms_position = 0"
+    return f"{alias}.object_synonyms_lang = :lang"
+
+
+def _database_key(conn: sqlite3.Connection) -> Hashable:
+    """Ключ базы в кэше: путь к файлу, для базы в памяти - соединение."""
+    cursor = conn.cursor()
+    cursor.execute("PRAGMA database_list")
+    for _, name, path in cursor.fetchall():
+        if name == 'main' and path:
+            return path
+    return id(conn)
+
+
+def _find_objects(cursor: sqlite3.Cursor, eng_type: str, obj_name: str, lang: Optional[str]) -> List[tuple]:
+    """Находит объекты типа по вхождению в имя или синоним; точное совпадение вытесняет остальные."""
+    cursor.execute(f"""
+        SELECT o.obj_id, o.obj_name, s.object_synonyms_text,
+               o.obj_name = :name OR EXISTS (
+                   SELECT 1 FROM object_synonyms e
+                   WHERE e.object_synonyms_owner = o.obj_id AND e.object_synonyms_attr IS NULL
+                   AND e.object_synonyms_text = :name) AS exact
+        FROM objects o
+        LEFT JOIN object_synonyms s ON s.object_synonyms_owner = o.obj_id AND s.object_synonyms_attr IS NULL
+             AND {_synonym_condition('s', lang)}
+        WHERE o.obj_type = :type
+        AND (o.obj_name LIKE :pattern OR EXISTS (
+             SELECT 1 FROM object_synonyms m
+             WHERE m.object_synonyms_owner = o.obj_id AND m.object_synonyms_attr IS NULL
+             AND m.object_synonyms_text LIKE :pattern))
+        ORDER BY o.obj_name
+    """, {'type': eng_type, 'name': obj_name, 'pattern': f"%{obj_name}%", 'lang': lang})
+    rows = cursor.fetchall()
+    exact = [row for row in rows if row[3]]
+    return exact or rows
+
+
+# Разделы отчета. Первый столбец - объект-владелец, строки упорядочены по нему:
+# один и тот же запрос выбирает раздел одного объекта (object_report) или всех
+# объектов сразу (iter_object_reports). {owner} - условие отбора владельцев.
+ATTRIBUTES_SQL = """
+    SELECT a.obj_attr_owner, a.prop_name, a.table_part, a.is_tbl_part, s.object_synonyms_text,
+           GROUP_CONCAT(CASE WHEN t.is_configuration_type = 1 THEN t.type_body ELSE t.type_class_ru END)
+    FROM obj_attributes a
+    LEFT JOIN object_synonyms s ON s.object_synonyms_attr = a.obj_attr_id AND {synonym}
+    LEFT JOIN obj_attr_types t ON t.obj_attr_type_owner = a.obj_attr_id
+    WHERE {owner} AND (a.is_attribute = 1 OR a.is_tbl_part = 1)
+    GROUP BY a.obj_attr_id
+    ORDER BY a.obj_attr_owner, a.table_part NULLS FIRST, a.is_tbl_part, a.prop_name
+"""
+
+FORMS_SQL = """
+    SELECT ct.commands_templates_owner, ct.commands_templates_name, ct.commands_templates_synonym
+    FROM commands_templates ct
+    WHERE {owner} AND ct.commands_templates_is_form = 1
+    ORDER BY ct.commands_templates_owner, ct.commands_templates_name
+"""
+
+DOCUMENT_SQL = """
+    SELECT based_on_owner AS owner, 'based_on', based_on_name FROM based_on WHERE {owner}
+    UNION ALL
+    SELECT register_records_owner, 'register_records', register_records_name FROM register_records
+    WHERE {owner_records}
+    ORDER BY 1, 2, 3
+"""
+
+# Методы всех модулей объекта, включая модули его форм и команд
+METHODS_SQL = """
+    SELECT cb.code_body_owner, COALESCE(ct.commands_templates_name || '.', '') || cb.code_body_name,
+           m.methods_name, m.methods_if_func, m.methods_is_export
+    FROM code_body cb
+    JOIN methods m ON m.methods_owner_id = cb.code_body_id
+    LEFT JOIN commands_templates ct ON ct.commands_templates_id = cb.code_body_owner_id
+    WHERE {owner}
+    ORDER BY 1, 2, m.methods_name
+"""
+
+
+def _owner_condition(column: str, obj_type: Optional[str] = None, single: bool = False) -> str:
+    """Условие отбора владельцев раздела: один объект, объекты типа или все объекты."""
+    if single:
+        return f"{column} = :owner"
+    if obj_type is not None:
+        return f"{column} IN (SELECT obj_id FROM objects WHERE obj_type = :type)"
+    return f"{column} IS NOT NULL"
+
+
+def _section_queries(lang: Optional[str], obj_type: Optional[str] = None,
+                     single: bool = False) -> Dict[str, str]:
+    """Запросы разделов отчета с условием отбора владельцев."""
+    def owner(column: str) -> str:
+        return _owner_condition(column, obj_type, single)
+
+    return {
+        'attributes': ATTRIBUTES_SQL.format(synonym=_synonym_condition('s', lang), owner=owner('a.obj_attr_owner')),
+        'forms': FORMS_SQL.format(owner=owner('ct.commands_templates_owner')),
+        'document': DOCUMENT_SQL.format(owner=owner('based_on_owner'),
+                                        owner_records=owner('register_records_owner')),
+        'methods': METHODS_SQL.format(owner=owner('cb.code_body_owner')),
+    }
+
+
+def _fill_attributes(report: ObjectReport, rows: Iterable[tuple]) -> None:
+    """Реквизиты и табличные части: синоним табличной части - в ее собственной строке."""
+    attributes: List[Dict[str, object]] = []
+    tabular_sections: Dict[str, Dict[str, object]] = {}
+    for _, prop_name, table_part, is_tbl_part, attr_synonym, types in rows:
+        if is_tbl_part:
+            tabular_sections[prop_name] = {'name': prop_name, 'synonym': attr_synonym, 'attributes': []}
+            continue
+        attribute = {'name': prop_name, 'synonym': attr_synonym, 'types': types.split(',') if types else []}
+        if table_part is None:
+            attributes.append(attribute)
+        else:
+            section = tabular_sections.setdefault(table_part, {'name': table_part, 'synonym': None,
+                                                               'attributes': []})
+            section['attributes'].append(attribute)
+    report['attributes'] = attributes
+    report['tabular_sections'] = sorted(tabular_sections.values(), key=lambda section: section['name'])
+
+
+def _fill_forms(report: ObjectReport, rows: Iterable[tuple]) -> None:
+    report['forms'] = [{'name': name, 'synonym': synonym} for _, name, synonym in rows]
+
+
+def _fill_document(report: ObjectReport, rows: Iterable[tuple]) -> None:
+    report['based_on'] = []
+    report['register_records'] = []
+    for _, key, value in rows:
+        report[key].append(value)
+
+
+def _fill_methods(report: ObjectReport, rows: Iterable[tuple]) -> None:
+    report['methods'] = [
+        {'module': module, 'name': method, 'is_function': bool(is_function), 'is_export': bool(is_export)}
+        for _, module, method, is_function, is_export in rows
+    ]
+
+
+_SECTION_FILLERS = {
+    'attributes': _fill_attributes,
+    'forms': _fill_forms,
+    'document': _fill_document,
+    'methods': _fill_methods,
+}
+
+
+def _build_report(conn: sqlite3.Connection, eng_type: str, obj_name: str, lang: Optional[str]) -> ObjectReport:
+    cursor = conn.cursor()
+    report: ObjectReport = {'type': eng_type, 'type_ru': get_type_ru(eng_type), 'query': obj_name,
+                            'object': None, 'candidates': []}
+    found = _find_objects(cursor, eng_type, obj_name, lang)
+    if len(found) != 1:
+        report['candidates'] = [{'name': row[1], 'synonym': row[2]} for row in found]
+        return report
+    obj_id, name, synonym, _ = found[0]
+    report['object'] = {'id': obj_id, 'name': name, 'synonym': synonym}
+
+    for section, sql in _section_queries(lang, single=True).items():
+        if section == 'document' and eng_type != 'Document':
+            _fill_document(report, [])
+            continue
+        cursor.execute(sql, {'owner': obj_id, 'lang': lang})
+        _SECTION_FILLERS[section](report, cursor.fetchall())
+    return report
+
+
+def object_report(conn: sqlite3.Connection, obj_type: str, obj_name: str,
+                  lang: Optional[str] = None) -> Optional[ObjectReport]:
+    """Возвращает отчет по объекту метаданных или None, если тип неизвестен.
+
+    obj_type - тип на русском (Справочник) или английском (Catalog). Объект ищется
+    по вхождению obj_name в имя или синоним; если точно совпадающее имя или синоним
+    есть, остальные вхождения не учитываются. Если найден не один объект, в отчете
+    заполнен только список candidates. Синонимы - на языке lang (ru, en, ...),
+    по умолчанию - на первом языке описания объекта.
+    """
+    eng_type = get_type_en(obj_type) or (obj_type if get_type_ru(obj_type) else None)
+    if eng_type is None:
+        return None
+    key = (_database_key(conn), get_import_generation(conn), eng_type, obj_name, lang)
+    with _report_cache_lock:
+        report = _report_cache.get(key)
+        if report is not None:
+            _report_cache.move_to_end(key)
+    if report is None:
+        report = _build_report(conn, eng_type, obj_name, lang)
+        with _report_cache_lock:
+            _report_cache[key] = report
+            if len(_report_cache) > REPORT_CACHE_SIZE:
+                _report_cache.popitem(last=False)
+    # Отчет из кэша не должен меняться вызывающим кодом
+    return copy.deepcopy(report)
+
+
+def _with_synonym(name: str, synonym: Optional[str]) -> str:
+    return f"{name} ({synonym})" if synonym else name
+
+
+def print_object_report(report: ObjectReport) -> None:
+    """Выводит отчет по объекту (см. object_report)."""
+    print(f"\n=== Поиск объекта типа {report['type']} с именем/синонимом '{report['query']}' ===")
+    obj = report['object']
+    if obj is None:
+        if not report['candidates']:
+            print("Объект не найден")
+            return
+        print("\nНайдено несколько объектов:")
+        for candidate in report['candidates']:
+            print(f"- {_with_synonym(candidate['name'], candidate['synonym'])}")
+        return
+
+    print(f"\n=== Информация об объекте {_with_synonym(obj['name'], obj['synonym'])} ===")
+
+    def print_attribute(attribute: Dict[str, object]) -> None:
+        types = f" - {','.join(attribute['types'])}" if attribute['types'] else ""
+        print(f"  - {_with_synonym(attribute['name'], attribute['synonym'])}{types}")
+
+    if report['attributes'] or report['tabular_sections']:
+        print("\nРеквизиты объекта:")
+        for attribute in report['attributes']:
+            print_attribute(attribute)
+        for section in report['tabular_sections']:
+            synonym = f" ({section['synonym']})" if section['synonym'] else ""
+            print(f"\nТабличная часть '{section['name']}'{synonym}:")
+            for attribute in section['attributes']:
+                print_attribute(attribute)
+
+    if report['forms']:
+        print("\nФормы объекта:")
+        for form in report['forms']:
+            print(f"  - {_with_synonym(form['name'], form['synonym'])}")
+
+    if report['based_on']:
+        print("\nОснования документа:")
+        for name in report['based_on']:
+            print(f"  - {name}")
+    if report['register_records']:
+        print("\nРегистры, в которые пишет документ:")
+        for name in report['register_records']:
+            print(f"  - {name}")
+
+    if report['methods']:
+        print("\nМетоды объекта:")
+        for method in report['methods']:
+            method_type = "Функция" if method['is_function'] else "Процедура"
+            export_mark = " Экспорт" if method['is_export'] else ""
+            print(f"  - {method_type} {method['name']}(){export_mark} [{method['module']}]")
+
+
+class _OwnerRows:
+    """Строки раздела всех объектов, упорядоченные по владельцу; выдаются по одному объекту."""
+
+    def __init__(self, cursor: sqlite3.Cursor):
+        self._groups = itertools.groupby(cursor, key=operator.itemgetter(0))
+        self._current = next(self._groups, None)
+
+    def take(self, owner: int) -> List[tuple]:
+        """Возвращает строки владельца owner; владельцы должны запрашиваться по возрастанию."""
+        while self._current is not None and self._current[0] < owner:
+            self._current = next(self._groups, None)
+        if self._current is None or self._current[0] != owner:
+            return []
+        rows = list(self._current[1])
+        self._current = next(self._groups, None)
+        return rows
+
+
+def _resolve_type(obj_type: Optional[str]) -> Optional[str]:
+    if obj_type is None:
+        return None
+    eng_type = get_type_en(obj_type) or (obj_type if get_type_ru(obj_type) else None)
+    if eng_type is None:
+        logger.error(f"Неизвестный тип объекта: {obj_type}")
+        raise ValueError(f"Неизвестный тип объекта: {obj_type}")
+    return eng_type
+
+
+def iter_object_reports(conn: sqlite3.Connection, obj_type: Optional[str] = None,
+                        lang: Optional[str] = None) -> Iterator[ObjectReport]:
+    """Выдает отчеты (см. object_report) по всем объектам конфигурации или объектам типа obj_type.
+
+    Каждый раздел отчета выбирается одним запросом сразу для всех объектов, строки
+    упорядочены по объекту, и курсоры читаются параллельно: число запросов не зависит
+    от числа объектов, а в памяти находится отчет только одного объекта.
+    """
+    # Тип проверяется сразу при вызове, а не при чтении первого отчета
+    return _iter_reports(conn, _resolve_type(obj_type), lang)
+
+
+def _iter_reports(conn: sqlite3.Connection, eng_type: Optional[str], lang: Optional[str]) -> Iterator[ObjectReport]:
+    params = {'type': eng_type, 'lang': lang}
+    objects = conn.cursor()
+    objects.execute(f"""
+        SELECT o.obj_id, o.obj_type, o.obj_name, s.object_synonyms_text
+        FROM objects o
+        LEFT JOIN object_synonyms s ON s.object_synonyms_owner = o.obj_id AND s.object_synonyms_attr IS NULL
+             AND {_synonym_condition('s', lang)}
+        WHERE {'o.obj_type = :type' if eng_type else '1'}
+        ORDER BY o.obj_id
+    """, params)
+    sections = {}
+    for section, sql in _section_queries(lang, eng_type).items():
+        sections[section] = _OwnerRows(conn.cursor().execute(sql, params))
+
+    for obj_id, type_en, name, synonym in objects:
+        report: ObjectReport = {'type': type_en, 'type_ru': get_type_ru(type_en), 'query': name,
+                                'object': {'id': obj_id, 'name': name, 'synonym': synonym}, 'candidates': []}
+        for section, rows in sections.items():
+            _SECTION_FILLERS[section](report, rows.take(obj_id))
+        yield report
+
+
+def _markdown_lines(report: ObjectReport) -> Iterator[str]:
+    """Строки отчета по объекту в формате Markdown."""
+    obj = report['object']
+    yield f"## {report['type_ru'] or report['type']}.{_with_synonym(obj['name'], obj['synonym'])}"
+
+    def attribute_line(attribute: Dict[str, object]) -> str:
+        types = f": {', '.join(attribute['types'])}" if attribute['types'] else ""
+        return f"- {_with_synonym(attribute['name'], attribute['synonym'])}{types}"
+
+    if report['attributes']:
+        yield ""
+        yield "### Реквизиты"
+        yield ""
+        for attribute in report['attributes']:
+            yield attribute_line(attribute)
+    for section in report['tabular_sections']:
+        yield ""
+        yield f"### Табличная часть {_with_synonym(section['name'], section['synonym'])}"
+        yield ""
+        for attribute in section['attributes']:
+            yield attribute_line(attribute)
+    if report['forms']:
+        yield ""
+        yield "### Формы"
+        yield ""
+        for form in report['forms']:
+            yield f"- {_with_synonym(form['name'], form['synonym'])}"
+    for key, title in (('based_on', "Основания"), ('register_records', "Движения")):
+        if report[key]:
+            yield ""
+            yield f"### {title}"
+            yield ""
+            for name in report[key]:
+                yield f"- {name}"
+    if report['methods']:
+        yield ""
+        yield "### Методы"
+        yield ""
+        for method in report['methods']:
+            method_type = "Функция" if method['is_function'] else "Процедура"
+            export_mark = " Экспорт" if method['is_export'] else ""
+            yield f"- `{method_type} {method['name']}(){export_mark}` [{method['module']}]"
+    yield ""
+
+
+REPORT_FORMATS = ('jsonl', 'markdown')
+
+
+def export_reports(conn: sqlite3.Connection, path: str, fmt: str = 'jsonl',
+                   obj_type: Optional[str] = None, lang: Optional[str] = None) -> int:
+    """Записывает отчеты по всем объектам (или объектам типа obj_type) в файл path.
+
+    fmt - jsonl (отчет объекта - одна строка JSON) или markdown. Файл пишется
+    по мере чтения отчетов (см. iter_object_reports). Возвращает число объектов.
+    """
+    if fmt not in REPORT_FORMATS:
+        logger.error(f"Неизвестный формат отчета: {fmt}")
+        raise ValueError(f"Неизвестный формат отчета: {fmt}")
+    reports = iter_object_reports(conn, obj_type, lang)
+    count = 0
+    with open(path, 'w', encoding='utf-8', newline='\n') as f:
+        if fmt == 'markdown':
+            f.write("# Объекты конфигурации\n\n")
+        for report in reports:
+            if fmt == 'jsonl':
+                f.write(json.dumps(report, ensure_ascii=False))
+                f.write("\n")
+            else:
+                f.writelines(f"{line}\n" for line in _markdown_lines(report))
+            count += 1
+    logger.info(f"Отчеты по объектам сохранены в {path}: {count}")
+    return count
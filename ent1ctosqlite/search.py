@@ -0,0 +1,186 @@
+"""
+Полнотекстовый поиск по коду модулей (SQLite FTS5).
+"""
+
+import re
+import sqlite3
+import logging
+from typing import List, NamedTuple, Optional, Tuple
+from .blobs import register_functions
+
+logger = logging.getLogger('ent1ctosqlite')
+
+# unicode61 приводит к нижнему регистру и кириллицу; remove_diacritics 0 сохраняет
+# различие Й/И и Ё/Е, а '_' считается частью идентификатора.
+FTS_TOKENIZER = "unicode61 remove_diacritics 0 tokenchars '_'"
+
+WORD_PATTERN = re.compile(r'\w+\*?')
+FTS_OPERATORS = {'AND', 'OR', 'NOT', 'NEAR'}
+
+
+class CodeHit(NamedTuple):
+    """Результат поиска по коду; module_name модуля формы или команды - <Форма>.<Модуль>."""
+    object_type: Optional[str]
+    object_name: Optional[str]
+    module_name: Optional[str]
+    module_type: Optional[str]
+    method_name: Optional[str]
+    line: int
+    text: str
+    code_body_id: int
+    methods_id: Optional[int]
+
+
+def create_fts_table(conn: sqlite3.Connection) -> None:
+    """Создает таблицу полнотекстового индекса, если она еще не создана."""
+    try:
+        conn.execute(f'''
+            CREATE VIRTUAL TABLE IF NOT EXISTS code_fts USING fts5(
+                body,                       -- Текст метода или модуля вне методов
+                code_body_id UNINDEXED,     -- Ссылка на модуль
+                methods_id UNINDEXED,       -- Ссылка на метод (NULL для текста вне методов)
+                start_line UNINDEXED,       -- Номер строки модуля, с которой начинается body
+                tokenize = "{FTS_TOKENIZER}"
+            )
+        ''')
+    except sqlite3.OperationalError as e:
+        logger.error(f"SQLite собран без поддержки FTS5: {e}")
+        raise
+
+
+def has_fts_index(conn: sqlite3.Connection) -> bool:
+    """Проверяет наличие полнотекстового индекса в базе."""
+    cursor = conn.cursor()
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'code_fts'")
+    return cursor.fetchone() is not None
+
+
+def _fts_rows(code_body_id: int, module_code: str,
+              methods: List[Tuple[int, int, int, int]]) -> List[Tuple[str, int, Optional[int], int]]:
+    """Разбивает модуль на строки индекса: по одной на метод и одна на текст вне методов."""
+    rows = []
+    outside = []
+    pos = 0
+    for methods_id, start_offset, end_offset, start_line in methods:
+        rows.append((module_code[start_offset:end_offset], code_body_id, methods_id, start_line))
+        outside.append(module_code[pos:start_offset])
+        # Тело метода заменяется переводами строк, чтобы номера строк не смещались
+        outside.append('\n' * module_code.count('\n', start_offset, end_offset))
+        pos = max(pos, end_offset)
+    outside.append(module_code[pos:])
+    text = ''.join(outside)
+    if text.strip():
+        rows.append((text, code_body_id, None, 1))
+    return rows
+
+
+def build_fts_index(conn: sqlite3.Connection, rebuild: bool = False) -> int:
+    """Строит полнотекстовый индекс по модулям, которые еще не проиндексированы.
+
+    Возвращает количество проиндексированных модулей. При rebuild=True индекс
+    строится заново.
+    """
+    create_fts_table(conn)
+    register_functions(conn)
+    cursor = conn.cursor()
+    if rebuild:
+        cursor.execute("DELETE FROM code_fts")
+
+    # Тексты модулей распаковываются представлением code_modules
+    cursor.execute('''
+        SELECT code_body_id, code_body_module FROM code_modules
+        WHERE code_body_id NOT IN (SELECT code_body_id FROM code_fts)
+        ORDER BY code_body_id
+    ''')
+    modules = cursor.fetchall()
+
+    methods_cursor = conn.cursor()
+    indexed = 0
+    for code_body_id, module_code in modules:
+        if not module_code:
+            continue
+        methods_cursor.execute('''
+            SELECT methods_id, methods_start_offset, methods_end_offset, methods_start_line
+            FROM methods
+            WHERE methods_owner_id = ? AND methods_start_offset IS NOT NULL
+            ORDER BY methods_start_offset
+        ''', (code_body_id,))
+        rows = _fts_rows(code_body_id, module_code, methods_cursor.fetchall())
+        methods_cursor.executemany('''
+            INSERT INTO code_fts (body, code_body_id, methods_id, start_line) VALUES (?, ?, ?, ?)
+        ''', rows)
+        indexed += 1
+
+    conn.commit()
+    logger.info(f"Проиндексировано модулей: {indexed}")
+    return indexed
+
+
+def delete_from_fts_index(conn: sqlite3.Connection, code_body_ids: List[int]) -> None:
+    """Удаляет модули из полнотекстового индекса, если он построен."""
+    if not code_body_ids or not has_fts_index(conn):
+        return
+    cursor = conn.cursor()
+    cursor.executemany("DELETE FROM code_fts WHERE code_body_id = ?", [(i,) for i in code_body_ids])
+
+
+def make_fts_query(text: str) -> str:
+    """Преобразует строку поиска в запрос FTS5: слова ищутся как одна фраза.
+
+    'ОбщегоНазначения.Сообщить*' -> '"ОбщегоНазначения" + "Сообщить"*'
+    """
+    words = [w for w in WORD_PATTERN.findall(text) if w.upper() not in FTS_OPERATORS]
+    if not words:
+        raise ValueError(f"Строка поиска не содержит слов: {text!r}")
+    return ' + '.join(
+        f'"{w[:-1]}"*' if w.endswith('*') else f'"{w}"' for w in words
+    )
+
+
+def _hit_line(body: str, start_line: int, words: List[str]) -> Tuple[int, str]:
+    """Находит первую строку текста, содержащую слово запроса."""
+    lowered = body.lower()
+    positions = [lowered.find(w.rstrip('*').lower()) for w in words]
+    positions = [p for p in positions if p >= 0]
+    pos = min(positions) if positions else 0
+    line_start = body.rfind('\n', 0, pos) + 1
+    line_end = body.find('\n', pos)
+    if line_end < 0:
+        line_end = len(body)
+    return start_line + body.count('\n', 0, pos), body[line_start:line_end].strip()
+
+
+def search_code(conn: sqlite3.Connection, text: str, limit: int = 50, raw: bool = False) -> List[CodeHit]:
+    """Ищет текст в коде модулей через полнотекстовый индекс.
+
+    Возвращает модуль, метод и строку для каждого найденного фрагмента, от лучших
+    совпадений к худшим. При raw=True text передается в FTS5 как есть.
+    """
+    if not has_fts_index(conn):
+        raise RuntimeError("Полнотекстовый индекс не построен (используйте --build-fts)")
+    query = text if raw else make_fts_query(text)
+    words = WORD_PATTERN.findall(text)
+
+    cursor = conn.cursor()
+    cursor.execute('''
+        SELECT f.body, f.code_body_id, f.methods_id, f.start_line,
+               o.obj_type, o.obj_name, COALESCE(ct.commands_templates_name || '.', '') || cb.code_body_name,
+               cb.code_body_module_type, m.methods_name
+        FROM code_fts f
+        JOIN code_body cb ON cb.code_body_id = f.code_body_id
+        LEFT JOIN objects o ON o.obj_id = cb.code_body_owner
+        -- Модули форм и команд подписываются именем формы или команды: ФормаЭлемента.Module
+        LEFT JOIN commands_templates ct ON ct.commands_templates_id = cb.code_body_owner_id
+        LEFT JOIN methods m ON m.methods_id = f.methods_id
+        WHERE code_fts MATCH ?
+        ORDER BY f.rank
+        LIMIT ?
+    ''', (query, limit))
+
+    hits = []
+    for body, code_body_id, methods_id, start_line, obj_type, obj_name, module_name, module_type, method_name \
+            in cursor.fetchall():
+        line, line_text = _hit_line(body, start_line, words)
+        hits.append(CodeHit(obj_type, obj_name, module_name, module_type, method_name,
+                            line, line_text, code_body_id, methods_id))
+    return hits
@@ -0,0 +1,307 @@
+"""
+HTTP сервис запросов к базе (ent1ctosqlite serve): отчеты по объектам, поиск по коду
+и по именам, вызывающие методы. Ответы - JSON, сервис только читает базу.
+
+Запросы обслуживает пул соединений, открытых один раз: файл базы открывается только
+для чтения (mode=ro), а страницы базы отображаются в память (mmap_size), поэтому
+все соединения читают один прогретый страничный кэш ОС. Сервис ничего не меняет
+в базе, в том числе режим журнала: импорт с --incremental в тот же файл не блокирует
+чтение, только если база уже переведена в режим WAL (PRAGMA journal_mode = WAL).
+Если файл базы заменен (импорт с --build-in), соединения с прежним файлом закрываются
+и открываются заново.
+"""
+
+import json
+import logging
+import os
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+from urllib.parse import parse_qs, quote, urlsplit
+
+from .callgraph import find_methods, get_callers, DEFAULT_CALLER_DEPTH
+from .database import check_sqlite_version, find_outdated_structure, get_import_generation
+from .names import search_names
+from .reports import object_report
+from .search import search_code
+
+logger = logging.getLogger('ent1ctosqlite')
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8765
+DEFAULT_POOL_SIZE = 4
+
+# Размер отображения базы в память и страничный кэш соединения (в КБ)
+SERVE_MMAP_SIZE = 1024 * 1024 * 1024
+SERVE_CACHE_KB = 64 * 1024
+
+# Сколько секунд запрос ждет свободного соединения
+POOL_TIMEOUT = 30
+
+# Блок чтения файла базы при прогреве кэша
+WARM_CHUNK_SIZE = 1024 * 1024
+
+
+class ConnectionPool:
+    """Пул соединений только для чтения к одной базе.
+
+    Соединения открываются по мере надобности, но не более size, и выдаются
+    в порядке LIFO: чаще всего работает одно и то же, уже прогретое соединение.
+    """
+
+    def __init__(self, db_path: str, size: int = DEFAULT_POOL_SIZE):
+        if size < 1:
+            raise ValueError(f"Размер пула должен быть положительным: {size}")
+        self.db_path = db_path
+        self.size = size
+        self._idle: queue.LifoQueue = queue.LifoQueue()
+        self._files: Dict[sqlite3.Connection, Tuple[int, int]] = {}
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def _file_id(self) -> Tuple[int, int]:
+        stat = os.stat(self.db_path)
+        return stat.st_dev, stat.st_ino
+
+    def _connect(self) -> sqlite3.Connection:
+        """Открывает файл базы только для чтения."""
+        return sqlite3.connect(f"file:{quote(os.path.abspath(self.db_path))}?mode=ro", uri=True,
+                               check_same_thread=False)
+
+    def _open(self) -> sqlite3.Connection:
+        file_id = self._file_id()
+        conn = self._connect()
+        conn.execute(f"PRAGMA mmap_size = {SERVE_MMAP_SIZE}")
+        conn.execute(f"PRAGMA cache_size = -{SERVE_CACHE_KB}")
+        conn.execute("PRAGMA query_only = ON")
+        self._files[conn] = file_id
+        return conn
+
+    def _discard(self, conn: sqlite3.Connection) -> None:
+        with self._lock:
+            self._files.pop(conn, None)
+        conn.close()
+
+    @contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        """Выдает соединение на время запроса."""
+        if self._closed:
+            raise RuntimeError("Пул соединений закрыт")
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            conn = None
+            with self._lock:
+                if len(self._files) < self.size:
+                    conn = self._open()
+            if conn is None:
+                try:
+                    conn = self._idle.get(timeout=POOL_TIMEOUT)
+                except queue.Empty:
+                    logger.error(f"Нет свободного соединения с базой за {POOL_TIMEOUT} с")
+                    raise
+        if self._files.get(conn) != self._file_id():
+            # Файл базы заменен: соединение читает прежний файл
+            self._discard(conn)
+            with self._lock:
+                conn = self._open()
+        try:
+            yield conn
+        finally:
+            if self._closed:
+                self._discard(conn)
+            else:
+                self._idle.put(conn)
+
+    def warm(self) -> int:
+        """Читает файл базы целиком, чтобы его страницы оказались в кэше ОС; возвращает размер."""
+        size = 0
+        with open(self.db_path, 'rb') as f:
+            while True:
+                chunk = f.read(WARM_CHUNK_SIZE)
+                if not chunk:
+                    break
+                size += len(chunk)
+        return size
+
+    def stats(self) -> Dict[str, int]:
+        return {'size': self.size, 'open': len(self._files), 'idle': self._idle.qsize()}
+
+    def close(self) -> None:
+        """Закрывает свободные соединения; занятые закрываются по окончании запроса."""
+        self._closed = True
+        while True:
+            try:
+                self._discard(self._idle.get_nowait())
+            except queue.Empty:
+                break
+
+
+class BadRequest(ValueError):
+    """Ошибка в параметрах запроса."""
+
+
+class OutdatedDatabaseError(RuntimeError):
+    """Структура базы создана прежней версией и не подходит для запросов сервиса."""
+
+
+Params = Dict[str, List[str]]
+
+
+def _param(params: Params, name: str, default: Optional[str] = None) -> str:
+    values = params.get(name)
+    if not values or not values[0]:
+        if default is None:
+            raise BadRequest(f"Не указан параметр {name}")
+        return default
+    return values[0]
+
+
+def _int_param(params: Params, name: str, default: int) -> int:
+    value = _param(params, name, str(default))
+    try:
+        return int(value)
+    except ValueError:
+        raise BadRequest(f"Параметр {name} должен быть целым числом: {value!r}")
+
+
+def _object(conn: sqlite3.Connection, params: Params):
+    report = object_report(conn, _param(params, 'type'), _param(params, 'name'), params.get('lang', [None])[0])
+    if report is None:
+        raise BadRequest(f"Неизвестный тип объекта: {_param(params, 'type')}")
+    return report
+
+
+def _names(conn: sqlite3.Connection, params: Params):
+    hits = search_names(conn, _param(params, 'q'), _int_param(params, 'limit', 20), params.get('kind'))
+    return [hit._asdict() for hit in hits]
+
+
+def _search(conn: sqlite3.Connection, params: Params):
+    hits = search_code(conn, _param(params, 'q'), _int_param(params, 'limit', 50))
+    return [hit._asdict() for hit in hits]
+
+
+def _callers(conn: sqlite3.Connection, params: Params):
+    # Имя вроде 'ПриСозданииНаСервере' есть в тысячах модулей: отвечаем по первым limit методам
+    methods_ids = find_methods(conn, _param(params, 'name'))
+    depth = _int_param(params, 'depth', DEFAULT_CALLER_DEPTH)
+    return {
+        'total': len(methods_ids),
+        'methods': [
+            {'methods_id': methods_id,
+             'callers': [caller._asdict() for caller in get_callers(conn, methods_id, depth)]}
+            for methods_id in methods_ids[:_int_param(params, 'limit', 20)]
+        ],
+    }
+
+
+# Маршруты: путь -> функция(соединение, параметры), возвращающая данные ответа
+ROUTES: Dict[str, Callable[[sqlite3.Connection, Params], object]] = {
+    '/object': _object,
+    '/names': _names,
+    '/search': _search,
+    '/callers': _callers,
+}
+
+
+class QueryHandler(BaseHTTPRequestHandler):
+    """Обработчик GET запросов; соединения с базой берет из пула сервера."""
+
+    # Соединение с клиентом сохраняется между запросами
+    protocol_version = 'HTTP/1.1'
+    # Заголовки и тело ответа уходят отдельными пакетами: без TCP_NODELAY второй
+    # пакет ждет подтверждения первого (задержка ~40 мс на каждый запрос)
+    disable_nagle_algorithm = True
+    server: 'QueryServer'
+
+    def do_GET(self) -> None:
+        path = self.path
+        try:
+            # Кириллица, переданная без %-кодирования: http.server читает строку запроса как latin-1
+            path = path.encode('latin-1').decode('utf-8')
+        except UnicodeError:
+            pass
+        url = urlsplit(path)
+        params = parse_qs(url.query)
+        try:
+            if url.path == '/health':
+                with self.server.pool.connection() as conn:
+                    data = {'status': 'ok', 'database': self.server.pool.db_path,
+                            'import_generation': get_import_generation(conn), 'pool': self.server.pool.stats()}
+                self._send(HTTPStatus.OK, data)
+                return
+            route = ROUTES.get(url.path)
+            if route is None:
+                self._send(HTTPStatus.NOT_FOUND, {'error': f"Неизвестный запрос: {url.path}"})
+                return
+            with self.server.pool.connection() as conn:
+                data = route(conn, params)
+            self._send(HTTPStatus.OK, data)
+        except ValueError as e:
+            self._send(HTTPStatus.BAD_REQUEST, {'error': str(e)})
+        except (RuntimeError, queue.Empty) as e:
+            # Индекс не построен или все соединения заняты
+            self._send(HTTPStatus.SERVICE_UNAVAILABLE, {'error': str(e) or "Нет свободного соединения с базой"})
+        except Exception as e:
+            logger.exception(f"Ошибка при обработке запроса {self.path}")
+            self._send(HTTPStatus.INTERNAL_SERVER_ERROR, {'error': str(e)})
+
+    def _send(self, status: HTTPStatus, data) -> None:
+        body = json.dumps(data, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args) -> None:
+        logger.debug(f"{self.address_string()} {format % args}")
+
+
+class QueryServer(ThreadingHTTPServer):
+    """HTTP сервер запросов; каждый запрос обрабатывается в своем потоке."""
+
+    daemon_threads = True
+
+    def __init__(self, db_path: str, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT,
+                 pool_size: int = DEFAULT_POOL_SIZE):
+        if not os.path.exists(db_path):
+            logger.error(f"База данных не найдена: {db_path}")
+            raise FileNotFoundError(db_path)
+        check_sqlite_version()
+        self.pool = ConnectionPool(db_path, pool_size)
+        with self.pool.connection() as conn:
+            problems = find_outdated_structure(conn)
+        if problems:
+            self.pool.close()
+            logger.error(f"Структура базы {db_path} устарела: {'; '.join(problems)}. Сервис только читает "
+                         f"базу и не обновляет ее: выполните импорт в эту базу (например, с --incremental)")
+            raise OutdatedDatabaseError(db_path)
+        super().__init__((host, port), QueryHandler)
+
+    def server_close(self) -> None:
+        super().server_close()
+        self.pool.close()
+
+
+def serve(db_path: str, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT,
+          pool_size: int = DEFAULT_POOL_SIZE) -> None:
+    """Запускает сервис и обслуживает запросы до прерывания (Ctrl+C).
+
+    База со структурой прежней версии не обновляется: сервис не запускается (OutdatedDatabaseError).
+    """
+    server = QueryServer(db_path, host, port, pool_size)
+    warmed = server.pool.warm()
+    logger.info(f"Кэш прогрет: {warmed / 1024 / 1024:.1f} МБ")
+    logger.info(f"Сервис запросов к {db_path}: http://{server.server_address[0]}:{server.server_address[1]}/")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        logger.info("Сервис остановлен")
+    finally:
+        server.server_close()
@@ -1,18 +1,21 @@
 import os
 import logging
 from datetime import datetime
+from functools import lru_cache
 import xml.etree.ElementTree as ET
-from typing import Optional, Dict, Union
+from typing import BinaryIO, Callable, Dict, Iterator, List, Optional, Tuple, Union
+from .vfs import DEFAULT_SOURCE, DirectorySource
+from .metrics import stage, count_items
 
-logger = logging.getLogger('vcv_parser')
+logger = logging.getLogger('ent1ctosqlite')
 
 def setup_logger(log_to_file: bool = False, debug_mode: bool = False) -> logging.Logger:
     """Настраивает систему логирования."""
     # Получаем абсолютный путь к директории скрипта
     script_dir = os.path.dirname(os.path.abspath(__file__))
     
-    # Создаем логгер
-    logger = logging.getLogger('vcv_parser')
+    # Логгер пакета: в него пишут все модули ent1ctosqlite
+    logger = logging.getLogger('ent1ctosqlite')
     logger.setLevel(logging.INFO)
     
     # Очищаем существующие обработчики
@@ -71,52 +74,168 @@ def is_in_excluded_types(type_name: str) -> bool:
         'ScheduledJob'
     ]
 
-def find_configuration_root(path: str) -> Optional[str]:
-    """Находит каталог, содержащий Configuration.xml."""
+# Configuration.xml обычно лежит в корне выгрузки или на 1-2 уровня ниже
+DEFAULT_ROOT_SEARCH_DEPTH = 3
+
+def dump_tree(path: str, source: Optional[DirectorySource] = None,
+              log: Optional[logging.Logger] = None) -> None:
+    """Выводит в лог (уровень DEBUG) дерево каталогов и файлов."""
+    source = source or DEFAULT_SOURCE
+    log = log or logger
+    log.debug("Структура каталогов:")
+    for root, dirs, files in source.walk(path):
+        rel_path = source.relpath(root, path)
+        level = 0 if rel_path == '.' else len(source.split(rel_path))
+        log.debug(f"{' ' * 4 * level}[{os.path.basename(root) or root}]")
+        for f in files:
+            log.debug(f"{' ' * 4 * (level + 1)}{f}")
+
+def find_configuration_root(path: str, source: Optional[DirectorySource] = None,
+                            max_depth: int = DEFAULT_ROOT_SEARCH_DEPTH,
+                            dump: bool = False) -> Optional[str]:
+    """Находит каталог, содержащий Configuration.xml.
+    
+    Каталоги проверяются в ширину, начиная с path, не глубже max_depth уровней:
+    на каждом уровне сначала проверяется наличие Configuration.xml, и только
+    затем читается список подкаталогов. Для zip-архива используется тот же обход
+    по индексу имен архива. Дерево каталогов выводится в лог только при dump=True.
+    """
+    source = source or DEFAULT_SOURCE
     logger.debug(f"Поиск Configuration.xml в: {path}")
     
-    if not os.path.exists(path):
+    if not source.exists(path):
         logger.error(f"Каталог не существует: {path}")
         return None
         
     try:
-        # Выводим полное дерево каталогов
-        logger.debug("Структура каталогов:")
-        for root, dirs, files in os.walk(path):
-            level = root.replace(path, '').count(os.sep)
-            indent = ' ' * 4 * level
-            logger.debug(f"{indent}[{os.path.basename(root)}]")
-            subindent = ' ' * 4 * (level + 1)
-            for f in files:
-                logger.debug(f"{subindent}{f}")
-                if f == "Configuration.xml":
-                    logger.debug(f"\nНайден Configuration.xml в: {root}")
-                    return root
+        if dump:
+            dump_tree(path, source)
+        
+        with stage('discover'):
+            level = [path]
+            for depth in range(max_depth + 1):
+                count_items('discover', len(level))
+                for root in level:
+                    if source.isfile(source.join(root, "Configuration.xml")):
+                        logger.debug(f"Найден Configuration.xml в: {root} (глубина {depth})")
+                        return root
+                if depth == max_depth:
+                    break
+                level = [source.join(root, d) for root in level for d in source.listdirs(root)]
+                if not level:
+                    break
                     
-        logger.warning("Configuration.xml не найден!")
+        logger.warning(f"Configuration.xml не найден на глубине до {max_depth}!")
         return None
         
     except Exception as e:
         logger.error(f"Ошибка при поиске Configuration.xml: {e}")
         return None
 
-def extract_synonym(file_path: str) -> Optional[str]:
-    """Извлекает синоним из XML файла."""
+def local_name(tag: str) -> str:
+    """Возвращает имя XML элемента без пространства имен."""
+    return tag.rpartition('}')[2]
+
+def iter_elements(f: BinaryIO, wanted: Callable[[Tuple[str, ...]], bool]
+                  ) -> Iterator[Tuple[Tuple[str, ...], ET.Element]]:
+    """Потоково читает XML и возвращает элементы, путь к которым подходит под wanted.
+    
+    Путь - кортеж локальных имен элементов от корня. Элемент возвращается целиком
+    (со всеми вложенными) и доступен до следующей итерации, после чего удаляется
+    из дерева. Остальные элементы удаляются сразу после чтения, поэтому память
+    не зависит от размера файла.
+    """
+    path: List[str] = []
+    # (элемент, нужен ли он сам, нужен ли он или один из его предков)
+    stack: List[Tuple[ET.Element, bool, bool]] = []
+    for event, elem in ET.iterparse(f, events=('start', 'end')):
+        if event == 'start':
+            path.append(local_name(elem.tag))
+            is_wanted = wanted(tuple(path))
+            stack.append((elem, is_wanted, is_wanted or bool(stack and stack[-1][2])))
+            continue
+        _, is_wanted, _ = stack.pop()
+        if is_wanted:
+            yield tuple(path), elem
+        path.pop()
+        if not is_wanted and stack and stack[-1][2]:
+            # Часть нужного элемента - остается в дереве до его обработки
+            continue
+        if stack:
+            stack[-1][0].remove(elem)
+        else:
+            elem.clear()
+
+# Размер блока, которым читается XML при поиске синонима
+SYNONYM_CHUNK_SIZE = 16384
+
+def read_synonyms(f: BinaryIO) -> Dict[str, str]:
+    """Читает синоним объекта на всех языках: {'ru': ..., 'en': ...}.
+    
+    Файл разбирается инкрементально блоками SYNONYM_CHUNK_SIZE, и чтение
+    прекращается, как только закрыт первый элемент Properties: синоним объекта
+    всегда находится в нем, в начале описания. Только если Properties в файле
+    нет, файл разбирается до конца.
+    """
+    parser = ET.XMLPullParser(events=('start', 'end'))
+    path: List[str] = []
+    synonyms: Dict[str, str] = {}
+    while True:
+        chunk = f.read(SYNONYM_CHUNK_SIZE)
+        if not chunk:
+            parser.close()
+            return synonyms
+        parser.feed(chunk)
+        for event, elem in parser.read_events():
+            if event == 'start':
+                path.append(local_name(elem.tag))
+                continue
+            tag = path.pop()
+            if tag == 'Synonym' and path and path[-1] == 'Properties':
+                # Properties/Synonym/v8:item/(v8:lang, v8:content)
+                for item in elem:
+                    lang = item.findtext('{*}lang') or ''
+                    content = item.findtext('{*}content')
+                    if content and lang not in synonyms:
+                        synonyms[lang] = content
+            elif tag == 'Properties':
+                return synonyms
+
+def extract_synonyms(file_path: str, source: Optional[DirectorySource] = None) -> Dict[str, str]:
+    """Извлекает синоним на всех языках из XML файла, не разбирая файл целиком."""
+    source = source or DEFAULT_SOURCE
     try:
-        tree = ET.parse(file_path)
-        root = tree.getroot()
-        ns = {'v8': 'http://v8.1c.ru/8.1/data/core'}
-        
-        # Ищем элемент синонима
-        synonym = root.findtext(".//Properties/Synonym/v8:item/v8:content", namespaces=ns)
-        return synonym if synonym else None
+        with source.open(file_path) as f:
+            return read_synonyms(f)
         
     except ET.ParseError:
         logger.warning(f"Ошибка парсинга XML файла: {file_path}")
-        return None
+        return {}
     except Exception as e:
         logger.error(f"Ошибка при извлечении синонима из {file_path}: {e}")
-        return None
+        return {}
+
+def first_synonym(synonyms: Dict[str, str]) -> Optional[str]:
+    """Возвращает синоним на первом указанном в описании языке."""
+    return next(iter(synonyms.values()), None)
+
+def extract_synonym(file_path: str, source: Optional[DirectorySource] = None) -> Optional[str]:
+    """Извлекает синоним из XML файла (на первом указанном в описании языке)."""
+    return first_synonym(extract_synonyms(file_path, source))
+
+def fold_name(name: Optional[str]) -> Optional[str]:
+    """Приводит имя к нижнему регистру для поиска без учета регистра.
+
+    Используется вместо SQLite lower() и COLLATE NOCASE: они не переводят кириллицу.
+    """
+    return None if name is None else name.lower()
+
+def decode_module(data: bytes) -> str:
+    """Декодирует текст модуля: UTF-8 (с BOM или без), иначе windows-1251."""
+    try:
+        return data.decode('utf-8-sig')
+    except UnicodeDecodeError:
+        return data.decode('windows-1251')
 
 def determine_module_type(file_path: str) -> str:
     """Определяет тип модуля по его расположению в структуре каталогов."""
@@ -139,6 +258,7 @@ def determine_module_type(file_path: str) -> str:
     
     return 'НеопределенныйМодуль'
 
+@lru_cache(maxsize=None)
 def get_type_mappings() -> Dict[str, Dict[str, str]]:
     """Возвращает словарь соответствий типов на русском и английском языках."""
     return {
@@ -160,7 +280,8 @@ def get_type_mappings() -> Dict[str, Dict[str, str]]:
             'ЖурналДокументов': 'DocumentJournal',
             'ПланОбмена': 'ExchangePlan',
             'БизнесПроцесс': 'BusinessProcess',
-            'Задача': 'Task'
+            'Задача': 'Task',
+            'ОпределяемыйТип': 'DefinedType'
         },
         'en_to_ru': {
             'Document': 'Документ',
@@ -180,7 +301,8 @@ def get_type_mappings() -> Dict[str, Dict[str, str]]:
             'DocumentJournal': 'ЖурналДокументов',
             'ExchangePlan': 'ПланОбмена',
             'BusinessProcess': 'БизнесПроцесс',
-            'Task': 'Задача'
+            'Task': 'Задача',
+            'DefinedType': 'ОпределяемыйТип'
         }
     }
 
@@ -194,6 +316,49 @@ def get_type_en(ru_type: str) -> Optional[str]:
     mappings = get_type_mappings()
     return mappings['ru_to_en'].get(ru_type)
 
+# Суффиксы классов ссылочных типов: CatalogRef -> СправочникСсылка
+TYPE_CLASS_SUFFIXES = (
+    ('RecordSet', 'НаборЗаписей'),
+    ('RecordKey', 'КлючЗаписи'),
+    ('Object', 'Объект'),
+    ('Ref', 'Ссылка'),
+)
+
+# Примитивные и платформенные типы (xs:string, v8:UUID и т.п.)
+PRIMITIVE_TYPES_RU = {
+    'string': 'Строка',
+    'decimal': 'Число',
+    'boolean': 'Булево',
+    'dateTime': 'Дата',
+    'base64Binary': 'ДвоичныеДанные',
+    'ValueStorage': 'ХранилищеЗначения',
+    'UUID': 'УникальныйИдентификатор',
+    'StandardPeriod': 'СтандартныйПериод',
+    'Null': 'Null',
+    'Type': 'Тип',
+}
+
+@lru_cache(maxsize=65536)
+def parse_type_body(type_body: str) -> Tuple[Optional[str], str, Optional[str], bool]:
+    """Разбирает описание типа реквизита ('cfg:CatalogRef.Товары', 'xs:string').
+    
+    Возвращает имя объекта, класс типа на английском и русском языках
+    и признак типа из конфигурации.
+    """
+    prefix, _, rest = type_body.rpartition(':')
+    if prefix != 'cfg':
+        return None, rest, PRIMITIVE_TYPES_RU.get(rest), False
+    
+    type_class, _, type_name = rest.partition('.')
+    type_class_ru = get_type_ru(type_class)
+    if type_class_ru is None:
+        for suffix, suffix_ru in TYPE_CLASS_SUFFIXES:
+            base_ru = get_type_ru(type_class[:-len(suffix)]) if type_class.endswith(suffix) else None
+            if base_ru:
+                type_class_ru = base_ru + suffix_ru
+                break
+    return type_name or None, type_class, type_class_ru, True
+
 def get_english_folder(ru_type: str) -> Optional[str]:
     """Преобразует русский тип объекта в английское название каталога."""
     folder_mapping = {
@@ -218,7 +383,43 @@ def get_english_folder(ru_type: str) -> Optional[str]:
         'HTTPСервис': 'HTTPServices',
         'РегистрСведений': 'InformationRegisters',
         'Отчет': 'Reports',
-        'Роль': 'Roles'
+        'Роль': 'Roles',
+        # Имена типов в том виде, в котором они записаны в Configuration.xml
+        'AccountingRegister': 'AccountingRegisters',
+        'AccumulationRegister': 'AccumulationRegisters',
+        'BusinessProcess': 'BusinessProcesses',
+        'CalculationRegister': 'CalculationRegisters',
+        'Catalog': 'Catalogs',
+        'ChartOfAccounts': 'ChartsOfAccounts',
+        'ChartOfCalculationTypes': 'ChartsOfCalculationTypes',
+        'ChartOfCharacteristicTypes': 'ChartsOfCharacteristicTypes',
+        'CommonAttribute': 'CommonAttributes',
+        'CommonCommand': 'CommonCommands',
+        'CommonForm': 'CommonForms',
+        'CommonModule': 'CommonModules',
+        'CommonPicture': 'CommonPictures',
+        'CommonTemplate': 'CommonTemplates',
+        'Constant': 'Constants',
+        'DataProcessor': 'DataProcessors',
+        'DefinedType': 'DefinedTypes',
+        'Document': 'Documents',
+        'DocumentJournal': 'DocumentJournals',
+        'DocumentNumerator': 'DocumentNumerators',
+        'Enum': 'Enums',
+        'EventSubscription': 'EventSubscriptions',
+        'ExchangePlan': 'ExchangePlans',
+        'ExternalDataSource': 'ExternalDataSources',
+        'FilterCriterion': 'FilterCriteria',
+        'FunctionalOption': 'FunctionalOptions',
+        'FunctionalOptionsParameter': 'FunctionalOptionsParameters',
+        'HTTPService': 'HTTPServices',
+        'InformationRegister': 'InformationRegisters',
+        'Report': 'Reports',
+        'Role': 'Roles',
+        'Sequence': 'Sequences',
+        'Task': 'Tasks',
+        'WebService': 'WebServices',
+        'WSReference': 'WSReferences'
     }
     
     if is_in_excluded_types(ru_type):
@@ -0,0 +1,181 @@
+"""
+Источники файлов конфигурации: каталог на диске или zip-архив без распаковки.
+"""
+
+import os
+import posixpath
+import zipfile
+import logging
+from typing import BinaryIO, Dict, Iterator, List, Optional, Set, Tuple
+
+logger = logging.getLogger('ent1ctosqlite')
+
+
+class DirectorySource:
+    """Файлы конфигурации в обычном каталоге на диске."""
+
+    def join(self, *parts: str) -> str:
+        return os.path.join(*parts)
+
+    def relpath(self, path: str, start: str) -> str:
+        return os.path.relpath(path, start)
+
+    def split(self, rel_path: str) -> List[str]:
+        """Разбивает относительный путь на компоненты."""
+        return [p for p in rel_path.replace('\\', '/').split('/') if p and p != '.']
+
+    def exists(self, path: str) -> bool:
+        return os.path.exists(path)
+
+    def isfile(self, path: str) -> bool:
+        return os.path.isfile(path)
+
+    def listdir(self, path: str) -> List[str]:
+        return os.listdir(path)
+
+    def listdirs(self, path: str) -> List[str]:
+        """Возвращает имена подкаталогов в алфавитном порядке."""
+        with os.scandir(path) as entries:
+            return sorted(entry.name for entry in entries if entry.is_dir())
+
+    def walk(self, top: str) -> Iterator[Tuple[str, List[str], List[str]]]:
+        return os.walk(top)
+
+    def open(self, path: str) -> BinaryIO:
+        return open(path, 'rb')
+
+    def read_bytes(self, path: str) -> bytes:
+        with open(path, 'rb') as f:
+            return f.read()
+
+    def close(self) -> None:
+        pass
+
+
+class ZipSource(DirectorySource):
+    """Файлы конфигурации, читаемые напрямую из zip-архива.
+
+    Пути внутри архива - относительные, с разделителем '/', корень архива - ''.
+    Дерево каталогов строится один раз по центральному каталогу архива.
+    """
+
+    def __init__(self, zip_path: str):
+        self.zip_path = zip_path
+        self._zip: Optional[zipfile.ZipFile] = None
+        self._tree: Optional[Dict[str, Tuple[Set[str], List[str]]]] = None
+
+    def __getstate__(self) -> Dict[str, object]:
+        # В дочерние процессы передается только путь: архив открывается в них заново
+        return {'zip_path': self.zip_path}
+
+    def __setstate__(self, state: Dict[str, object]) -> None:
+        self.__init__(state['zip_path'])
+
+    @property
+    def archive(self) -> zipfile.ZipFile:
+        if self._zip is None:
+            self._zip = zipfile.ZipFile(self.zip_path, 'r')
+        return self._zip
+
+    @staticmethod
+    def _norm(path: str) -> str:
+        path = path.replace('\\', '/').strip('/')
+        return '' if path == '.' else path
+
+    def _build_tree(self) -> Dict[str, Tuple[Set[str], List[str]]]:
+        if self._tree is None:
+            tree: Dict[str, Tuple[Set[str], List[str]]] = {'': (set(), [])}
+            for name in self.archive.namelist():
+                is_dir = name.endswith('/')
+                name = self._norm(name)
+                if not name:
+                    continue
+                parent, _, base = name.rpartition('/')
+                if is_dir:
+                    tree.setdefault(name, (set(), []))
+                else:
+                    tree.setdefault(parent, (set(), []))[1].append(base)
+                # Регистрируем все родительские каталоги, даже без явных записей в архиве
+                child = name if is_dir else parent
+                while child:
+                    up, _, base = child.rpartition('/')
+                    entry = tree.setdefault(up, (set(), []))
+                    if base in entry[0]:
+                        break
+                    entry[0].add(base)
+                    tree.setdefault(child, (set(), []))
+                    child = up
+            self._tree = tree
+            logger.debug(f"Индекс архива построен: {len(tree)} каталогов")
+        return self._tree
+
+    def namelist(self) -> List[str]:
+        return self.archive.namelist()
+
+    def join(self, *parts: str) -> str:
+        return self._norm(posixpath.join(*[self._norm(p) for p in parts]))
+
+    def relpath(self, path: str, start: str) -> str:
+        path, start = self._norm(path), self._norm(start)
+        if path == start:
+            return '.'
+        if not start:
+            return path
+        if not path.startswith(start + '/'):
+            raise ValueError(f"Путь {path} вне каталога {start}")
+        return path[len(start) + 1:]
+
+    def exists(self, path: str) -> bool:
+        path = self._norm(path)
+        return path in self._build_tree() or self.isfile(path)
+
+    def isfile(self, path: str) -> bool:
+        path = self._norm(path)
+        parent, _, base = path.rpartition('/')
+        entry = self._build_tree().get(parent)
+        return entry is not None and base in entry[1]
+
+    def listdir(self, path: str) -> List[str]:
+        entry = self._build_tree().get(self._norm(path))
+        if entry is None:
+            raise FileNotFoundError(f"Каталог не найден в архиве: {path}")
+        return sorted(entry[0]) + list(entry[1])
+
+    def listdirs(self, path: str) -> List[str]:
+        entry = self._build_tree().get(self._norm(path))
+        if entry is None:
+            raise FileNotFoundError(f"Каталог не найден в архиве: {path}")
+        return sorted(entry[0])
+
+    def walk(self, top: str) -> Iterator[Tuple[str, List[str], List[str]]]:
+        tree = self._build_tree()
+        stack = [self._norm(top)]
+        while stack:
+            root = stack.pop()
+            entry = tree.get(root)
+            if entry is None:
+                continue
+            dirs = sorted(entry[0])
+            yield root, dirs, list(entry[1])
+            # Как и os.walk сверху вниз: вызывающий код может сократить dirs
+            stack.extend(self.join(root, d) for d in reversed(dirs))
+
+    def open(self, path: str) -> BinaryIO:
+        return self.archive.open(self._norm(path), 'r')
+
+    def read_bytes(self, path: str) -> bytes:
+        return self.archive.read(self._norm(path))
+
+    def close(self) -> None:
+        if self._zip is not None:
+            self._zip.close()
+            self._zip = None
+
+    def __enter__(self) -> 'ZipSource':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+DEFAULT_SOURCE = DirectorySource()
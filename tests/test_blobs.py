@@ -0,0 +1,82 @@
+import unittest
+import os
+import sqlite3
+import tempfile
+import shutil
+from ent1ctosqlite.core import analyze_directory
+from ent1ctosqlite.database import create_database
+from ent1ctosqlite.blobs import get_module_code
+
+CONFIG_XML = """<?xml version="1.0" encoding="UTF-8"?>
+<MetaDataObject xmlns="http://v8.1c.ru/8.3/MDClasses">
+    <Configuration><ChildObjects>
+        <Catalog>Товары</Catalog>
+        <Catalog>Услуги</Catalog>
+    </ChildObjects></Configuration>
+</MetaDataObject>
+"""
+
+FORM_MODULE = """&НаСервере
+Процедура ПриСозданииНаСервере(Отказ, СтандартнаяОбработка)
+    УстановитьУсловноеОформление();
+КонецПроцедуры
+"""
+
+
+class TestModuleBlobs(unittest.TestCase):
+    def setUp(self):
+        """Import two catalogs whose form modules are byte-identical."""
+        self.temp_dir = tempfile.mkdtemp()
+        self.files = {"Configuration.xml": CONFIG_XML}
+        for name in ("Товары", "Услуги"):
+            self.files[f"Catalogs/{name}/Forms/ФормаЭлемента/Ext/Form/Module.bsl"] = FORM_MODULE
+            self.files[f"Catalogs/{name}/Ext/ObjectModule.bsl"] = f"Процедура Модуль{name}()\nКонецПроцедуры\n"
+        for rel_path, content in self.files.items():
+            self._write(rel_path, content)
+        self.conn = sqlite3.connect(':memory:')
+        create_database(self.conn)
+        analyze_directory(self.temp_dir, self.conn, incremental=True)
+
+    def tearDown(self):
+        self.conn.close()
+        shutil.rmtree(self.temp_dir)
+
+    def _write(self, rel_path, content):
+        path = os.path.join(self.temp_dir, *rel_path.split("/"))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w", encoding="utf-8-sig") as f:
+            f.write(content)
+
+    def _count(self, table):
+        return self.conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+
+    def test_identical_modules_are_stored_once(self):
+        """Test that equal module texts share one compressed blob."""
+        self.assertEqual(self._count("code_body"), 4)
+        self.assertEqual(self._count("module_blobs"), 3)
+        cursor = self.conn.cursor()
+        cursor.execute("SELECT COUNT(*) FROM code_body WHERE code_body_module IS NOT NULL")
+        self.assertEqual(cursor.fetchone()[0], 0)
+
+    def test_accessor_and_view_return_text(self):
+        """Test that module text is decompressed by get_module_code and the code_modules view."""
+        cursor = self.conn.cursor()
+        cursor.execute("""
+            SELECT code_body_id, code_body_module FROM code_modules
+            WHERE code_body_name = 'Module' ORDER BY code_body_id
+        """)
+        rows = cursor.fetchall()
+        self.assertEqual([text for _, text in rows], [FORM_MODULE, FORM_MODULE])
+        self.assertEqual(get_module_code(self.conn, rows[0][0]), FORM_MODULE)
+        self.assertIsNone(get_module_code(self.conn, -1))
+
+    def test_unused_blobs_are_removed(self):
+        """Test that a blob no module refers to anymore is deleted on re-import."""
+        self._write("Catalogs/Товары/Ext/ObjectModule.bsl", FORM_MODULE)
+        analyze_directory(self.temp_dir, self.conn, incremental=True)
+        self.assertEqual(self._count("module_blobs"), 2)
+        self.assertEqual(self._count("code_body"), 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,106 @@
+import mmap
+import os
+import tempfile
+import unittest
+from ent1ctosqlite.blobs import pack_module
+from ent1ctosqlite.bsl import scan_methods, scan_module, split_params
+from ent1ctosqlite.core import extract_methods, parse_module_bytes
+
+MODULE = """// Процедура Закомментированная() Экспорт
+&НаСервере
+Процедура Записать(Знач Объект, Режим = "а)б", Отказ = Ложь) Экспорт
+    Текст = "Функция ВСтроке()
+    |КонецФункции";
+КонецПроцедуры
+
+&НаКлиенте
+Функция Проверить()
+    Возврат Объект.Процедура;
+КонецФункции
+
+#Область Служебные
+Procedure Cleanup() Export
+EndProcedure
+#КонецОбласти
+"""
+
+
+class TestBslScanner(unittest.TestCase):
+    def test_scan_methods(self):
+        """Test that method headers are found with directives, flags and spans."""
+        methods = scan_methods(MODULE)
+        self.assertEqual([m.name for m in methods], ["Записать", "Проверить", "Cleanup"])
+
+        write, check, cleanup = methods
+        self.assertEqual((write.is_function, write.is_export, write.directive), (False, True, "НаСервере"))
+        self.assertEqual(write.args, ["Объект", "Режим", "Отказ"])
+        self.assertEqual((write.start_line, write.end_line), (3, 6))
+        self.assertTrue(MODULE[write.start_offset:write.end_offset].startswith("Процедура Записать("))
+        self.assertTrue(MODULE[write.start_offset:write.end_offset].endswith("КонецПроцедуры"))
+
+        self.assertEqual((check.is_function, check.is_export, check.directive), (True, False, "НаКлиенте"))
+        self.assertEqual((check.start_line, check.end_line), (9, 11))
+        self.assertEqual((cleanup.is_export, cleanup.directive), (True, None))
+
+    def test_unterminated_method(self):
+        """Test that a method without an end keyword runs to the next header or end of text."""
+        methods = scan_methods("Процедура А()\n\nПроцедура Б()\n")
+        self.assertEqual([(m.name, m.start_line, m.end_line) for m in methods], [("А", 1, 3), ("Б", 3, 4)])
+
+    def test_calls_outside_comments_and_strings(self):
+        """Test that calls are taken from code only, with qualifiers and the line of the call."""
+        code = (
+            "процедура Обработать(А) экспорт\n"
+            "    Б = 'незакрытая дата // Ложный(1)\n"
+            "    Сообщить(\"Вызов(\" + А); // Закомментированный(1)\n"
+            "    Запрос = Новый Запрос(Текст);\n"
+            "    Объект.Новый(1); Справочники.Товары.Создать();\n"
+            "    А.Б.В.Г(1);\n"
+            "    ОбщегоНазначения\n"
+            "        .Метод(2);\n"
+            "    Если Проверить(А) Тогда\n"
+            "    КонецЕсли;\n"
+            "конецпроцедуры\n"
+        )
+        method, = scan_methods(code)
+        self.assertEqual((method.is_export, method.end_line, method.end_offset), (True, 11, len(code) - 1))
+        self.assertEqual(method.calls, [
+            (None, "Сообщить", 3), ("Объект", "Новый", 5), ("Справочники.Товары", "Создать", 5),
+            ("ОбщегоНазначения", "Метод", 7), (None, "Проверить", 9),
+        ])
+
+    def test_scan_module_bytes(self):
+        """Test that scanning module bytes gives the same methods as scanning the decoded text."""
+        code = MODULE + "Функция Ёлка(Ж)\n    Возврат Модуль.Вызов(Ж);\nКонецФункции\n"
+        expected = scan_methods(code)
+        for encoding, detected, bom in (('utf-8', 'utf-8', 0), ('utf-8-sig', 'utf-8', 3),
+                                        ('windows-1251', 'cp1251', 0)):
+            with self.subTest(encoding=encoding):
+                data = code.encode(encoding)
+                self.assertEqual(scan_module(data), (detected, bom, expected))
+                # Блок текста и методы - как при разборе декодированного текста
+                self.assertEqual(parse_module_bytes(data, ('utf-8', 'cp1251')),
+                                 (pack_module(code), extract_methods(code)))
+                self.assertEqual(parse_module_bytes(data), (pack_module(code), extract_methods(code)))
+
+        # Символы вне кириллицы и ASCII в UTF-8 и байт, которого нет в windows-1251
+        self.assertIsNone(scan_module(("Процедура Ä()\n" + code).encode('utf-8')))
+        self.assertIsNone(scan_module(code.encode('windows-1251') + b'\x98'))
+        self.assertIsNone(scan_module(code.encode('utf-8'), ('cp1251',)))
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'Module.bsl')
+            with open(path, 'wb') as f:
+                f.write(code.encode('utf-8-sig'))
+            with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                self.assertEqual(scan_module(data), ('utf-8', 3, expected))
+                self.assertEqual(parse_module_bytes(data, ('utf-8',))[0], pack_module(code))
+
+    def test_split_params(self):
+        """Test parameter name extraction."""
+        self.assertEqual(split_params("Знач А, Б = 1, Val C"), ["А", "Б", "C"])
+        self.assertEqual(split_params("  "), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,175 @@
+import unittest
+import os
+import sqlite3
+import tempfile
+import shutil
+from ent1ctosqlite.core import analyze_directory
+from ent1ctosqlite.database import create_database, check_and_update_database_structure
+from ent1ctosqlite.callgraph import build_call_graph, find_methods, get_callers
+
+CONFIG_XML = """<?xml version="1.0" encoding="UTF-8"?>
+<MetaDataObject xmlns="http://v8.1c.ru/8.3/MDClasses">
+    <Configuration><ChildObjects>
+        <CommonModule>Общий</CommonModule>
+        <Catalog>Товары</Catalog>
+        <Document>Заказ</Document>
+    </ChildObjects></Configuration>
+</MetaDataObject>
+"""
+
+COMMON_MODULE = """Процедура Сообщить(Текст) Экспорт
+    Записать(Текст); // Сообщить()
+КонецПроцедуры
+
+Процедура Записать(Текст)
+    Если (Текст = "Сообщить()") Тогда
+        Записать(Текст);
+    КонецЕсли;
+КонецПроцедуры
+"""
+
+MANAGER_MODULE = """Функция НайтиПоКоду(Код) Экспорт
+    общий.сообщить(Код);
+КонецФункции
+"""
+
+DOCUMENT_MODULE = """Процедура ОбработкаПроведения(Отказ)
+    Проверить();
+КонецПроцедуры
+
+Процедура Проверить()
+    Товар = Справочники.Товары.НайтиПоКоду(1);
+    Общий.Записать("не экспортный метод");
+    Запрос = Новый Запрос("Проверить()");
+КонецПроцедуры
+"""
+
+
+class TestCallGraph(unittest.TestCase):
+    def setUp(self):
+        """Import a configuration with local, common module and manager calls."""
+        self.temp_dir = tempfile.mkdtemp()
+        files = {
+            "Configuration.xml": CONFIG_XML,
+            "CommonModules/Общий/Ext/Module.bsl": COMMON_MODULE,
+            "Catalogs/Товары/Ext/ManagerModule.bsl": MANAGER_MODULE,
+            "Documents/Заказ/Ext/ObjectModule.bsl": DOCUMENT_MODULE,
+        }
+        for rel_path, content in files.items():
+            path = os.path.join(self.temp_dir, *rel_path.split("/"))
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "w", encoding="utf-8-sig") as f:
+                f.write(content)
+        self.conn = sqlite3.connect(':memory:')
+        create_database(self.conn)
+        analyze_directory(self.temp_dir, self.conn, incremental=True)
+        build_call_graph(self.conn)
+
+    def tearDown(self):
+        self.conn.close()
+        shutil.rmtree(self.temp_dir)
+
+    def _callers(self, name):
+        methods_ids = find_methods(self.conn, name)
+        self.assertEqual(len(methods_ids), 1)
+        return {(c.object_name, c.method_name): c.depth for c in get_callers(self.conn, methods_ids[0])}
+
+    def test_call_sites_are_extracted(self):
+        """Test that calls in comments, strings and constructors are ignored."""
+        cursor = self.conn.cursor()
+        cursor.execute("""
+            SELECT c.method_calls_module, c.method_calls_name, c.method_calls_line,
+                   c.method_calls_callee IS NOT NULL
+            FROM method_calls c JOIN methods m ON m.methods_id = c.method_calls_caller
+            WHERE m.methods_name = 'Проверить'
+            ORDER BY c.method_calls_line
+        """)
+        self.assertEqual(cursor.fetchall(), [
+            ('Справочники.Товары', 'НайтиПоКоду', 6, 1),
+            ('Общий', 'Записать', 7, 0),  # не экспортный метод общего модуля
+        ])
+
+    def test_transitive_callers(self):
+        """Test that direct and indirect callers are found with the shortest depth."""
+        self.assertEqual(self._callers("Общий.Сообщить"), {
+            ('Товары', 'НайтиПоКоду'): 1,
+            ('Заказ', 'Проверить'): 2,
+            ('Заказ', 'ОбработкаПроведения'): 3,
+        })
+        # Рекурсивный метод - сам себе вызывающий
+        self.assertEqual(self._callers("Записать"), {
+            ('Общий', 'Записать'): 1,
+            ('Общий', 'Сообщить'): 1,
+            ('Товары', 'НайтиПоКоду'): 2,
+            ('Заказ', 'Проверить'): 3,
+            ('Заказ', 'ОбработкаПроведения'): 4,
+        })
+
+    def test_form_module_caller_is_labelled_with_form(self):
+        """Test that a caller in a form module names the form, not just the module."""
+        files = {
+            "Documents/Заказ/Forms/ФормаДокумента.xml": "<MetaDataObject/>",
+            "Documents/Заказ/Forms/ФормаДокумента/Ext/Form/Module.bsl":
+                "&НаКлиенте\nПроцедура ПриОткрытии(Отказ)\n    Общий.Сообщить(1);\nКонецПроцедуры\n",
+        }
+        for rel_path, content in files.items():
+            path = os.path.join(self.temp_dir, *rel_path.split("/"))
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "w", encoding="utf-8-sig") as f:
+                f.write(content)
+        analyze_directory(self.temp_dir, self.conn, incremental=True)
+        build_call_graph(self.conn)
+        methods_ids = find_methods(self.conn, "Общий.Сообщить")
+        callers = [(c.object_name, c.module_name, c.method_name) for c in get_callers(self.conn, methods_ids[0])
+                   if c.depth == 1]
+        self.assertIn(("Заказ", "ФормаДокумента.Module", "ПриОткрытии"), callers)
+        self.assertIn(("Товары", "ManagerModule", "НайтиПоКоду"), callers)
+
+    def test_incremental_reimport_updates_graph(self):
+        """Test that a changed module drops its edges and the graph is rebuilt."""
+        path = os.path.join(self.temp_dir, "Catalogs", "Товары", "Ext", "ManagerModule.bsl")
+        with open(path, "w", encoding="utf-8-sig") as f:
+            f.write("Функция НайтиПоКоду(Код) Экспорт\nКонецФункции\n")
+        analyze_directory(self.temp_dir, self.conn, incremental=True)
+        build_call_graph(self.conn)
+        self.assertEqual(self._callers("Общий.Сообщить"), {})
+        self.assertEqual(self._callers("НайтиПоКоду"), {
+            ('Заказ', 'Проверить'): 1,
+            ('Заказ', 'ОбработкаПроведения'): 2,
+        })
+
+    def test_callers_are_queried_without_closure_table(self):
+        """Test the depth limit, the index of the recursive query and the removal of an old closure table."""
+        methods_id, = find_methods(self.conn, "Записать")
+        self.assertEqual({c.method_name: c.depth for c in get_callers(self.conn, methods_id, max_depth=2)},
+                         {'Записать': 1, 'Сообщить': 1, 'НайтиПоКоду': 2})
+        plan = " | ".join(row[3] for row in self.conn.execute(
+            "EXPLAIN QUERY PLAN SELECT method_calls_caller FROM method_calls WHERE method_calls_callee = 1"))
+        self.assertIn("COVERING INDEX idx_method_calls_callee_caller", plan)
+
+        # Повторный импорт без изменений сообщает, что граф перестраивать не нужно
+        self.assertEqual(analyze_directory(self.temp_dir, self.conn, incremental=True), 0)
+
+        # База прежней версии хранила замыкание графа вызовов
+        self.conn.execute("CREATE TABLE method_callers (method_callers_method INTEGER, method_callers_caller INTEGER)")
+        check_and_update_database_structure(self.conn)
+        tables = {row[0] for row in self.conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        self.assertNotIn("method_callers", tables)
+
+    def test_find_methods_uses_folded_name_index(self):
+        """Test case-insensitive Cyrillic lookup through the folded name index, also in an old database."""
+        self.assertEqual(find_methods(self.conn, "ОБЩИЙ.записать"), find_methods(self.conn, "Записать"))
+        self.assertEqual(find_methods(self.conn, "Товары.Записать"), [])
+        plan = " | ".join(row[3] for row in self.conn.execute(
+            "EXPLAIN QUERY PLAN SELECT methods_id FROM methods WHERE methods_name_folded = 'записать'"))
+        self.assertIn("INDEX idx_methods_name_folded", plan)
+
+        # База прежней версии: колонка добавляется и заполняется при проверке структуры
+        self.conn.execute("UPDATE methods SET methods_name_folded = NULL")
+        self.assertEqual(find_methods(self.conn, "Записать"), [])
+        check_and_update_database_structure(self.conn)
+        self.assertEqual(len(find_methods(self.conn, "общий.ЗАПИСАТЬ")), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,279 @@
+import unittest
+from unittest import mock
+import os
+import sqlite3
+import tempfile
+import shutil
+from ent1ctosqlite.core import analyze_directory
+from ent1ctosqlite.ingest import BulkWriter
+from ent1ctosqlite.reports import object_report
+from ent1ctosqlite.database import (
+    create_database, begin_fast_import, end_fast_import, optimize_database,
+    open_staging_database, publish_database, discard_staging_database, create_indexes, INDEXES
+)
+
+CONFIG_XML = """<?xml version="1.0" encoding="UTF-8"?>
+<MetaDataObject xmlns="http://v8.1c.ru/8.3/MDClasses">
+    <Configuration><ChildObjects>
+        <Catalog>Товары</Catalog>
+    </ChildObjects></Configuration>
+</MetaDataObject>
+"""
+
+
+class TestDatabase(unittest.TestCase):
+    def setUp(self):
+        """Create a configuration with one module and a path for a file database."""
+        self.temp_dir = tempfile.mkdtemp()
+        self.tree = os.path.join(self.temp_dir, "tree")
+        files = {
+            "Configuration.xml": CONFIG_XML,
+            "Catalogs/Товары/Ext/ObjectModule.bsl": "Процедура А()\nКонецПроцедуры\n",
+        }
+        for rel_path, content in files.items():
+            path = os.path.join(self.tree, *rel_path.split("/"))
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "w", encoding="utf-8-sig") as f:
+                f.write(content)
+        self.db_path = os.path.join(self.temp_dir, "test.db")
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def _pragma(self, conn, name):
+        return conn.execute(f"PRAGMA {name}").fetchone()[0]
+
+    def test_fast_import_restores_durable_settings(self):
+        """Test that the import profile is switched off and statistics are collected."""
+        conn = sqlite3.connect(self.db_path)
+        begin_fast_import(conn)
+        self.assertEqual(self._pragma(conn, "journal_mode"), "wal")
+        self.assertEqual(self._pragma(conn, "synchronous"), 0)
+        create_database(conn)
+        analyze_directory(self.tree, conn)
+        end_fast_import(conn)
+        optimize_database(conn, vacuum=True)
+        conn.close()
+
+        conn = sqlite3.connect(self.db_path)
+        try:
+            self.assertEqual(self._pragma(conn, "journal_mode"), "delete")
+            self.assertEqual(self._pragma(conn, "page_size"), 8192)
+            self.assertEqual(conn.execute("SELECT COUNT(*) FROM methods").fetchone()[0], 1)
+            self.assertGreater(conn.execute("SELECT COUNT(*) FROM sqlite_stat1").fetchone()[0], 0)
+        finally:
+            conn.close()
+        self.assertFalse(os.path.exists(self.db_path + "-wal"))
+
+    def test_fast_import_rolls_back_uncommitted_rows(self):
+        """Test that rows left uncommitted by a failed import are discarded on switch-off."""
+        conn = sqlite3.connect(self.db_path)
+        begin_fast_import(conn)
+        create_database(conn)
+        conn.execute("INSERT INTO objects (obj_type, obj_name) VALUES ('Catalog', 'Товары')")
+        end_fast_import(conn)
+        self.assertEqual(conn.execute("SELECT COUNT(*) FROM objects").fetchone()[0], 0)
+        conn.close()
+
+    def _count_methods(self, conn):
+        return conn.execute("SELECT COUNT(*) FROM methods").fetchone()[0]
+
+    def test_staged_build_is_published_atomically(self):
+        """Test that readers see the old database until the staged one replaces it."""
+        conn, staging_path = open_staging_database(self.db_path, in_memory=True)
+        self.assertIsNone(staging_path)
+        create_database(conn)
+        analyze_directory(self.tree, conn, incremental=True)
+        publish_database(conn, self.db_path, staging_path)
+
+        reader = sqlite3.connect(self.db_path)
+        conn, staging_path = open_staging_database(self.db_path)
+        path = os.path.join(self.tree, "Catalogs", "Товары", "Ext", "ObjectModule.bsl")
+        with open(path, "a", encoding="utf-8") as f:
+            f.write("Процедура Б()\nКонецПроцедуры\n")
+        analyze_directory(self.tree, conn, incremental=True)
+        self.assertEqual(self._count_methods(conn), 2)
+        self.assertEqual(self._count_methods(reader), 1)
+        publish_database(conn, self.db_path, staging_path)
+        # Соединение, открытое до публикации, продолжает читать прежнюю базу
+        self.assertEqual(self._count_methods(reader), 1)
+        reader.close()
+
+        reader = sqlite3.connect(self.db_path)
+        self.assertEqual(self._count_methods(reader), 2)
+        reader.close()
+        self.assertEqual(sorted(os.listdir(self.temp_dir)), ["test.db", "tree"])
+
+    def test_failed_build_keeps_published_database(self):
+        """Test that a discarded staging build leaves the target untouched."""
+        conn, staging_path = open_staging_database(self.db_path)
+        create_database(conn)
+        analyze_directory(self.tree, conn)
+        publish_database(conn, self.db_path, staging_path)
+
+        conn, staging_path = open_staging_database(self.db_path)
+        conn.execute("DELETE FROM methods")
+        conn.commit()
+        conn.close()
+        discard_staging_database(staging_path)
+        conn = sqlite3.connect(self.db_path)
+        self.assertEqual(self._count_methods(conn), 1)
+        conn.close()
+        self.assertEqual(sorted(os.listdir(self.temp_dir)), ["test.db", "tree"])
+
+    def test_core_queries_use_indexes(self):
+        """Test that EXPLAIN QUERY PLAN of the core lookups uses the lookup indexes."""
+        conn = sqlite3.connect(':memory:')
+        create_database(conn)
+        queries = {
+            # write_methods: методы, уже сохраненные для модуля
+            "SELECT methods_name FROM methods WHERE methods_owner_id = 1":
+                ["COVERING INDEX uq_methods"],
+            # _get_template_id: форма объекта по имени
+            "SELECT commands_templates_id FROM commands_templates "
+            "WHERE commands_templates_owner = 1 AND commands_templates_name = 'Форма'":
+                ["COVERING INDEX uq_commands_templates"],
+            # analyze_object: реквизиты объекта с типами
+            "SELECT a.prop_name, a.table_part, GROUP_CONCAT(t.type_class_ru) FROM obj_attributes a "
+            "LEFT JOIN obj_attr_types t ON t.obj_attr_type_owner = a.obj_attr_id "
+            "WHERE a.obj_attr_owner = 1 AND a.is_attribute = 1 GROUP BY a.prop_name, a.table_part":
+                ["COVERING INDEX idx_obj_attributes_owner", "INDEX idx_obj_attr_types_owner"],
+            # object_report: синонимы объекта и его реквизитов
+            "SELECT o.obj_name, s.object_synonyms_text FROM objects o LEFT JOIN object_synonyms s "
+            "ON s.object_synonyms_owner = o.obj_id AND s.object_synonyms_attr IS NULL "
+            "AND s.object_synonyms_position = 0 WHERE o.obj_type = 'Document'":
+                ["COVERING INDEX uq_objects", "INDEX idx_object_synonyms_owner"],
+            "SELECT a.prop_name, s.object_synonyms_text FROM obj_attributes a LEFT JOIN object_synonyms s "
+            "ON s.object_synonyms_attr = a.obj_attr_id AND s.object_synonyms_position = 0 WHERE a.obj_attr_owner = 1":
+                ["INDEX idx_obj_attributes_owner", "INDEX idx_object_synonyms_attr"],
+            # parse_predefined: предопределенные значения объекта
+            "SELECT pav.predefined_attrs_values_val FROM predefined_attrs_values pav "
+            "JOIN predefined_attrs pa ON pa.predefined_attrs_id = pav.predefined_attrs_values_atr "
+            "WHERE pa.predefined_attrs_owner = 1 AND pa.predefined_attrs_name = 'Предопределенный'":
+                ["COVERING INDEX idx_predefined_attrs_owner", "INDEX idx_predefined_attrs_values_atr"],
+            # analyze_object, callgraph: модули объекта и его форм
+            "SELECT m.methods_name FROM methods m JOIN code_body cb ON m.methods_owner_id = cb.code_body_id "
+            "WHERE cb.code_body_owner_id = 1":
+                ["COVERING INDEX uq_code_body", "COVERING INDEX uq_methods"],
+            "SELECT code_body_id FROM code_body WHERE code_body_owner = 1 AND code_body_name = 'ObjectModule'":
+                ["COVERING INDEX idx_code_body_owner"],
+            # delete_modules: параметры и вызовы методов удаляемых модулей
+            "SELECT methods_args_id FROM methods_args WHERE methods_args_owner_id IN "
+            "(SELECT methods_id FROM methods WHERE methods_owner_id IN (1, 2))":
+                ["INDEX uq_methods_args", "COVERING INDEX uq_methods"],
+            # delete_unused_blobs
+            "SELECT module_blobs_hash FROM module_blobs WHERE module_blobs_hash NOT IN "
+            "(SELECT code_body_blob FROM code_body WHERE code_body_blob IS NOT NULL)":
+                ["COVERING INDEX idx_code_body_blob"],
+        }
+        try:
+            for sql, indexes in queries.items():
+                plan = " | ".join(row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}"))
+                for index in indexes:
+                    self.assertIn(index, plan, sql)
+                for table in ("methods", "methods_args", "code_body", "obj_attributes", "obj_attr_types",
+                              "object_synonyms", "commands_templates", "predefined_attrs",
+                              "predefined_attrs_values"):
+                    self.assertNotIn(f"SCAN {table} ", f"{plan} ", sql)
+        finally:
+            conn.close()
+
+    def test_repeated_import_replaces_modules(self):
+        """Test that importing the same tree twice without incremental keeps one copy of each module."""
+        path = os.path.join(self.tree, "Catalogs", "Товары", "Forms", "ФормаЭлемента", "Ext", "Form", "Module.bsl")
+        os.makedirs(os.path.dirname(path))
+        with open(path, "w", encoding="utf-8") as f:
+            f.write("&НаКлиенте\nПроцедура ПриОткрытии(Отказ)\n    А();\nКонецПроцедуры\n")
+        conn = sqlite3.connect(':memory:')
+        create_database(conn)
+        analyze_directory(self.tree, conn)
+        counts = [conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+                  for table in ("code_body", "methods", "methods_args", "method_calls", "file_hashes")]
+        self.assertEqual(counts[:2], [2, 2])
+        self.assertEqual(analyze_directory(self.tree, conn), 2)
+        self.assertEqual([conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+                          for table in ("code_body", "methods", "methods_args", "method_calls", "file_hashes")],
+                         counts)
+
+        # Файл, удаленный из выгрузки, удаляется из базы, как при импорте в новую базу
+        os.remove(path)
+        self.assertEqual(analyze_directory(self.tree, conn), 2)
+        fresh = sqlite3.connect(':memory:')
+        create_database(fresh)
+        analyze_directory(self.tree, fresh)
+        for table in ("code_body", "methods", "method_calls", "module_blobs", "file_hashes"):
+            query = f"SELECT COUNT(*) FROM {table}"
+            self.assertEqual(conn.execute(query).fetchone(), fresh.execute(query).fetchone(), table)
+        self.assertEqual(conn.execute("SELECT file_hashes_path FROM file_hashes").fetchall(),
+                         fresh.execute("SELECT file_hashes_path FROM file_hashes").fetchall())
+        fresh.close()
+        conn.close()
+
+    def test_form_command_and_template_with_one_name(self):
+        """Test that a form, a command and a template sharing a name stay separate rows with their own modules."""
+        files = {
+            "Catalogs/Товары/Forms/Печать.xml": "<MetaDataObject/>",
+            "Catalogs/Товары/Forms/Печать/Ext/Form/Module.bsl": "Процедура ПриОткрытии()\nКонецПроцедуры\n",
+            "Catalogs/Товары/Commands/Печать/Ext/CommandModule.bsl":
+                "Процедура ОбработкаКоманды()\nКонецПроцедуры\n",
+            "Catalogs/Товары/Templates/Печать.xml": "<MetaDataObject/>",
+        }
+        for rel_path, content in files.items():
+            path = os.path.join(self.tree, *rel_path.split("/"))
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(content)
+        # Без INSERT ... RETURNING (SQLite до 3.35) upsert дает те же строки
+        for use_returning in (False, True):
+            with self.subTest(use_returning=use_returning):
+                conn = sqlite3.connect(':memory:')
+                self.addCleanup(conn.close)
+                create_database(conn)
+                for _ in range(2):
+                    writer = BulkWriter(conn)
+                    writer.use_returning = use_returning
+                    analyze_directory(self.tree, conn, writer=writer)
+                    writer.commit()
+                    self.assertEqual(conn.execute("""
+                        SELECT ct.commands_templates_is_form, ct.commands_templates_is_templ,
+                               cb.code_body_module_type
+                        FROM commands_templates ct
+                        LEFT JOIN code_body cb ON cb.code_body_owner_id = ct.commands_templates_id
+                        WHERE ct.commands_templates_name = 'Печать'
+                        ORDER BY 1, 2
+                    """).fetchall(), [(0, 0, 'МодульКоманды'), (0, 1, None), (1, 0, 'МодульФормы')])
+                    self.assertEqual(conn.execute("SELECT COUNT(*) FROM code_body").fetchone()[0], 3)
+        self.assertEqual([form['name'] for form in object_report(conn, 'Catalog', 'Товары')['forms']], ['Печать'])
+
+        # В базе прежней версии уникальный индекс построен по (объект, имя) и пересоздается
+        conn.execute("DROP INDEX uq_commands_templates")
+        conn.execute("DELETE FROM commands_templates WHERE commands_templates_is_form = 0")
+        conn.execute("CREATE UNIQUE INDEX uq_commands_templates "
+                     "ON commands_templates(commands_templates_owner, commands_templates_name)")
+        self.assertEqual(create_indexes(conn), 1)
+        self.assertEqual([row[2] for row in conn.execute("PRAGMA index_info(uq_commands_templates)")],
+                         list(INDEXES['uq_commands_templates'][1]))
+        conn.close()
+
+    def test_old_sqlite_is_refused(self):
+        """Test that a SQLite library older than the supported minimum fails with a clear error."""
+        conn = sqlite3.connect(':memory:')
+        with mock.patch.object(sqlite3, 'sqlite_version_info', (3, 29, 0)):
+            with self.assertLogs('ent1ctosqlite', 'ERROR') as logs, self.assertRaises(RuntimeError):
+                create_database(conn)
+        self.assertIn("3.30.0", logs.output[0])
+        conn.close()
+
+    def test_bulk_load_indexes_are_rebuilt(self):
+        """Test that indexes dropped for the first import are created again afterwards."""
+        conn = sqlite3.connect(':memory:')
+        create_database(conn)
+        analyze_directory(self.tree, conn)
+        names = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+        self.assertTrue(set(INDEXES) <= names)
+        self.assertEqual(self._count_methods(conn), 1)
+        conn.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
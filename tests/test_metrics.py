@@ -0,0 +1,91 @@
+import unittest
+import importlib
+import os
+import sys
+import json
+import sqlite3
+import tempfile
+import shutil
+from ent1ctosqlite.core import analyze_directory
+from ent1ctosqlite.database import create_database
+from ent1ctosqlite.metrics import enable_metrics, disable_metrics, stage, count_items
+
+CONFIG_XML = """<?xml version="1.0" encoding="UTF-8"?>
+<MetaDataObject xmlns="http://v8.1c.ru/8.3/MDClasses">
+    <Configuration><ChildObjects>
+        <Catalog>Товары</Catalog>
+    </ChildObjects></Configuration>
+</MetaDataObject>
+"""
+
+
+class TestMetrics(unittest.TestCase):
+    def setUp(self):
+        """Create a configuration with two modules."""
+        self.temp_dir = tempfile.mkdtemp()
+        files = {
+            "Configuration.xml": CONFIG_XML,
+            "Catalogs/Товары/Ext/ObjectModule.bsl": "Процедура А()\nКонецПроцедуры\n",
+            "Catalogs/Товары/Ext/ManagerModule.bsl": "Процедура Б()\nКонецПроцедуры\n",
+        }
+        for rel_path, content in files.items():
+            path = os.path.join(self.temp_dir, *rel_path.split("/"))
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "w", encoding="utf-8-sig") as f:
+                f.write(content)
+
+    def tearDown(self):
+        disable_metrics()
+        shutil.rmtree(self.temp_dir)
+
+    def test_disabled_metrics_are_noop(self):
+        """Test that stages and counters do nothing while collection is disabled."""
+        self.assertIs(stage("a"), stage("b"))
+        with stage("a"):
+            count_items("a", 1, 1)
+        self.assertIsNone(disable_metrics())
+
+    def test_import_stages_are_recorded(self):
+        """Test that import stages, counters and profiles are written."""
+        profile_dir = os.path.join(self.temp_dir, "profiles")
+        metrics = enable_metrics(profile_dir)
+        conn = sqlite3.connect(':memory:')
+        create_database(conn)
+        analyze_directory(self.temp_dir, conn)
+        conn.close()
+        disable_metrics()
+
+        json_path = os.path.join(self.temp_dir, "metrics.json")
+        metrics.write_json(json_path)
+        with open(json_path, encoding="utf-8") as f:
+            data = json.load(f)
+        stages = data["stages"]
+        for name in ("discover", "configuration", "directory_walk", "module_parse", "db_flush"):
+            self.assertIn(name, stages)
+        self.assertEqual(stages["configuration"]["items"], 1)
+        self.assertEqual(stages["module_parse"]["items"], 2)
+        self.assertGreater(stages["db_flush"]["items"], 0)
+        # Время вложенных этапов не входит во время внешних
+        self.assertLessEqual(sum(s["wall_time"] for s in stages.values()), data["total_wall_time"])
+        self.assertIn(os.path.join(profile_dir, "module_parse.prof"), metrics.dump_profiles())
+
+    def test_cpu_time_without_resource_module(self):
+        """Test that metrics import and measure CPU time where the resource module is missing."""
+        from ent1ctosqlite import metrics
+        saved = sys.modules.get("resource")
+        sys.modules["resource"] = None
+        try:
+            importlib.reload(metrics)
+            self.assertIsNone(metrics.resource)
+            self.assertGreater(metrics._cpu_time(), 0)
+        finally:
+            if saved is None:
+                del sys.modules["resource"]
+            else:
+                sys.modules["resource"] = saved
+            importlib.reload(metrics)
+        self.assertIsNotNone(metrics.resource)
+
+
+if __name__ == '__main__':
+    unittest.main()
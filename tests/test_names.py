@@ -0,0 +1,97 @@
+import unittest
+import os
+import sqlite3
+import tempfile
+import shutil
+from ent1ctosqlite.core import analyze_directory
+from ent1ctosqlite.database import create_database
+from ent1ctosqlite.names import build_name_index, search_names
+
+CONFIG_XML = """<?xml version="1.0" encoding="UTF-8"?>
+<MetaDataObject xmlns="http://v8.1c.ru/8.3/MDClasses">
+    <Configuration><ChildObjects>
+        <Catalog>Контрагенты</Catalog>
+        <Catalog>КонтактныеЛица</Catalog>
+    </ChildObjects></Configuration>
+</MetaDataObject>
+"""
+
+CATALOG_XML = """<?xml version="1.0" encoding="UTF-8"?>
+<MetaDataObject xmlns="http://v8.1c.ru/8.3/MDClasses" xmlns:v8="http://v8.1c.ru/8.1/data/core">
+    <Catalog>
+        <Properties><Name>Контрагенты</Name></Properties>
+        <ChildObjects>
+            <Attribute><Properties><Name>ИНН</Name>
+                <Synonym><v8:item><v8:lang>ru</v8:lang><v8:content>Идентификационный номер</v8:content></v8:item></Synonym>
+                <Type><v8:Type>xs:string</v8:Type></Type></Properties></Attribute>
+        </ChildObjects>
+    </Catalog>
+</MetaDataObject>
+"""
+
+
+class TestNames(unittest.TestCase):
+    def setUp(self):
+        """Import two catalogs with an attribute synonym and an object module."""
+        self.temp_dir = tempfile.mkdtemp()
+        files = {
+            "Configuration.xml": CONFIG_XML,
+            "Catalogs/Контрагенты.xml": CATALOG_XML,
+            "Catalogs/Контрагенты/Ext/ObjectModule.bsl":
+                "Процедура ЗаполнитьРеквизиты()\nКонецПроцедуры\n\nПроцедура ПроверитьИНН()\nКонецПроцедуры\n",
+        }
+        for rel_path, content in files.items():
+            path = os.path.join(self.temp_dir, *rel_path.split("/"))
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(content)
+        self.conn = sqlite3.connect(':memory:')
+        create_database(self.conn)
+        analyze_directory(self.temp_dir, self.conn, incremental=True)
+        build_name_index(self.conn)
+
+    def tearDown(self):
+        self.conn.close()
+        shutil.rmtree(self.temp_dir)
+
+    def test_typos_and_synonyms_are_found(self):
+        """Test that names are found despite typos and case and ranked by similarity."""
+        hits = search_names(self.conn, "контрагенты")
+        self.assertEqual((hits[0].score, hits[0].kind, hits[0].name), (1.0, "object", "Контрагенты"))
+
+        hits = search_names(self.conn, "Контргенты")
+        self.assertEqual(hits[0].object_name, "Контрагенты")
+        self.assertLess(hits[0].score, 1.0)
+
+        hits = search_names(self.conn, "идентификацонный номер")
+        self.assertEqual((hits[0].kind, hits[0].name, hits[0].text),
+                         ("attribute", "ИНН", "Идентификационный номер"))
+
+        hits = search_names(self.conn, "ЗаполнитьРеквизты", kinds=["method"])
+        self.assertEqual((hits[0].name, hits[0].container, hits[0].object_name),
+                         ("ЗаполнитьРеквизиты", "ObjectModule", "Контрагенты"))
+        self.assertTrue(all(hit.kind == "method" for hit in hits))
+
+        self.assertEqual(len(search_names(self.conn, "Конт", limit=1)), 1)
+        with self.assertRaises(ValueError):
+            search_names(self.conn, "ИН")
+
+    def test_rebuild_follows_import(self):
+        """Test that rebuilding the index drops names removed by the next import."""
+        path = os.path.join(self.temp_dir, "Catalogs", "Контрагенты", "Ext", "ObjectModule.bsl")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write("Процедура ПроверитьИНН()\nКонецПроцедуры\n")
+        analyze_directory(self.temp_dir, self.conn, incremental=True)
+        build_name_index(self.conn)
+        names = [hit.name for hit in search_names(self.conn, "ЗаполнитьРеквизиты", kinds=["method"])]
+        self.assertNotIn("ЗаполнитьРеквизиты", names)
+        self.assertIn("ПроверитьИНН", names)
+
+        conn = sqlite3.connect(':memory:')
+        with self.assertRaises(RuntimeError):
+            search_names(conn, "Контрагенты")
+        conn.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
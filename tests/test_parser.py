@@ -1,11 +1,17 @@
 import unittest
 import os
 import sqlite3
-from ent1ctosqlite.core import parse_configuration, analyze_directory
+from ent1ctosqlite.core import (
+    parse_configuration, parse_predefined, analyze_directory, open_vcv, parse_form_and_code, parse_method_args
+)
 from ent1ctosqlite.database import create_database, check_database_integrity
+from ent1ctosqlite.ingest import BulkWriter
+from ent1ctosqlite.utils import iter_elements, extract_synonym, extract_synonyms, find_configuration_root
+from ent1ctosqlite.vfs import ZipSource
 import logging
 import tempfile
 import shutil
+import zipfile
 
 # Change logger name
 logger = logging.getLogger('ent1ctosqlite')
@@ -111,5 +117,388 @@ class TestParser(unittest.TestCase):
         self.assertEqual(methods[0], ("ТестоваяФункция", 1, 1))  # Function, Export
         self.assertEqual(methods[1], ("ТестовыйМетод", 0, 1))    # Procedure, Export
 
+    def _write_configuration(self, base_path):
+        """Create a small configuration export with an object module and a form module."""
+        config_xml = """<?xml version="1.0" encoding="UTF-8"?>
+        <MetaDataObject xmlns="http://v8.1c.ru/8.3/MDClasses" xmlns:ns="http://v8.1c.ru/8.3/MDClasses">
+            <Configuration>
+                <Name>TestConfig</Name>
+                <ChildObjects>
+                    <ns:Document>TestDoc</ns:Document>
+                    <ns:Catalog>TestCat</ns:Catalog>
+                </ChildObjects>
+            </Configuration>
+        </MetaDataObject>
+        """
+        files = {
+            "Configuration.xml": config_xml,
+            "Documents/TestDoc/Ext/ObjectModule.bsl":
+                "Процедура ПередЗаписью(Отказ) Экспорт\nКонецПроцедуры\n",
+            "Documents/TestDoc/Forms/ФормаДокумента.xml":
+                """<?xml version="1.0" encoding="UTF-8"?>
+                <MetaDataObject xmlns="http://v8.1c.ru/8.3/MDClasses" xmlns:v8="http://v8.1c.ru/8.1/data/core">
+                    <Form><Properties><Name>ФормаДокумента</Name>
+                    <Synonym><v8:item><v8:lang>ru</v8:lang><v8:content>Форма документа</v8:content></v8:item></Synonym>
+                    </Properties></Form>
+                </MetaDataObject>""",
+            "Documents/TestDoc/Forms/ФормаДокумента/Ext/Form/Module.bsl":
+                "&НаКлиенте\nФункция Проверить(А, Б = 1)\n    Возврат А;\nКонецФункции\n",
+            "Catalogs/TestCat/Ext/ManagerModule.bsl":
+                "Функция Получить() Экспорт\n    Возврат 1;\nКонецФункции\n",
+        }
+        for rel_path, content in files.items():
+            path = os.path.join(base_path, *rel_path.split("/"))
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "w", encoding="utf-8-sig") as f:
+                f.write(content)
+        return files
+
+    def _table_snapshot(self, conn):
+        """Return the rows produced by an import, without generated ids."""
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT o.obj_name, cb.code_body_name, cb.code_body_module_type, ct.commands_templates_name,
+                   ct.commands_templates_synonym, m.methods_name, m.methods_if_func, m.methods_is_export
+            FROM methods m
+            JOIN code_body cb ON cb.code_body_id = m.methods_owner_id
+            JOIN objects o ON o.obj_id = cb.code_body_owner
+            LEFT JOIN commands_templates ct ON ct.commands_templates_id = cb.code_body_owner_id
+            ORDER BY o.obj_name, m.methods_name
+        """)
+        return cursor.fetchall()
+
+    def test_analyze_zip_without_extracting(self):
+        """Test reading a configuration straight from a zip archive."""
+        export_dir = os.path.join(self.temp_dir, "export")
+        files = self._write_configuration(os.path.join(export_dir, "cfg"))
+        zip_path = os.path.join(self.temp_dir, "cfg.zip")
+        with zipfile.ZipFile(zip_path, "w") as zf:
+            for rel_path in files:
+                zf.write(os.path.join(export_dir, "cfg", *rel_path.split("/")), "cfg/" + rel_path)
+
+        source, config_root = open_vcv(zip_path)
+        try:
+            self.assertEqual(config_root, "cfg")
+            analyze_directory(config_root, self.conn, source)
+        finally:
+            source.close()
+
+        disk_conn = sqlite3.connect(':memory:')
+        create_database(disk_conn)
+        analyze_directory(export_dir, disk_conn)
+
+        rows = self._table_snapshot(self.conn)
+        self.assertEqual(rows, self._table_snapshot(disk_conn))
+        self.assertEqual(len(rows), 3)
+        self.assertIn(("TestDoc", "Module", "МодульФормы", "ФормаДокумента", "Форма документа",
+                       "Проверить", 1, 0), rows)
+        disk_conn.close()
+
+    def test_analyze_directory_jobs(self):
+        """Test that parsing modules in a process pool gives the same rows as the serial path."""
+        export_dir = os.path.join(self.temp_dir, "export")
+        self._write_configuration(export_dir)
+        analyze_directory(export_dir, self.conn)
+
+        parallel_conn = sqlite3.connect(':memory:')
+        create_database(parallel_conn)
+        analyze_directory(export_dir, parallel_conn, jobs=2)
+        self.assertEqual(self._table_snapshot(parallel_conn), self._table_snapshot(self.conn))
+
+        cursor = parallel_conn.cursor()
+        cursor.execute("SELECT methods_args_arg_name FROM methods_args ORDER BY methods_args_arg_name")
+        self.assertEqual(cursor.fetchall(), [("А",), ("Б",), ("Отказ",)])
+        parallel_conn.close()
+
+    def test_bulk_writer_batches(self):
+        """Test that an import is flushed in batches and committed once."""
+        export_dir = os.path.join(self.temp_dir, "export")
+        self._write_configuration(export_dir)
+        writer = BulkWriter(self.conn, batch_size=2)
+        analyze_directory(export_dir, self.conn, writer=writer)
+        writer.commit()
+
+        stats = writer.stats()
+        self.assertEqual(stats["objects"]["rows"], 2)
+        self.assertEqual(stats["methods"]["rows"], 3)
+        self.assertEqual(stats["methods_args"]["rows"], 3)
+        self.assertGreater(stats["methods"]["flushes"], 1)
+        self.assertEqual(writer.commits, 1)
+
+        # Pre-allocated ids keep children attached to their parents
+        cursor = self.conn.cursor()
+        cursor.execute("""
+            SELECT COUNT(*) FROM methods_args a
+            JOIN methods m ON m.methods_id = a.methods_args_owner_id
+            AND m.methods_name = a.methods_args_method_name
+        """)
+        self.assertEqual(cursor.fetchone()[0], 3)
+
+    def test_natural_keys_are_unique(self):
+        """Test that repeated writes are resolved by ON CONFLICT on the natural keys."""
+        form_dir = os.path.join(self.temp_dir, "Форма")
+        os.makedirs(form_dir)
+        form_path = os.path.join(form_dir, "Form.xml")
+        with open(form_path, "w", encoding="utf-8") as f:
+            f.write('<Form><Properties><Synonym><v8:item xmlns:v8="v8"><v8:content>Форма</v8:content>'
+                    '</v8:item></Synonym></Properties></Form>')
+        with open(os.path.join(form_dir, "Module.bsl"), "w", encoding="utf-8") as f:
+            f.write("Процедура А(Б, В)\nКонецПроцедуры\n")
+        for _ in range(2):
+            parse_form_and_code(1, form_path, self.conn)
+            parse_method_args(1, "Б, Г", "А", self.conn)
+        cursor = self.conn.cursor()
+        for table, count in (("commands_templates", 1), ("code_body", 1), ("methods", 1), ("methods_args", 3)):
+            cursor.execute(f"SELECT COUNT(*) FROM {table}")
+            self.assertEqual(cursor.fetchone()[0], count, table)
+
+        writer = BulkWriter(self.conn)
+        template_id = writer.upsert("commands_templates", (writer.next_id("commands_templates"), 1, "Форма",
+                                                           True, False, None), update=("commands_templates_synonym",))
+        self.assertEqual(template_id, 1)
+        cursor.execute("SELECT commands_templates_synonym FROM commands_templates")
+        self.assertEqual(cursor.fetchone()[0], "Форма")
+        with self.assertRaises(sqlite3.IntegrityError):
+            cursor.execute("INSERT INTO methods (methods_owner_id, methods_name) VALUES (1, 'А')")
+
+    def test_incremental_reimport(self):
+        """Test that a re-import touches only changed files and matches a full import."""
+        export_dir = os.path.join(self.temp_dir, "export")
+        self._write_configuration(export_dir)
+        analyze_directory(export_dir, self.conn, incremental=True)
+
+        cursor = self.conn.cursor()
+        cursor.execute("SELECT code_body_id FROM code_body WHERE code_body_name = 'ObjectModule'")
+        unchanged_id = cursor.fetchone()[0]
+
+        # Change one module, delete another and add a new one
+        with open(os.path.join(export_dir, "Catalogs", "TestCat", "Ext", "ManagerModule.bsl"),
+                  "w", encoding="utf-8") as f:
+            f.write("Функция Получить(Ключ) Экспорт\n    Возврат 2;\nКонецФункции\n")
+        os.remove(os.path.join(export_dir, "Documents", "TestDoc", "Forms", "ФормаДокумента",
+                               "Ext", "Form", "Module.bsl"))
+        with open(os.path.join(export_dir, "Catalogs", "TestCat", "Ext", "ObjectModule.bsl"),
+                  "w", encoding="utf-8") as f:
+            f.write("Процедура Новая()\nКонецПроцедуры\n")
+
+        analyze_directory(export_dir, self.conn, incremental=True)
+
+        full_conn = sqlite3.connect(':memory:')
+        create_database(full_conn)
+        analyze_directory(export_dir, full_conn)
+        self.assertEqual(self._table_snapshot(self.conn), self._table_snapshot(full_conn))
+        full_conn.close()
+
+        cursor.execute("SELECT code_body_id FROM code_body WHERE code_body_name = 'ObjectModule' "
+                       "AND code_body_owner = (SELECT obj_id FROM objects WHERE obj_name = 'TestDoc')")
+        self.assertEqual(cursor.fetchone()[0], unchanged_id)
+        cursor.execute("SELECT COUNT(*) FROM objects")
+        self.assertEqual(cursor.fetchone()[0], 2)
+        cursor.execute("SELECT COUNT(*) FROM file_hashes")
+        self.assertEqual(cursor.fetchone()[0], 4)
+        cursor.execute("SELECT methods_args_arg_name FROM methods_args")
+        self.assertEqual(cursor.fetchall(), [("Отказ",), ("Ключ",)])
+
+    def test_owner_resolution_is_exact(self):
+        """Test that modules are attached to the object whose folder matches exactly."""
+        config_xml = """<?xml version="1.0" encoding="UTF-8"?>
+        <MetaDataObject xmlns="http://v8.1c.ru/8.3/MDClasses">
+            <Configuration><ChildObjects>
+                <Catalog>Foo</Catalog>
+                <Catalog>FooBar</Catalog>
+            </ChildObjects></Configuration>
+        </MetaDataObject>
+        """
+        with open(os.path.join(self.temp_dir, "Configuration.xml"), "w", encoding="utf-8") as f:
+            f.write(config_xml)
+        for name in ("FooBar", "Foo"):
+            module_path = os.path.join(self.temp_dir, "Catalogs", name, "Ext", "ObjectModule.bsl")
+            os.makedirs(os.path.dirname(module_path))
+            with open(module_path, "w", encoding="utf-8") as f:
+                f.write(f"Процедура Метод{name}()\nКонецПроцедуры\n")
+
+        analyze_directory(self.temp_dir, self.conn)
+
+        cursor = self.conn.cursor()
+        cursor.execute("""
+            SELECT o.obj_name, m.methods_name FROM methods m
+            JOIN code_body cb ON cb.code_body_id = m.methods_owner_id
+            JOIN objects o ON o.obj_id = cb.code_body_owner
+            ORDER BY o.obj_name
+        """)
+        self.assertEqual(cursor.fetchall(), [("Foo", "МетодFoo"), ("FooBar", "МетодFooBar")])
+
+    def test_iter_elements_releases_parsed_nodes(self):
+        """Test that the streaming reader yields whole matching elements only."""
+        xml = b"""<Root><Skip><Deep>1</Deep></Skip>
+            <Item><Name>A</Name><Value>1</Value></Item>
+            <Item><Name>B</Name><Value>2</Value></Item></Root>"""
+        path = os.path.join(self.temp_dir, "stream.xml")
+        with open(path, "wb") as f:
+            f.write(xml)
+        names = []
+        items = []
+        with open(path, "rb") as f:
+            for key, elem in iter_elements(f, lambda p: p[-1] == "Item"):
+                self.assertEqual(key, ("Root", "Item"))
+                names.append((elem.findtext("Name"), elem.findtext("Value")))
+                items.append(elem)
+        self.assertEqual(names, [("A", "1"), ("B", "2")])
+        # Элементы остаются целыми, пока их обрабатывают
+        self.assertEqual([len(item) for item in items], [2, 2])
+
+    def test_parse_predefined_nested_items(self):
+        """Test that nested predefined items are read from a namespaced XML."""
+        xml = """<?xml version="1.0" encoding="UTF-8"?>
+        <PredefinedData xmlns="http://v8.1c.ru/8.3/xcf/predef">
+            <Item><Name>Группа</Name><Code>001</Code>
+                <ChildItems><Item><Name>Элемент</Name><Code>002</Code></Item></ChildItems>
+            </Item>
+        </PredefinedData>
+        """
+        path = os.path.join(self.temp_dir, "Predefined.xml")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(xml)
+        parse_predefined(1, path, self.conn)
+
+        cursor = self.conn.cursor()
+        cursor.execute("""
+            SELECT p.predefined_attrs_name, v.predefined_attrs_values_val
+            FROM predefined_attrs p
+            JOIN predefined_attrs_values v ON v.predefined_attrs_values_atr = p.predefined_attrs_id
+            ORDER BY p.predefined_attrs_name
+        """)
+        self.assertEqual(cursor.fetchall(), [("Группа", "001"), ("Элемент", "002")])
+
+    def test_object_attributes(self):
+        """Test that attributes, tabular sections and register fields are loaded with types."""
+        config_xml = """<?xml version="1.0" encoding="UTF-8"?>
+        <MetaDataObject xmlns="http://v8.1c.ru/8.3/MDClasses">
+            <Configuration><ChildObjects>
+                <Document>Заказ</Document>
+                <InformationRegister>Цены</InformationRegister>
+            </ChildObjects></Configuration>
+        </MetaDataObject>
+        """
+        document_xml = """<?xml version="1.0" encoding="UTF-8"?>
+        <MetaDataObject xmlns="http://v8.1c.ru/8.3/MDClasses" xmlns:v8="http://v8.1c.ru/8.1/data/core"
+                xmlns:xr="http://v8.1c.ru/8.3/xcf/readable" xmlns:xs="http://www.w3.org/2001/XMLSchema"
+                xmlns:cfg="http://v8.1c.ru/8.1/data/enterprise/current-config">
+            <Document>
+                <Properties>
+                    <Name>Заказ</Name>
+                    <StandardAttributes><xr:StandardAttribute name="Number"/></StandardAttributes>
+                </Properties>
+                <ChildObjects>
+                    <Attribute><Properties><Name>Контрагент</Name>
+                        <Type><v8:Type>cfg:CatalogRef.Контрагенты</v8:Type><v8:Type>xs:string</v8:Type>
+                            <v8:StringQualifiers><v8:Length>10</v8:Length></v8:StringQualifiers></Type>
+                    </Properties></Attribute>
+                    <TabularSection><Properties><Name>Товары</Name>
+                        <StandardAttributes><xr:StandardAttribute name="LineNumber"/></StandardAttributes>
+                    </Properties><ChildObjects>
+                        <Attribute><Properties><Name>Количество</Name>
+                            <Type><v8:Type>xs:decimal</v8:Type></Type></Properties></Attribute>
+                    </ChildObjects></TabularSection>
+                    <Form>ФормаДокумента</Form>
+                </ChildObjects>
+            </Document>
+        </MetaDataObject>
+        """
+        register_xml = """<?xml version="1.0" encoding="UTF-8"?>
+        <MetaDataObject xmlns="http://v8.1c.ru/8.3/MDClasses" xmlns:v8="http://v8.1c.ru/8.1/data/core">
+            <InformationRegister><ChildObjects>
+                <Dimension><Properties><Name>Товар</Name></Properties></Dimension>
+                <Resource><Properties><Name>Цена</Name></Properties></Resource>
+            </ChildObjects></InformationRegister>
+        </MetaDataObject>
+        """
+        files = {
+            "Configuration.xml": config_xml,
+            "Documents/Заказ.xml": document_xml,
+            "InformationRegisters/Цены.xml": register_xml,
+        }
+        for rel_path, content in files.items():
+            path = os.path.join(self.temp_dir, *rel_path.split("/"))
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(content)
+
+        query = """
+            SELECT prop_name, table_part, is_dimension, is_resourse, is_attribute,
+                   is_standard_attribute, is_tbl_part
+            FROM obj_attributes ORDER BY obj_attr_id
+        """
+        expected = [
+            ("Number", None, 0, 0, 0, 1, 0),
+            ("Контрагент", None, 0, 0, 1, 0, 0),
+            ("Товары", None, 0, 0, 0, 0, 1),
+            ("LineNumber", "Товары", 0, 0, 0, 1, 0),
+            ("Количество", "Товары", 0, 0, 1, 0, 0),
+            ("Товар", None, 1, 0, 0, 0, 0),
+            ("Цена", None, 0, 1, 0, 0, 0),
+        ]
+        analyze_directory(self.temp_dir, self.conn)
+        cursor = self.conn.cursor()
+        cursor.execute(query)
+        self.assertEqual(cursor.fetchall(), expected)
+        cursor.execute("""
+            SELECT a.prop_name, t.type_body, t.type_name, t.type_class, t.type_class_ru, t.is_configuration_type
+            FROM obj_attr_types t JOIN obj_attributes a ON a.obj_attr_id = t.obj_attr_type_owner
+            ORDER BY t.obj_attr_type_id
+        """)
+        self.assertEqual(cursor.fetchall(), [
+            ("Контрагент", "cfg:CatalogRef.Контрагенты", "Контрагенты", "CatalogRef", "СправочникСсылка", 1),
+            ("Контрагент", "xs:string", None, "string", "Строка", 0),
+            ("Количество", "xs:decimal", None, "decimal", "Число", 0),
+        ])
+
+        # Повторный импорт не дублирует реквизиты
+        analyze_directory(self.temp_dir, self.conn)
+        cursor.execute(query)
+        self.assertEqual(sorted(cursor.fetchall(), key=str), sorted(expected, key=str))
+
+    def test_extract_synonyms_stops_after_properties(self):
+        """Test that all synonym languages are read without parsing the rest of the file."""
+        xml = """<?xml version="1.0" encoding="UTF-8"?>
+        <MetaDataObject xmlns="http://v8.1c.ru/8.3/MDClasses" xmlns:v8="http://v8.1c.ru/8.1/data/core"
+                xmlns:xr="http://v8.1c.ru/8.3/xcf/readable">
+            <Form><Properties>
+                <Name>ФормаЭлемента</Name>
+                <Synonym>
+                    <v8:item><v8:lang>ru</v8:lang><v8:content>Форма элемента</v8:content></v8:item>
+                    <v8:item><v8:lang>en</v8:lang><v8:content>Item form</v8:content></v8:item>
+                </Synonym>
+                <StandardAttributes><xr:StandardAttribute name="Code"><xr:Synonym>
+                    <v8:item><v8:lang>ru</v8:lang><v8:content>Код</v8:content></v8:item>
+                </xr:Synonym></xr:StandardAttribute></StandardAttributes>
+            </Properties>
+            <ChildItems><Broken></ChildItems>
+        """ + "<Field/>" * 10000
+        path = os.path.join(self.temp_dir, "Form.xml")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(xml)
+        self.assertEqual(extract_synonyms(path), {"ru": "Форма элемента", "en": "Item form"})
+        self.assertEqual(extract_synonym(path), "Форма элемента")
+
+    def test_find_configuration_root_breadth_first(self):
+        """Test that the shallowest Configuration.xml is found within the depth limit."""
+        for rel_path in ("a/b/c/Configuration.xml", "z/cfg/Configuration.xml", "z/cfg/Catalogs/X.xml"):
+            path = os.path.join(self.temp_dir, *rel_path.split("/"))
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "w", encoding="utf-8") as f:
+                f.write("<MetaDataObject/>")
+        expected = os.path.join(self.temp_dir, "z", "cfg")
+        self.assertEqual(find_configuration_root(self.temp_dir), expected)
+        self.assertIsNone(find_configuration_root(self.temp_dir, max_depth=1))
+
+        zip_path = os.path.join(self.temp_dir, "export.zip")
+        with zipfile.ZipFile(zip_path, "w") as zf:
+            zf.writestr("a/b/c/Configuration.xml", "<MetaDataObject/>")
+            zf.writestr("z/cfg/Configuration.xml", "<MetaDataObject/>")
+        with ZipSource(zip_path) as source:
+            self.assertEqual(find_configuration_root("", source), "z/cfg")
+            self.assertIsNone(find_configuration_root("", source, max_depth=1))
+
 if __name__ == '__main__':
     unittest.main() 
\ No newline at end of file
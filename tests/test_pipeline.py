@@ -0,0 +1,60 @@
+import unittest
+import threading
+from ent1ctosqlite.pipeline import Pipeline
+
+
+def _square(value):
+    return value * value
+
+
+def _fail_on_three(value):
+    if value == 3:
+        raise ValueError("три")
+    return value
+
+
+class TestPipeline(unittest.TestCase):
+    def _pipeline_threads(self):
+        return [t for t in threading.enumerate() if t.name.startswith('ent1ctosqlite-')]
+
+    def test_results_keep_order_with_small_queues(self):
+        """Test that results come back in input order and queue depth stays bounded."""
+        for jobs in (1, 2):
+            pipeline = Pipeline(lambda value: value + 1, _square, jobs=jobs, queue_size=2)
+            self.assertEqual(list(pipeline.run(range(100))), [(i + 1) ** 2 for i in range(100)])
+            stats = pipeline.stats()
+            self.assertEqual(stats['read']['items'], 100)
+            self.assertLessEqual(stats['read']['max_depth'], 2)
+            self.assertLessEqual(stats['parse']['max_depth'], 2)
+        self.assertEqual(self._pipeline_threads(), [])
+
+    def test_errors_are_raised_in_writer(self):
+        """Test that a parse error reaches the consumer and stops the stages."""
+        pipeline = Pipeline(lambda value: value, _fail_on_three, queue_size=1)
+        results = []
+        with self.assertRaises(ValueError):
+            for value in pipeline.run(range(1000)):
+                results.append(value)
+        self.assertEqual(results, [0, 1, 2])
+        self.assertEqual(self._pipeline_threads(), [])
+
+    def test_abandoned_run_stops_threads(self):
+        """Test that closing the result iterator early releases blocked stages."""
+        pipeline = Pipeline(lambda value: value, _square, queue_size=1)
+        results = pipeline.run(range(1000))
+        self.assertEqual(next(results), 0)
+        results.close()
+        self.assertEqual(self._pipeline_threads(), [])
+
+    def test_abandoned_run_cancels_pool_tasks(self):
+        """Test that closing the result iterator early with a process pool leaves no unfinished pool tasks."""
+        pipeline = Pipeline(lambda value: value, _square, jobs=2, queue_size=2)
+        results = pipeline.run(range(10000))
+        self.assertEqual(next(results), 0)
+        results.close()
+        self.assertEqual(self._pipeline_threads(), [])
+        self.assertTrue(all(future.done() for future in pipeline._futures))
+
+
+if __name__ == '__main__':
+    unittest.main()
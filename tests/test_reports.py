@@ -0,0 +1,143 @@
+import unittest
+import os
+import json
+import sqlite3
+import tempfile
+import shutil
+from ent1ctosqlite.core import analyze_directory
+from ent1ctosqlite.database import create_database
+from ent1ctosqlite.reports import object_report, clear_report_cache, iter_object_reports, export_reports
+
+CONFIG_XML = """<?xml version="1.0" encoding="UTF-8"?>
+<MetaDataObject xmlns="http://v8.1c.ru/8.3/MDClasses">
+    <Configuration><ChildObjects>
+        <Document>Заказ</Document>
+        <Document>ЗаказПоставщику</Document>
+    </ChildObjects></Configuration>
+</MetaDataObject>
+"""
+
+
+def _synonym(ru, en):
+    return (f'<Synonym><v8:item><v8:lang>ru</v8:lang><v8:content>{ru}</v8:content></v8:item>'
+            f'<v8:item><v8:lang>en</v8:lang><v8:content>{en}</v8:content></v8:item></Synonym>')
+
+
+DOCUMENT_XML = f"""<?xml version="1.0" encoding="UTF-8"?>
+<MetaDataObject xmlns="http://v8.1c.ru/8.3/MDClasses" xmlns:v8="http://v8.1c.ru/8.1/data/core">
+    <Document>
+        <Properties><Name>Заказ</Name>{_synonym('Заказ клиента', 'Sales order')}</Properties>
+        <ChildObjects>
+            <Attribute><Properties><Name>Контрагент</Name>{_synonym('Покупатель', 'Customer')}
+                <Type><v8:Type>xs:string</v8:Type></Type></Properties></Attribute>
+            <TabularSection><Properties><Name>Товары</Name>{_synonym('Товары заказа', 'Goods')}</Properties>
+                <ChildObjects>
+                    <Attribute><Properties><Name>Количество</Name>
+                        <Type><v8:Type>xs:decimal</v8:Type></Type></Properties></Attribute>
+                </ChildObjects></TabularSection>
+        </ChildObjects>
+    </Document>
+</MetaDataObject>
+"""
+
+
+class TestReports(unittest.TestCase):
+    def setUp(self):
+        """Import two documents with synonyms, an object module and a form module."""
+        clear_report_cache()
+        self.temp_dir = tempfile.mkdtemp()
+        files = {
+            "Configuration.xml": CONFIG_XML,
+            "Documents/Заказ.xml": DOCUMENT_XML,
+            "Documents/Заказ/Ext/ObjectModule.bsl": "Процедура ПриЗаписи()\nКонецПроцедуры\n",
+            "Documents/Заказ/Forms/ФормаДокумента/Ext/Form/Module.bsl":
+                "&НаКлиенте\nФункция Проверить() Экспорт\nКонецФункции\n",
+        }
+        for rel_path, content in files.items():
+            path = os.path.join(self.temp_dir, *rel_path.split("/"))
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(content)
+        self.conn = sqlite3.connect(':memory:')
+        create_database(self.conn)
+        analyze_directory(self.temp_dir, self.conn, incremental=True)
+
+    def tearDown(self):
+        self.conn.close()
+        shutil.rmtree(self.temp_dir)
+
+    def _count_queries(self, func):
+        queries = []
+        self.conn.set_trace_callback(queries.append)
+        try:
+            result = func()
+        finally:
+            self.conn.set_trace_callback(None)
+        return result, len(queries)
+
+    def test_report_uses_synonyms_and_fixed_query_count(self):
+        """Test that the report is built from a constant number of queries."""
+        report, queries = self._count_queries(lambda: object_report(self.conn, "Документ", "Заказ"))
+        # Точное совпадение имени вытесняет ЗаказПоставщику
+        self.assertEqual(report["object"]["name"], "Заказ")
+        self.assertEqual(report["object"]["synonym"], "Заказ клиента")
+        self.assertEqual(report["attributes"], [{"name": "Контрагент", "synonym": "Покупатель", "types": ["Строка"]}])
+        self.assertEqual(report["tabular_sections"], [{
+            "name": "Товары", "synonym": "Товары заказа",
+            "attributes": [{"name": "Количество", "synonym": None, "types": ["Число"]}]}])
+        self.assertEqual([(m["module"], m["name"]) for m in report["methods"]],
+                         [("ObjectModule", "ПриЗаписи"), ("ФормаДокумента.Module", "Проверить")])
+        self.assertEqual(report["forms"], [{"name": "ФормаДокумента", "synonym": None}])
+        # PRAGMA database_list, поколение импорта, объект, реквизиты, формы, основания и движения, методы
+        self.assertEqual(queries, 7)
+
+        english = object_report(self.conn, "Document", "Sales order", lang="en")
+        self.assertEqual(english["object"]["synonym"], "Sales order")
+        self.assertEqual(english["tabular_sections"][0]["synonym"], "Goods")
+        self.assertEqual(len(object_report(self.conn, "Document", "Зака")["candidates"]), 2)
+        self.assertIsNone(object_report(self.conn, "НеизвестныйТип", "Заказ"))
+
+    def test_cache_is_invalidated_by_import(self):
+        """Test that a repeated lookup is served from the cache until the next import."""
+        object_report(self.conn, "Document", "Заказ")["object"]["name"] = "изменено"
+        report, queries = self._count_queries(lambda: object_report(self.conn, "Document", "Заказ"))
+        self.assertEqual(report["object"]["name"], "Заказ")
+        self.assertEqual(queries, 2)
+
+        path = os.path.join(self.temp_dir, "Documents", "Заказ", "Ext", "ObjectModule.bsl")
+        with open(path, "a", encoding="utf-8") as f:
+            f.write("Процедура Новая()\nКонецПроцедуры\n")
+        analyze_directory(self.temp_dir, self.conn, incremental=True)
+        report = object_report(self.conn, "Document", "Заказ")
+        self.assertIn("Новая", [m["name"] for m in report["methods"]])
+
+    def test_export_matches_single_reports(self):
+        """Test that the bulk export repeats object_report in a fixed number of queries."""
+        path = os.path.join(self.temp_dir, "reports.jsonl")
+        count, queries = self._count_queries(lambda: export_reports(self.conn, path))
+        self.assertEqual(count, 2)
+        # Объекты и по одному запросу на раздел, независимо от числа объектов
+        self.assertEqual(queries, 5)
+        with open(path, encoding="utf-8") as f:
+            exported = [json.loads(line) for line in f]
+        self.assertEqual([report["object"]["name"] for report in exported], ["Заказ", "ЗаказПоставщику"])
+        self.assertEqual(exported[0], object_report(self.conn, "Document", "Заказ"))
+        self.assertEqual(exported[1]["methods"], [])
+
+        english = next(iter_object_reports(self.conn, "Документ", lang="en"))
+        self.assertEqual(english["attributes"][0]["synonym"], "Customer")
+        with self.assertRaises(ValueError):
+            iter_object_reports(self.conn, "НеизвестныйТип")
+
+        path = os.path.join(self.temp_dir, "reports.md")
+        export_reports(self.conn, path, fmt="markdown")
+        with open(path, encoding="utf-8") as f:
+            markdown = f.read()
+        for line in ("## Документ.Заказ (Заказ клиента)", "- Контрагент (Покупатель): Строка",
+                     "### Табличная часть Товары (Товары заказа)", "- ФормаДокумента",
+                     "- `Функция Проверить() Экспорт` [ФормаДокумента.Module]", "## Документ.ЗаказПоставщику"):
+            self.assertIn(line, markdown.splitlines())
+
+
+if __name__ == '__main__':
+    unittest.main()
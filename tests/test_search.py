@@ -0,0 +1,102 @@
+import unittest
+import os
+import sqlite3
+import tempfile
+import shutil
+from ent1ctosqlite.core import analyze_directory
+from ent1ctosqlite.database import create_database
+from ent1ctosqlite.search import build_fts_index, search_code, make_fts_query
+
+CONFIG_XML = """<?xml version="1.0" encoding="UTF-8"?>
+<MetaDataObject xmlns="http://v8.1c.ru/8.3/MDClasses">
+    <Configuration><ChildObjects>
+        <CommonModule>ОбщегоНазначения</CommonModule>
+        <Document>Заказ</Document>
+    </ChildObjects></Configuration>
+</MetaDataObject>
+"""
+
+COMMON_MODULE = """Перем КэшНастроек;
+
+Процедура СообщитьПользователю(Текст) Экспорт
+    Сообщение = Новый СообщениеПользователю;
+    Сообщение.Текст = Текст;
+КонецПроцедуры
+"""
+
+FORM_MODULE = """&НаКлиенте
+Процедура ПриОткрытии(Отказ)
+    ОбщегоНазначения.СообщитьПользователю("Форма открыта");
+КонецПроцедуры
+"""
+
+DOCUMENT_MODULE = """Процедура ОбработкаПроведения(Отказ)
+    // проверка остатков
+    ОбщегоНазначения.СообщитьПользователю("Документ проведен");
+КонецПроцедуры
+"""
+
+
+class TestSearch(unittest.TestCase):
+    def setUp(self):
+        """Import a small configuration and build the full-text index."""
+        self.temp_dir = tempfile.mkdtemp()
+        files = {
+            "Configuration.xml": CONFIG_XML,
+            "CommonModules/ОбщегоНазначения/Ext/Module.bsl": COMMON_MODULE,
+            "Documents/Заказ/Ext/ObjectModule.bsl": DOCUMENT_MODULE,
+            "Documents/Заказ/Forms/ФормаДокумента.xml": "<MetaDataObject/>",
+            "Documents/Заказ/Forms/ФормаДокумента/Ext/Form/Module.bsl": FORM_MODULE,
+        }
+        for rel_path, content in files.items():
+            path = os.path.join(self.temp_dir, *rel_path.split("/"))
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "w", encoding="utf-8-sig") as f:
+                f.write(content)
+        self.conn = sqlite3.connect(':memory:')
+        create_database(self.conn)
+        analyze_directory(self.temp_dir, self.conn)
+        self.assertEqual(build_fts_index(self.conn), 3)
+
+    def tearDown(self):
+        self.conn.close()
+        shutil.rmtree(self.temp_dir)
+
+    def test_search_returns_module_method_and_line(self):
+        """Test that a qualified call is found with its object, method and line."""
+        hits = search_code(self.conn, "ОбщегоНазначения.СообщитьПользователю")
+        self.assertEqual(len(hits), 2)
+        hit, = [h for h in hits if h.module_name == "ObjectModule"]
+        self.assertEqual((hit.object_name, hit.module_name, hit.method_name, hit.line),
+                         ("Заказ", "ObjectModule", "ОбработкаПроведения", 3))
+        self.assertIn("Документ проведен", hit.text)
+
+    def test_form_module_is_labelled_with_form(self):
+        """Test that a hit in a form module names the form, not just the module."""
+        hits = search_code(self.conn, "Форма открыта")
+        self.assertEqual([(h.object_name, h.module_name, h.method_name, h.line) for h in hits],
+                         [("Заказ", "ФормаДокумента.Module", "ПриОткрытии", 3)])
+
+    def test_search_is_case_insensitive_for_cyrillic(self):
+        """Test Cyrillic case folding, prefix queries and module-level text."""
+        hits = search_code(self.conn, "ОСТАТКОВ")
+        self.assertEqual([(h.object_name, h.line) for h in hits], [("Заказ", 2)])
+
+        hits = search_code(self.conn, "кэшнастр*")
+        self.assertEqual([(h.object_name, h.method_name, h.line) for h in hits],
+                         [("ОбщегоНазначения", None, 1)])
+
+    def test_index_is_incremental(self):
+        """Test that only modules missing from the index are indexed again."""
+        self.assertEqual(build_fts_index(self.conn), 0)
+        self.assertEqual(build_fts_index(self.conn, rebuild=True), 3)
+
+    def test_make_fts_query(self):
+        """Test conversion of user input to an FTS5 phrase query."""
+        self.assertEqual(make_fts_query("Модуль.Метод*"), '"Модуль" + "Метод"*')
+        with self.assertRaises(ValueError):
+            make_fts_query("...")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,132 @@
+import unittest
+import json
+import os
+import sqlite3
+import tempfile
+import shutil
+import threading
+from urllib.error import HTTPError
+from urllib.parse import urlencode
+from urllib.request import urlopen
+from ent1ctosqlite.callgraph import build_call_graph
+from ent1ctosqlite.core import analyze_directory
+from ent1ctosqlite.database import create_database, open_staging_database, publish_database
+from ent1ctosqlite.names import build_name_index
+from ent1ctosqlite.server import ConnectionPool, OutdatedDatabaseError, QueryServer
+
+CONFIG_XML = """<?xml version="1.0" encoding="UTF-8"?>
+<MetaDataObject xmlns="http://v8.1c.ru/8.3/MDClasses">
+    <Configuration><ChildObjects>
+        <CommonModule>ОбщегоНазначения</CommonModule>
+        <Catalog>Контрагенты</Catalog>
+    </ChildObjects></Configuration>
+</MetaDataObject>
+"""
+
+
+class TestServer(unittest.TestCase):
+    def setUp(self):
+        """Import a catalog calling a common module into a file database and start the service."""
+        self.temp_dir = tempfile.mkdtemp()
+        self.tree = os.path.join(self.temp_dir, "tree")
+        files = {
+            "Configuration.xml": CONFIG_XML,
+            "CommonModules/ОбщегоНазначения/Ext/Module.bsl":
+                "Функция ТекущаяДата() Экспорт\n    Возврат 1;\nКонецФункции\n",
+            "Catalogs/Контрагенты/Ext/ObjectModule.bsl":
+                "Процедура ПередЗаписью(Отказ)\n    Д = ОбщегоНазначения.ТекущаяДата();\nКонецПроцедуры\n",
+        }
+        for rel_path, content in files.items():
+            path = os.path.join(self.tree, *rel_path.split("/"))
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(content)
+        self.db_path = os.path.join(self.temp_dir, "test.db")
+        conn = sqlite3.connect(self.db_path)
+        create_database(conn)
+        analyze_directory(self.tree, conn, incremental=True)
+        build_call_graph(conn)
+        build_name_index(conn)
+        conn.close()
+
+        self.server = QueryServer(self.db_path, port=0, pool_size=2)
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.start()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.thread.join()
+        self.server.server_close()
+        shutil.rmtree(self.temp_dir)
+
+    def _get(self, path, **params):
+        url = f"http://127.0.0.1:{self.server.server_address[1]}{path}?{urlencode(params, doseq=True)}"
+        try:
+            with urlopen(url) as response:
+                return response.status, json.loads(response.read().decode("utf-8"))
+        except HTTPError as e:
+            return e.code, json.loads(e.read().decode("utf-8"))
+
+    def test_queries_return_json(self):
+        """Test the object, name, caller and health endpoints and the error statuses."""
+        status, report = self._get("/object", type="Catalog", name="Контрагенты")
+        self.assertEqual(status, 200)
+        self.assertEqual(report["object"]["name"], "Контрагенты")
+        self.assertEqual([m["name"] for m in report["methods"]], ["ПередЗаписью"])
+
+        status, hits = self._get("/names", q="ТекущаяДта", kind="method")
+        self.assertEqual((status, hits[0]["name"]), (200, "ТекущаяДата"))
+
+        status, callers = self._get("/callers", name="ОбщегоНазначения.ТекущаяДата")
+        self.assertEqual((status, callers["total"]), (200, 1))
+        self.assertEqual([c["method_name"] for c in callers["methods"][0]["callers"]], ["ПередЗаписью"])
+
+        status, health = self._get("/health")
+        self.assertEqual((status, health["status"]), (200, "ok"))
+
+        self.assertEqual(self._get("/object", type="Catalog")[0], 400)
+        self.assertEqual(self._get("/object", type="Неизвестный", name="А")[0], 400)
+        self.assertEqual(self._get("/names", q="Контрагенты", limit="много")[0], 400)
+        self.assertEqual(self._get("/search", q="Возврат")[0], 503)
+        self.assertEqual(self._get("/objects")[0], 404)
+
+    def test_pool_is_read_only_and_follows_published_database(self):
+        """Test that pooled connections reject writes and reopen a database replaced by publishing."""
+        pool = ConnectionPool(self.db_path, size=1)
+        with pool.connection() as conn:
+            # Сервис не меняет режим журнала базы
+            self.assertEqual(conn.execute("PRAGMA journal_mode").fetchone()[0], "delete")
+            with self.assertRaises(sqlite3.OperationalError):
+                conn.execute("DELETE FROM methods")
+            self.assertEqual(conn.execute("SELECT COUNT(*) FROM methods").fetchone()[0], 2)
+
+        path = os.path.join(self.tree, "Catalogs", "Контрагенты", "Ext", "ObjectModule.bsl")
+        with open(path, "a", encoding="utf-8") as f:
+            f.write("Процедура ПриЗаписи(Отказ)\nКонецПроцедуры\n")
+        conn, staging_path = open_staging_database(self.db_path)
+        analyze_directory(self.tree, conn, incremental=True)
+        publish_database(conn, self.db_path, staging_path)
+
+        with pool.connection() as conn:
+            self.assertEqual(conn.execute("SELECT COUNT(*) FROM methods").fetchone()[0], 3)
+        self.assertEqual(pool.stats(), {"size": 1, "open": 1, "idle": 1})
+        pool.close()
+        self.assertEqual(pool.stats()["open"], 0)
+
+    def test_outdated_database_is_not_changed(self):
+        """Test that the service refuses a database of an older version and leaves the file as it was."""
+        conn = sqlite3.connect(self.db_path)
+        conn.execute("DROP TABLE import_generations")
+        conn.commit()
+        conn.close()
+        with open(self.db_path, "rb") as f:
+            content = f.read()
+        with self.assertRaises(OutdatedDatabaseError):
+            QueryServer(self.db_path, port=0)
+        with open(self.db_path, "rb") as f:
+            self.assertEqual(f.read(), content)
+        self.assertFalse(os.path.exists(self.db_path + "-wal"))
+
+
+if __name__ == '__main__':
+    unittest.main()
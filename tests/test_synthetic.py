@@ -0,0 +1,70 @@
+import unittest
+import os
+import sys
+import sqlite3
+import tempfile
+import shutil
+from ent1ctosqlite.core import analyze_directory, open_vcv, parse_predefined
+from ent1ctosqlite.database import create_database, check_database_integrity
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'benchmarks'))
+
+from synthetic import generate_archive, generate_configuration, iter_configuration
+
+
+class TestSyntheticConfiguration(unittest.TestCase):
+    PARAMS = dict(objects=10, forms=2, methods=4, cp1251_share=0.5, seed=1)
+
+    def setUp(self):
+        """Create a file database next to the generated tree."""
+        self.temp_dir = tempfile.mkdtemp()
+        self.tree = os.path.join(self.temp_dir, 'tree')
+        self.db_path = os.path.join(self.temp_dir, 'test.db')
+        self.conn = sqlite3.connect(self.db_path)
+        create_database(self.conn)
+
+    def tearDown(self):
+        self.conn.close()
+        shutil.rmtree(self.temp_dir)
+
+    def _count(self, table):
+        return self.conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+
+    def test_generated_tree_is_imported(self):
+        """Test that a generated tree with cp1251 modules imports completely."""
+        files = dict(iter_configuration(**self.PARAMS))
+        self.assertEqual(generate_configuration(self.tree, **self.PARAMS), len(files))
+        modules = [data for path, data in files.items() if path.endswith('.bsl')]
+        self.assertTrue(any(not data.startswith(b'\xef\xbb\xbf') for data in modules))
+
+        analyze_directory(self.tree, self.conn)
+        # 10 объектов и 1 общий модуль
+        self.assertEqual(self._count("objects"), 11)
+        self.assertEqual(self._count("code_body"), len(modules))
+        self.assertEqual(self._count("commands_templates"), 20)
+        self.assertEqual(self._count("methods"), 10 * (4 + 2 + 2 * 4) + 4)
+        cursor = self.conn.cursor()
+        cursor.execute("SELECT COUNT(*) FROM methods WHERE methods_name LIKE 'Метод%' OR methods_name LIKE 'Команда%'")
+        self.assertEqual(cursor.fetchone()[0], self._count("methods"))
+        self.assertTrue(check_database_integrity(self.db_path))
+
+        predefined = os.path.join(self.tree, 'Catalogs', 'Товар0', 'Ext', 'Predefined.xml')
+        parse_predefined(1, predefined, self.conn)
+        self.assertGreater(self._count("predefined_attrs"), 0)
+
+    def test_generated_archive_is_opened(self):
+        """Test that the configuration root is found inside a generated archive."""
+        zip_path = os.path.join(self.temp_dir, 'cfg.zip')
+        count = generate_archive(zip_path, **self.PARAMS)
+        source, root = open_vcv(zip_path)
+        try:
+            self.assertEqual(root, 'Конфигурация')
+            analyze_directory(root, self.conn, source)
+        finally:
+            source.close()
+        self.assertEqual(self._count("objects"), 11)
+        self.assertGreater(count, self._count("code_body"))
+
+
+if __name__ == '__main__':
+    unittest.main()